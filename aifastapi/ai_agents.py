@@ -3,10 +3,18 @@ import torch
 import numpy as np
 import time
 import os
+from concurrent.futures import Future
+from transformers.modeling_outputs import BaseModelOutput
+from generation_scheduler import GenerationScheduler
+from encoder_cache import EncoderOutputCache
+from context_packer import ContextPacker, PackedPrompt
 
 class EmbeddingGenerator:
-    def __init__(self, model_name=None):
+    def __init__(self, model_name=None, backend=None):
         self.model_name = model_name or os.getenv("EMBEDDING_MODEL", "intfloat/e5-base-v2")
+        self.backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()  # "torch" or "onnx"
+        self.token_budget = int(os.getenv("EMBED_TOKEN_BUDGET", "16384"))  # max padded tokens per forward pass, 0 disables bucketing
+        self.output_dtype = np.float16 if os.getenv("EMBEDDING_DTYPE", "float32") == "float16" else np.float32
         self.tokenizer = None
         self.model = None
         self._loaded = False
@@ -20,43 +28,94 @@ class EmbeddingGenerator:
             tokenizer_time = (time.time() - start) * 1000
             
             start = time.time()
-            self.model = AutoModel.from_pretrained(self.model_name)
+            if self.backend == "onnx":
+                from onnx_backend import OnnxEmbeddingModel
+                self.model = OnnxEmbeddingModel(self.model_name)
+            else:
+                self.model = AutoModel.from_pretrained(self.model_name)
             model_time = (time.time() - start) * 1000
             
-            print(f"⏱️ Model loading times ({self.model_name}):")
+            print(f"⏱️ Model loading times ({self.model_name}, {self.backend} backend):")
             print(f"- Tokenizer: {tokenizer_time:.2f}ms")
             print(f"- Model: {model_time:.2f}ms")
             self._loaded = True
         except Exception as e:
             raise RuntimeError(f"Failed to load embedding model: {str(e)}")
 
-    def generate_embeddings(self, texts: list[str], file_id: str) -> list[list[float]]:
+    def _length_buckets(self, lengths: list[int]) -> list[list[int]]:
+        """Group input indices by token length so each bucket stays within the token budget"""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        if self.token_budget <= 0:
+            return [order]
+
+        buckets, current, current_max = [], [], 0
+        for idx in order:
+            longest = max(current_max, lengths[idx])
+            if current and longest * (len(current) + 1) > self.token_budget:
+                buckets.append(current)
+                current, longest = [], lengths[idx]
+            current.append(idx)
+            current_max = longest
+        if current:
+            buckets.append(current)
+        return buckets
+
+    def generate_embeddings(self, texts: list[str], file_id: str, prefix: str = "passage", input_ids: list[list[int]] = None) -> np.ndarray:
+        """
+        Embed `texts` into a contiguous (len(texts), dim) float32 array, or
+        float16 with EMBEDDING_DTYPE=float16. When the chunker's token ids
+        (without prefix or special tokens) are passed as `input_ids`, they are
+        reused instead of tokenizing again.
+        """
         if not self._loaded:
             self._load_model()
         start_time = time.time()
-        batch = ["passage: " + text for text in texts]
         
         encode_start = time.time()
-        encoded_input = self.tokenizer(
-            batch,
-            padding=True,
-            truncation=True,
-            return_tensors="pt",
-            max_length=512
-        )
+        if input_ids is not None:
+            prefix_ids = self.tokenizer(f"{prefix}: ", add_special_tokens=False)["input_ids"]
+            features = [
+                self.tokenizer.prepare_for_model(prefix_ids + ids, truncation=True, max_length=512)
+                for ids in input_ids
+            ]
+            encoded_input = {key: [feature[key] for feature in features] for key in features[0].keys()}
+        else:
+            encoded_input = self.tokenizer(
+                [f"{prefix}: " + text for text in texts],
+                truncation=True,
+                max_length=512
+            )
+        lengths = [len(ids) for ids in encoded_input["input_ids"]]
+        buckets = self._length_buckets(lengths)
         encode_time = (time.time() - encode_start) * 1000
         
-        infer_start = time.time()
-        with torch.no_grad():
-            model_output = self.model(**encoded_input)
-        infer_time = (time.time() - infer_start) * 1000
-        
-        pool_start = time.time()
-        token_embeddings = model_output.last_hidden_state
-        attention_mask = encoded_input["attention_mask"]
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-        embeddings = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-        pool_time = (time.time() - pool_start) * 1000
+        infer_time = pool_time = 0.0
+        padded_tokens = 0
+        embeddings = None
+        for bucket in buckets:
+            pad_start = time.time()
+            features = self.tokenizer.pad(
+                {key: [values[i] for i in bucket] for key, values in encoded_input.items()},
+                padding=True,
+                return_tensors="pt"
+            )
+            padded_tokens += features["input_ids"].numel()
+            encode_time += (time.time() - pad_start) * 1000
+
+            infer_start = time.time()
+            with torch.no_grad():
+                model_output = self.model(**features)
+            infer_time += (time.time() - infer_start) * 1000
+            
+            pool_start = time.time()
+            token_embeddings = model_output.last_hidden_state
+            attention_mask = features["attention_mask"]
+            input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+            pooled = torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+            if embeddings is None:
+                embeddings = torch.empty((len(texts), pooled.shape[-1]), dtype=pooled.dtype)
+            embeddings[bucket] = pooled
+            pool_time += (time.time() - pool_start) * 1000
         
         total_time = (time.time() - start_time) * 1000
         text_preprocessing_time = total_time - (encode_time + infer_time + pool_time)
@@ -64,16 +123,23 @@ class EmbeddingGenerator:
         print(f"\n⏱️ Embedding generation metrics for file:", file_id)
         print(f"- Text preprocessing: {text_preprocessing_time:.2f}ms")
         print(f"- Tokenization: {encode_time:.2f}ms")
-        print(f"- Model inference: {infer_time:.2f}ms")
+        print(f"- Model inference: {infer_time:.2f}ms ({len(buckets)} buckets)")
         print(f"- Pooling: {pool_time:.2f}ms")
+        print(f"- Padding overhead: {padded_tokens - sum(lengths)} of {padded_tokens} tokens")
         
-        return embeddings.numpy().tolist()
+        # Shares the tensor's buffer; callers convert to lists only at the wire
+        return embeddings.numpy().astype(self.output_dtype, copy=False)
 
 class GenerativeAI:
     def __init__(self, model_name=None):
         self.model_name = model_name or os.getenv("GENERATIVE_MODEL", "google/flan-t5-base")
+        self.batch_size = int(os.getenv("GEN_BATCH_MAX_SIZE", "8"))  # 0 runs one model.generate per prompt
+        self.max_new_tokens = int(os.getenv("GEN_MAX_NEW_TOKENS", "150"))
+        self.encoder_cache = EncoderOutputCache() if float(os.getenv("GEN_ENCODER_CACHE_MB", "0")) > 0 else None
         self.tokenizer = None
         self.model = None
+        self.packer = None
+        self.scheduler = None
         self._loaded = False
 
     def _load_model(self):
@@ -88,6 +154,15 @@ class GenerativeAI:
             self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
             model_time = (time.time() - start) * 1000
             
+            self.packer = ContextPacker(self.tokenizer, max_tokens=512)
+            if self.batch_size > 0:
+                self.scheduler = GenerationScheduler(
+                    self.model,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    max_batch_size=self.batch_size
+                )
+            
             print(f"\n⏱️ Generative model loading times ({self.model_name}):")
             print(f"- Tokenizer: {tokenizer_time:.2f}ms")
             print(f"- Model: {model_time:.2f}ms")
@@ -95,29 +170,156 @@ class GenerativeAI:
         except Exception as e:
             raise RuntimeError(f"Failed to load generative model: {str(e)}")
 
-    def generate_response(self, file_id: str, prompt: str, context: str = "") -> str:
+    def pack(self, prompt: str, context) -> PackedPrompt:
+        """Pack the question and `context` (one text, or chunk texts in ranking order) into the input window"""
         if not self._loaded:
             self._load_model()
+        chunks = [context] if isinstance(context, str) else list(context)
+        return self.packer.pack(prompt, [chunk for chunk in chunks if chunk])
+
+    def _encoder_input(self, packed: PackedPrompt, chunk_ids: list[str], report: dict):
+        """
+        An encode callable when the context's encoder states can come from
+        the encoder cache, else None. The packed question and context are
+        then encoded as separate segments.
+        """
+        if self.encoder_cache is None or not chunk_ids or not packed.chunks:
+            return None
+        key = self.encoder_cache.key(self.model_name, chunk_ids, packed.context_ids)
+
+        def encode():
+            states, encoder_report = self.encoder_cache.encode(
+                self.model.get_encoder(), packed.question_ids, key, packed.context_ids
+            )
+            report.update(encoder_report)
+            return states
+
+        return encode
+
+    @staticmethod
+    def _packing_line(packed: PackedPrompt) -> str:
+        stats = packed.stats
+        return (f"- Context packing: {stats['ms']:.2f}ms ({stats['context_tokens']}/{stats['context_budget']} context tokens "
+                f"from {len(packed.chunks)} chunks, {stats['duplicate_sentences']} duplicate and "
+                f"{stats['skipped_sentences']} overflowing sentences dropped, {stats['truncated_sentences']} cut)")
+
+    @staticmethod
+    def _encoder_cache_line(report: dict) -> str:
+        if not report:
+            return ""
+        if report["hit"]:
+            return f"- Encoder cache: hit, encoded in {report['encode_ms']:.2f}ms (saved {report['saved_ms']:.2f}ms)"
+        return f"- Encoder cache: miss, encoded in {report['encode_ms']:.2f}ms"
+
+    def _finish_reason(self, tokens: list) -> str:
+        if tokens and tokens[-1] == self.tokenizer.eos_token_id:
+            return "stop"
+        return "length" if len(tokens) >= self.max_new_tokens else "deadline"
+
+    def submit_response(self, file_id: str, prompt: str, context="", chunk_ids: list[str] = None,
+                        packed: PackedPrompt = None, deadline: float = None, on_text=None,
+                        report: dict = None) -> Future:
+        """
+        Queue the prompt on the continuous-batching scheduler and return a
+        future for the decoded answer, so async callers can await it without
+        holding an executor thread for the whole generation. An already
+        `packed` prompt is used as is. Decoding stops early near `deadline`
+        (time.monotonic() seconds), `on_text` receives each newly decoded
+        piece of the answer, and `report` is filled with the finish reason,
+        token count and first-token time.
+        """
+        if not self._loaded:
+            self._load_model()
+        start_time = time.time()
+        packed = packed or self.pack(prompt, context)
+        input_ids = packed.input_ids
+        encoder_report = {}
+        encode = self._encoder_input(packed, chunk_ids, encoder_report)
+        report = report if report is not None else {}
+        response = Future()
+
+        streamed, emitted = [], ""
+
+        def on_token(token):
+            nonlocal emitted
+            if not streamed:
+                report["first_token_at"] = time.monotonic()
+            streamed.append(token)
+            if on_text is None:
+                return
+            # Decode the whole prefix so pieces that merge across tokens come out right
+            text = self.tokenizer.decode(streamed, skip_special_tokens=True)
+            if len(text) > len(emitted) and text.startswith(emitted):
+                on_text(text[len(emitted):])
+                emitted = text
+
+        def finish(tokens: Future):
+            # The scheduler cancels what it still holds on shutdown
+            if tokens.cancelled():
+                response.cancel()
+                return
+            # False once the caller gave up on the answer (e.g. a cancelled asyncio.wrap_future)
+            if not response.set_running_or_notify_cancel():
+                return
+            if tokens.exception() is not None:
+                response.set_exception(tokens.exception())
+                return
+            report.update(finish_reason=self._finish_reason(tokens.result()), new_tokens=len(tokens.result()))
+            response.set_result(self.tokenizer.decode(tokens.result(), skip_special_tokens=True))
+            print(f"\n⏱️ GenAI batched generation for the doc: {file_id} - {(time.time() - start_time) * 1000:.2f}ms "
+                  f"({len(input_ids)} prompt tokens, {len(tokens.result())} new tokens, {report['finish_reason']})")
+            print(self._packing_line(packed))
+            if encoder_report:
+                print(self._encoder_cache_line(encoder_report))
+
+        self.scheduler.submit(
+            input_ids,
+            max_new_tokens=self.max_new_tokens,
+            do_sample=True,
+            temperature=0.7,
+            top_k=50,  # model.generate's default when sampling
+            encode=encode,
+            deadline=deadline,
+            on_token=on_token,
+        ).add_done_callback(finish)
+        return response
+
+    def generate_response_with_report(self, *args, **kwargs) -> tuple[str, dict]:
+        """generate_response that returns its report, for callers in another process than the model"""
+        report = {}
+        return self.generate_response(*args, report=report, **kwargs), report
+
+    def generate_response(self, file_id: str, prompt: str, context="", chunk_ids: list[str] = None,
+                          packed: PackedPrompt = None, deadline: float = None, report: dict = None) -> str:
+        if not self._loaded:
+            self._load_model()
+        if self.scheduler is not None:
+            return self.submit_response(file_id, prompt, context, chunk_ids, packed, deadline, report=report).result()
         start_time = time.time()
-        input_text = f"Question: {prompt}\nContext: {context}\nAnswer:" if context else f"Question: {prompt}\nAnswer:"
+        report = report if report is not None else {}
         
         token_start = time.time()
-        inputs = self.tokenizer(
-            input_text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512
-        )
+        packed = packed or self.pack(prompt, context)
+        encoder_report = {}
+        encode = self._encoder_input(packed, chunk_ids, encoder_report)
         token_time = (time.time() - token_start) * 1000
         
         gen_start = time.time()
+        if encode is not None:
+            inputs = {"encoder_outputs": BaseModelOutput(last_hidden_state=encode()[None])}
+        else:
+            inputs = {"input_ids": torch.tensor([packed.input_ids])}
+        if deadline is not None:
+            inputs["max_time"] = max(deadline - time.monotonic(), 0.001)
         outputs = self.model.generate(
-            inputs.input_ids,
-            max_new_tokens=150,
+            **inputs,
+            max_new_tokens=self.max_new_tokens,
             do_sample=True,
             temperature=0.7,
         )
         gen_time = (time.time() - gen_start) * 1000
+        new_tokens = outputs[0][1:].tolist()  # drop the decoder start token
+        report.update(finish_reason=self._finish_reason(new_tokens), new_tokens=len(new_tokens))
         
         decode_start = time.time()
         response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
@@ -130,5 +332,8 @@ class GenerativeAI:
         print(f"- Tokenization: {token_time:.2f}ms")
         print(f"- Generation: {gen_time:.2f}ms")
         print(f"- Decoding: {decode_time:.2f}ms")
+        print(self._packing_line(packed))
+        if encoder_report:
+            print(self._encoder_cache_line(encoder_report))
         
         return response
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import numpy as np
+
+class SemanticAnswerCache:
+    """
+    Generated answers keyed by query vector. A new query reuses an answer when
+    its vector is within `threshold` cosine similarity of a cached query AND
+    retrieval returned the same set of context chunks. Lookups scan a
+    normalised (capacity, dim) matrix in one matmul; the least recently used
+    entry is evicted when full and entries expire after `ttl` seconds. e5
+    scores different questions on one topic above 0.9, so the threshold has
+    to stay close to 1 to only match rephrasings of the same question.
+    """
+    def __init__(self, max_entries: int = None, threshold: float = None, ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.98"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._active = np.zeros(self.max_entries, dtype=bool)
+        self._last_used = np.zeros(self.max_entries)
+        self._entries = [None] * self.max_entries
+        self._by_file = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, vector, chunk_ids: list[str]):
+        """Return the cached answer for a similar query over the same context, or None"""
+        with self._lock:
+            if self._vectors is None or not self._active.any():
+                self.misses += 1
+                return None
+
+            now = time.time()
+            scores = self._vectors @ self._normalize(vector)
+            scores[~self._active] = -1.0
+            context = frozenset(chunk_ids)
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.threshold:
+                    break
+                entry = self._entries[slot]
+                if self.ttl and now - entry["created"] > self.ttl:
+                    self._remove(slot)
+                    continue
+                if entry["chunk_ids"] == context:
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, vector, chunk_ids: list[str], file_ids: list[str], answer: str):
+        with self._lock:
+            vector = self._normalize(vector)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            free = np.flatnonzero(~self._active)
+            if len(free):
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._remove(slot)
+                self.evictions += 1
+
+            now = time.time()
+            self._vectors[slot] = vector
+            self._active[slot] = True
+            self._last_used[slot] = now
+            self._entries[slot] = {
+                "chunk_ids": frozenset(chunk_ids),
+                "file_ids": set(file_ids),
+                "answer": answer,
+                "created": now,
+            }
+            for file_id in set(file_ids):
+                self._by_file.setdefault(file_id, set()).add(slot)
+
+    def invalidate_file(self, file_id: str) -> int:
+        """Drop every answer whose context came from `file_id`"""
+        with self._lock:
+            slots = self._by_file.pop(file_id, set())
+            for slot in slots:
+                self._remove(slot)
+            self.invalidations += len(slots)
+            return len(slots)
+
+    def _remove(self, slot):
+        entry = self._entries[slot]
+        if entry is None:
+            return
+        for file_id in entry["file_ids"]:
+            slots = self._by_file.get(file_id)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._by_file[file_id]
+        self._entries[slot] = None
+        self._active[slot] = False
+        self._last_used[slot] = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._active.sum()),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,56 @@
+"""
+Chunks/sec per core for the PyTorch, ONNX fp32 and ONNX int8 embedding backends.
+
+Every backend is pinned to the same number of intra-op threads so the numbers
+are comparable per core. Run from the aifastapi directory:
+    python -m benchmarks.bench_embedding_backends --threads 1 --docs 10
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+
+import torch
+
+from ai_agents import EmbeddingGenerator
+from benchmarks.bench_length_buckets import synthetic_chunks
+
+def measure(embedder: EmbeddingGenerator, chunks: list[str], batch_size: int) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        embedder.generate_embeddings(chunks[:batch_size], "warmup")
+        start = time.time()
+        for i in range(0, len(chunks), batch_size):
+            embedder.generate_embeddings(chunks[i:i + batch_size], "bench")
+    return len(chunks) / (time.time() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    os.environ["ORT_INTRA_OP_THREADS"] = str(args.threads)
+
+    results = {}
+    chunks = None
+    for label, backend, quantize in (("torch fp32", "torch", "0"), ("onnx fp32", "onnx", "0"), ("onnx int8", "onnx", "1")):
+        os.environ["EMBEDDING_ONNX_QUANTIZE"] = quantize
+        embedder = EmbeddingGenerator(backend=backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            embedder._load_model()
+        if chunks is None:
+            chunks = synthetic_chunks(embedder.tokenizer, args.docs, random.Random(args.seed))
+        results[label] = measure(embedder, chunks, args.batch_size)
+        print(f"- {label:<11} {results[label]:.2f} chunks/s ({results[label]/args.threads:.2f} per core)")
+
+    baseline = results["torch fp32"]
+    for label, rate in results.items():
+        print(f"⚡ {label}: {rate / baseline:.2f}x vs torch fp32")
+
+if __name__ == "__main__":
+    main()
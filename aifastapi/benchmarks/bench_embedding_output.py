@@ -0,0 +1,101 @@
+"""
+List-of-lists vs ndarray embeddings on the ingest write path.
+
+Feeds synthetic encoder output (a float32 torch tensor, as mean pooling
+produces) through what IngestPipeline does with it per batch: build vector
+dicts, write them to a vector store and, for Pinecone, build the request
+payload. The "lists" path converts with `.tolist()` right after the model, the
+"ndarray" path keeps row views and converts only when the payload is built.
+The "workers" target adds the pickle round trip results take when the models
+run in a ModelWorkerPool. Time and tracemalloc peak memory are reported.
+
+Run from the aifastapi directory:
+    python -m benchmarks.bench_embedding_output --chunks 20000 --dim 768
+"""
+import argparse
+import contextlib
+import io
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+from local_vector_store import LocalVectorStore
+
+def as_lists(output: torch.Tensor):
+    return output.numpy().tolist()
+
+def as_array(output: torch.Tensor):
+    return output.numpy()
+
+def build_vectors(embeddings, start: int) -> list[dict]:
+    return [{
+        "id": f"bench-{start + i}",
+        "values": emb,
+        "metadata": {"file_id": "bench", "chunk_number": start + i},
+    } for i, emb in enumerate(embeddings)]
+
+def wire_payload(vectors: list[dict]) -> list[dict]:
+    # What PineconeManager hands to the client; values that are already lists pass through
+    if isinstance(vectors[0]["values"], list):
+        return [dict(v) for v in vectors]
+    rows = np.asarray([v["values"] for v in vectors], dtype=np.float32).tolist()
+    return [{**v, "values": row} for v, row in zip(vectors, rows)]
+
+def write_all(convert, outputs: list[torch.Tensor], target: str, dim: int):
+    store = LocalVectorStore(path=tempfile.mkdtemp(), dim=dim) if target == "local" else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        offset = 0
+        for output in outputs:
+            embeddings = convert(output)
+            if target == "workers":
+                # Results of a ModelWorkerPool call cross a process boundary pickled
+                embeddings = pickle.loads(pickle.dumps(embeddings, protocol=pickle.HIGHEST_PROTOCOL))
+            vectors = build_vectors(embeddings, offset)
+            if store is not None:
+                store.upload_vectors(vectors)
+            elif target == "pinecone":
+                wire_payload(vectors)
+            offset += len(vectors)
+
+def run(convert, outputs: list[torch.Tensor], target: str, dim: int) -> tuple[float, int]:
+    """Wall time of an untraced pass, then peak traced memory of a second pass"""
+    start = time.perf_counter()
+    write_all(convert, outputs, target, dim)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    write_all(convert, outputs, target, dim)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(args.seed)
+    outputs = [
+        torch.randn(min(args.batch_size, args.chunks - i), args.dim, generator=generator)
+        for i in range(0, args.chunks, args.batch_size)
+    ]
+    print(f"📊 {args.chunks} embeddings x {args.dim} dims in batches of {args.batch_size}")
+
+    for target in ("local", "pinecone", "workers"):
+        results = {}
+        for label, convert in (("lists", as_lists), ("ndarray", as_array)):
+            seconds, peak = run(convert, outputs, target, args.dim)
+            results[label] = seconds
+            print(f"- {target:<8} {label:<8} {seconds:.2f}s  ({args.chunks / seconds:.0f} vectors/s, "
+                  f"peak {peak / 1e6:.1f} MB)")
+        print(f"⚡ {target} speed-up: {results['lists'] / results['ndarray']:.2f}x")
+
+if __name__ == "__main__":
+    main()
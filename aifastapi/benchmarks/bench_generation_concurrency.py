@@ -0,0 +1,92 @@
+"""
+Load test of answer generation at increasing concurrency.
+
+Each level starts `concurrency` clients that each send `--requests` prompts
+back to back, and reports p50/p99 latency and throughput for two setups:
+"executor" runs one `model.generate` per prompt on an INFERENCE_WORKERS
+thread pool, as /search did before continuous batching, and "batched" sends
+every prompt to the GenerationScheduler. Prompts come with varied context
+lengths so answers finish at different steps.
+
+Run from the aifastapi directory:
+    python -m benchmarks.bench_generation_concurrency --levels 1 2 4 8 16
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ai_agents import GenerativeAI
+
+WORDS = ("invoice payment supplier delivery contract termination notice schedule "
+         "customer warranty liability clause amount period agreement service").split()
+
+def make_prompts(count: int, rng: random.Random) -> list[tuple[str, str]]:
+    return [
+        (f"What does the document say about {rng.choice(WORDS)}?",
+         " ".join(rng.choice(WORDS) for _ in range(rng.randrange(20, 300))))
+        for _ in range(count)
+    ]
+
+def load_test(call, prompts, concurrency: int, requests: int) -> tuple[list[float], float]:
+    """Latencies in ms of `concurrency` clients each sending `requests` prompts, and wall time"""
+    def client(offset):
+        latencies = []
+        for i in range(requests):
+            question, context = prompts[(offset * requests + i) % len(prompts)]
+            start = time.perf_counter()
+            call(question, context)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        results = list(clients.map(client, range(concurrency)))
+    return [ms for latencies in results for ms in latencies], time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("GENERATIVE_MODEL", "google/flan-t5-base"))
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=4, help="prompts per client")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--executor-workers", type=int, default=int(os.getenv("INFERENCE_WORKERS", "2")))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = GenerativeAI(args.model)
+    generator.batch_size = args.batch_size
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator._load_model()
+    # Same weights without the scheduler, for the one-generate-per-prompt baseline
+    plain = GenerativeAI(args.model)
+    plain.tokenizer, plain.model, plain._loaded = generator.tokenizer, generator.model, True
+    prompts = make_prompts(64, random.Random(args.seed))
+    executor = ThreadPoolExecutor(max_workers=args.executor_workers)
+
+    def unbatched(question, context):
+        return executor.submit(plain.generate_response, "bench", question, context).result()
+
+    def batched(question, context):
+        return generator.submit_response("bench", question, context).result()
+
+    print(f"📊 {args.model}: {args.requests} prompts per client, batch size {args.batch_size}, "
+          f"{args.executor_workers} executor threads")
+    for concurrency in args.levels:
+        for label, call in (("executor", unbatched), ("batched", batched)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies, seconds = load_test(call, prompts, concurrency, args.requests)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"- c={concurrency:<3} {label:<8} p50 {p50:8.1f}ms  p99 {p99:8.1f}ms  "
+                  f"{len(latencies) / seconds:6.2f} answers/s")
+    print(f"⚡ Scheduler: {generator.scheduler.stats()}")
+    executor.shutdown()
+    generator.scheduler.shutdown()
+
+if __name__ == "__main__":
+    main()
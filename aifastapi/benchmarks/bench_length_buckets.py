@@ -0,0 +1,76 @@
+"""
+Padded vs length-bucketed batches through EmbeddingGenerator.generate_embeddings.
+
+Builds synthetic documents whose chunks follow the chunker's real shape: mostly
+full 512-token windows plus one short tail chunk per document, then embeds them
+in 100-chunk batches exactly like EmbeddingService does.
+
+Run from the aifastapi directory:
+    python -m benchmarks.bench_length_buckets --docs 20 --budget 16384
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from ai_agents import EmbeddingGenerator
+
+WORDS = (
+    "agreement party shall terms payment invoice contract clause termination notice period "
+    "liability warranty confidential information services provider customer effective date "
+    "schedule obligations breach remedy law jurisdiction amendment signature delivery fee"
+).split()
+
+def synthetic_chunks(tokenizer, docs: int, rng: random.Random) -> list[str]:
+    text = " ".join(rng.choice(WORDS) for _ in range(20000))
+    ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    chunks = []
+    for _ in range(docs):
+        lengths = [500] * rng.randint(2, 12) + [rng.randint(16, 400)]
+        # Scanned/sparse pages produce a few very short chunks as well
+        lengths += [rng.randint(8, 64) for _ in range(rng.randint(0, 2))]
+        for length in lengths:
+            offset = rng.randint(0, len(ids) - length)
+            chunks.append(tokenizer.decode(ids[offset:offset + length]))
+    rng.shuffle(chunks)
+    return chunks
+
+def run(embedder: EmbeddingGenerator, chunks: list[str], batch_size: int) -> float:
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(0, len(chunks), batch_size):
+            embedder.generate_embeddings(chunks[i:i + batch_size], "bench")
+    return time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--budget", type=int, default=16384, help="token budget per bucketed forward pass")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embedder = EmbeddingGenerator()
+    embedder._load_model()
+    chunks = synthetic_chunks(embedder.tokenizer, args.docs, random.Random(args.seed))
+    lengths = [len(ids) for ids in embedder.tokenizer(chunks, truncation=True, max_length=512)["input_ids"]]
+    print(f"📊 {len(chunks)} chunks, mean {sum(lengths)/len(lengths):.0f} tokens, "
+          f"{sum(1 for n in lengths if n < 256)} under 256 tokens")
+
+    # Warm up once so lazy initialisation is not measured
+    run(embedder, chunks[:args.batch_size], args.batch_size)
+
+    results = {}
+    for label, budget in (("padded", 0), ("bucketed", args.budget)):
+        embedder.token_budget = budget
+        best = min(run(embedder, chunks, args.batch_size) for _ in range(args.repeat))
+        results[label] = best
+        print(f"- {label:<9} {best:.2f}s  ({len(chunks)/best:.1f} chunks/s)")
+
+    print(f"⚡ Speed-up: {results['padded'] / results['bucketed']:.2f}x")
+
+if __name__ == "__main__":
+    main()
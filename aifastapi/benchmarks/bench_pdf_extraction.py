@@ -0,0 +1,57 @@
+"""
+Serial vs process-sharded PDF text extraction on synthetic multi-hundred-page PDFs.
+
+Run from the aifastapi directory:
+    python -m benchmarks.bench_pdf_extraction --pages 100 300 800 --workers 8
+"""
+import argparse
+import random
+import time
+
+import fitz
+
+from text_processor import TextProcessor
+from benchmarks.bench_length_buckets import WORDS
+
+def synthetic_pdf(pages: int, rng: random.Random) -> bytes:
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 120))) for _ in range(5)]
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), "\n\n".join(paragraphs), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def measure(processor: TextProcessor, data: bytes) -> float:
+    start = time.time()
+    for _ in processor.iter_pages(data):
+        pass
+    return time.time() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300, 800])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    serial = TextProcessor(tokenizer=None)
+    serial.extract_workers = 1
+    parallel = TextProcessor(tokenizer=None)
+    parallel.extract_workers = args.workers
+    parallel.parallel_min_pages = 1
+
+    # Start the worker processes before timing anything
+    measure(parallel, synthetic_pdf(args.workers * 8, rng))
+
+    for pages in args.pages:
+        data = synthetic_pdf(pages, rng)
+        serial_time = measure(serial, data)
+        parallel_time = measure(parallel, data)
+        print(f"- {pages:>4} pages ({len(data)/1024/1024:.1f}MB): serial {serial_time:.2f}s, "
+              f"{args.workers} workers {parallel_time:.2f}s, {serial_time/parallel_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+MIN_FRAGMENT_TOKENS = 16
+QUESTION_TOKEN_STEP = 16
+
+@dataclass
+class PackedPrompt:
+    """Token ids of `Question: ... Context: ... Answer:`, split where the context starts"""
+    question_ids: list
+    context_ids: list
+    chunks: list = field(default_factory=list)  # indices of the chunks that contributed sentences
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def input_ids(self) -> list:
+        return self.question_ids + self.context_ids
+
+class ContextPacker:
+    """
+    Builds the generator prompt in token space. The question reserves its own
+    length, rounded up to QUESTION_TOKEN_STEP, and the rest of the
+    `max_tokens` window is filled with sentences from the chunks in ranking
+    order. Only a question longer than the `question_tokens` safety cap (half
+    the window by default) is cut, which is logged and counted in the stats.
+    A sentence that does not fit is cut to the remaining space when at least
+    MIN_FRAGMENT_TOKENS are left, and skipped otherwise so shorter ones later
+    can still use the space. Sentences that are near-duplicates (token-set
+    Jaccard at or above `dedup_threshold`) of one already packed are dropped.
+    The context part depends only on the chunks and that rounded question
+    length, never on the question text, so its encoder states can be cached
+    and questions of similar length share them.
+    """
+    def __init__(self, tokenizer, max_tokens: int = 512, question_tokens: int = None, dedup_threshold: float = None):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.question_tokens = question_tokens or int(os.getenv("GEN_QUESTION_TOKENS", str(max_tokens // 2)))
+        self.dedup_threshold = dedup_threshold if dedup_threshold is not None else float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+        self._eos = [tokenizer.eos_token_id] if tokenizer.eos_token_id is not None else []
+        self._context_prefix = self._ids("Context:")
+        self._answer_suffix = self._ids("\nAnswer:") + self._eos
+        # Context budget when the question uses the whole cap; shorter questions leave more
+        self.context_tokens = max_tokens - self.question_tokens - len(self._context_prefix) - len(self._answer_suffix)
+
+    def _ids(self, text: str) -> list:
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    @staticmethod
+    def split_sentences(text: str) -> list[str]:
+        return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+    def pack(self, question: str, chunks: list[str]) -> PackedPrompt:
+        start = time.time()
+        question_ids = self._ids(f"Question: {question}\n")
+        question_truncated = max(len(question_ids) - self.question_tokens, 0)
+        if question_truncated:
+            question_ids = question_ids[:self.question_tokens]
+            print(f"⚠️ Question cut to {self.question_tokens} tokens, {question_truncated} dropped")
+        reserved = min(self.question_tokens, -(-len(question_ids) // QUESTION_TOKEN_STEP) * QUESTION_TOKEN_STEP)
+        context_tokens = self.context_tokens + self.question_tokens - reserved
+
+        used, kept_sets, chunk_indices = [], [], []
+        duplicates = skipped = truncated = available = 0
+        for index, chunk in enumerate(chunks):
+            if len(used) >= context_tokens:
+                break
+            # A chunk can never contribute more than the budget, and tokens average well under 10 chars
+            sentences = self.split_sentences(chunk[:context_tokens * 10])
+            if not sentences:
+                continue
+            contributed = False
+            for ids in self.tokenizer(sentences, add_special_tokens=False)["input_ids"]:
+                available += len(ids)
+                tokens = set(ids)
+                if any(len(tokens & kept) / len(tokens | kept) >= self.dedup_threshold for kept in kept_sets):
+                    duplicates += 1
+                    continue
+                room = context_tokens - len(used)
+                if len(ids) > room:
+                    if room < MIN_FRAGMENT_TOKENS:
+                        skipped += 1
+                        continue
+                    ids = ids[:room]
+                    truncated += 1
+                used.extend(ids)
+                kept_sets.append(tokens)
+                contributed = True
+            if contributed:
+                chunk_indices.append(index)
+
+        if used:
+            context_ids = self._context_prefix + used + self._answer_suffix
+        else:
+            context_ids = self._ids("Answer:") + self._eos
+        stats = {
+            "question_tokens": len(question_ids),
+            "question_truncated_tokens": question_truncated,
+            "context_tokens": len(used),
+            "context_budget": context_tokens,
+            "available_tokens": available,
+            "duplicate_sentences": duplicates,
+            "skipped_sentences": skipped,
+            "truncated_sentences": truncated,
+            "ms": round((time.time() - start) * 1000, 3),
+        }
+        return PackedPrompt(question_ids, context_ids, chunk_indices, stats)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+import httpx
+
+class DjangoAPIError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class DjangoClient:
+    """Async client for the Django backend endpoints used by the AI service"""
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or os.getenv("DJANGO_API_BASE_URL", "http://backend:8000")
+        self.chunk_batch_size = int(os.getenv("CHUNK_POST_BATCH_SIZE", "250"))
+        self.chunk_concurrency = int(os.getenv("CHUNK_POST_CONCURRENCY", "4"))
+
+    async def save_chunks(self, chunks: list[dict]) -> int:
+        """Persist chunk rows through the bulk endpoint in batches with bounded concurrency"""
+        start = time.time()
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30.0) as client:
+            async def post_batch(offset):
+                batch = chunks[offset:offset + self.chunk_batch_size]
+                async with semaphore:
+                    try:
+                        response = await client.post("/api/data/chunks/bulk/", json=batch)
+                    except httpx.HTTPError as e:
+                        print(f"🔥 HTTPX ERROR on chunks {offset}-{offset + len(batch) - 1}: {str(e)}")
+                        raise DjangoAPIError(502, f"Failed to send chunks starting at {offset} to Django")
+
+                if response.status_code != 201:
+                    print(f"❌ Failed to save chunks {offset}-{offset + len(batch) - 1}: {response.text}")
+                    raise DjangoAPIError(500, f"Chunks starting at {offset} rejected by Django")
+                return len(batch)
+
+            saved = await asyncio.gather(*(
+                post_batch(offset) for offset in range(0, len(chunks), self.chunk_batch_size)
+            ))
+
+        print(f"💾 Saved {sum(saved)} chunks in {len(saved)} requests in {time.time()-start:.2f}s")
+        return sum(saved)
+
+    async def lexical_search(self, query: str, k: int = 20, file_id: str = None, owner_id: str = None) -> list[dict]:
+        """Keyword top-k from the Postgres full-text index over chunk rows"""
+        params = {"q": query, "k": k}
+        if file_id:
+            params["file_id"] = file_id
+        if owner_id:
+            params["owner_id"] = owner_id
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10.0) as client:
+            try:
+                response = await client.get("/api/data/chunks/search/", params=params)
+            except httpx.HTTPError as e:
+                raise DjangoAPIError(502, f"Lexical search request failed: {e}")
+        if response.status_code != 200:
+            raise DjangoAPIError(502, f"Lexical search rejected by Django: {response.text}")
+        return response.json()["matches"]
+
+    async def processed_files(self) -> list[str]:
+        """File hashes Django has marked as embedded (File.processed_flag)"""
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30.0) as client:
+            try:
+                response = await client.get("/api/data/files/processed/")
+            except httpx.HTTPError as e:
+                raise DjangoAPIError(502, f"Processed files request failed: {e}")
+        if response.status_code != 200:
+            raise DjangoAPIError(502, f"Processed files rejected by Django: {response.text}")
+        return response.json()["file_hashes"]
+
+    async def get_summary(self, file_hash: str) -> dict:
+        """Stored document summary with the model that wrote it, or None for an unknown file"""
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10.0) as client:
+            try:
+                response = await client.get(f"/api/data/files/{file_hash}/summary/")
+            except httpx.HTTPError as e:
+                raise DjangoAPIError(502, f"Summary request failed: {e}")
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise DjangoAPIError(502, f"Summary request rejected by Django: {response.text}")
+        return response.json()
+
+    async def save_summary(self, file_hash: str, summary: str, summary_model: str) -> None:
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10.0) as client:
+            try:
+                response = await client.put(
+                    f"/api/data/files/{file_hash}/summary/",
+                    json={"summary": summary, "summary_model": summary_model}
+                )
+            except httpx.HTTPError as e:
+                raise DjangoAPIError(502, f"Saving summary failed: {e}")
+        if response.status_code != 200:
+            raise DjangoAPIError(502, f"Summary rejected by Django: {response.text}")
+
+    async def document_chunks(self, file_hash: str, limit: int = 20) -> list[str]:
+        """Text of the first `limit` chunks of a document in reading order"""
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10.0) as client:
+            try:
+                response = await client.get("/api/data/chunks/", params={"file_hash": file_hash, "limit": limit})
+            except httpx.HTTPError as e:
+                raise DjangoAPIError(502, f"Chunk list request failed: {e}")
+        if response.status_code != 200:
+            raise DjangoAPIError(502, f"Chunk list rejected by Django: {response.text}")
+        return [chunk["text"] for chunk in response.json()["chunks"]]
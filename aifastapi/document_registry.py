@@ -0,0 +1,110 @@
+import hashlib
+import math
+import os
+import threading
+import time
+import numpy as np
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings using double hashing of one blake2b digest"""
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class EmbeddedDocumentRegistry:
+    """
+    Which documents already have vectors, kept in process instead of probing a
+    marker vector in the index. A bloom filter answers most "not embedded yet"
+    checks without touching the exact set, which settles everything else and
+    supports deletes. The filter is rebuilt when it fills up or when enough
+    deletes have left stale bits behind. Loaded at startup from Django's
+    processed files (File.processed_flag) and updated on ingest and delete.
+    """
+    def __init__(self, capacity: int = None, error_rate: float = None):
+        self.capacity = capacity or int(os.getenv("DOCUMENT_REGISTRY_CAPACITY", "100000"))
+        self.error_rate = error_rate or float(os.getenv("DOCUMENT_REGISTRY_ERROR_RATE", "0.001"))
+        self._lock = threading.Lock()
+        self._documents = set()
+        self._stale = 0
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self.loaded = False
+        self.checks = 0
+        self.bloom_negatives = 0
+        self.false_positives = 0
+
+    def _rebuild(self):
+        self.capacity = max(self.capacity, 2 * len(self._documents))
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        for file_id in self._documents:
+            self._bloom.add(file_id)
+        self._stale = 0
+
+    def load(self, file_ids):
+        """Replace the contents with `file_ids`, e.g. the processed files listed by Django"""
+        start = time.time()
+        with self._lock:
+            self._documents = set(file_ids)
+            self._rebuild()
+            self.loaded = True
+        print(f"📚 Loaded {len(self._documents)} embedded documents into the registry in {time.time()-start:.2f}s")
+
+    def contains(self, file_id: str) -> bool:
+        start = time.perf_counter()
+        with self._lock:
+            self.checks += 1
+            if file_id not in self._bloom:
+                self.bloom_negatives += 1
+                exists = False
+            else:
+                exists = file_id in self._documents
+                self.false_positives += 0 if exists else 1
+        print(f"🔍 Registry check [{file_id}]: {exists} (Checked in {(time.perf_counter()-start)*1e6:.1f}µs)")
+        return exists
+
+    def add(self, file_id: str):
+        with self._lock:
+            if file_id in self._documents:
+                return
+            self._documents.add(file_id)
+            if len(self._documents) > self.capacity:
+                self._rebuild()
+            else:
+                self._bloom.add(file_id)
+
+    def discard(self, file_id: str):
+        with self._lock:
+            if file_id not in self._documents:
+                return
+            self._documents.discard(file_id)
+            # Bloom bits cannot be cleared; rebuild once stale entries pile up
+            self._stale += 1
+            if self._stale > len(self._documents) // 4 + 64:
+                self._rebuild()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "loaded": self.loaded,
+                "capacity": self.capacity,
+                "bloom_bytes": int(self._bloom._bits.nbytes),
+                "checks": self.checks,
+                "bloom_negatives": self.bloom_negatives,
+                "false_positives": self.false_positives,
+            }
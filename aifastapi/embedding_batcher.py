@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+class EmbeddingBatcher:
+    """
+    Micro-batching queue in front of EmbeddingGenerator. Concurrent callers
+    are collected for up to `max_wait_ms` (or until `max_batch_size` texts are
+    waiting) and encoded in one forward pass per prefix.
+    """
+    def __init__(self, embedder, max_batch_size: int = None, max_wait_ms: float = None):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_seen_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None: return
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str, prefix: str = "query") -> Future:
+        """Queue one text for encoding and return a future for its vector"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, prefix, time.monotonic(), future))
+        return future
+
+    def embed(self, text: str, prefix: str = "query", timeout: float = None) -> np.ndarray:
+        return self.submit(text, prefix).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        waits_ms = [(started - enqueued) * 1000 for _, _, enqueued, _ in batch]
+
+        by_prefix = {}
+        for item in batch:
+            by_prefix.setdefault(item[1], []).append(item)
+
+        for prefix, items in by_prefix.items():
+            futures = [future for _, _, _, future in items]
+            try:
+                embeddings = self.embedder.generate_embeddings([text for text, _, _, _ in items], f"{prefix}-batch", prefix)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            # Each caller gets a row view of the batch array, not a copy
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._total_wait_ms += sum(waits_ms)
+            self._max_wait_seen_ms = max(self._max_wait_seen_ms, max(waits_ms))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "avg_queue_wait_ms": round(self._total_wait_ms / self._requests, 3) if self._requests else 0.0,
+                "max_queue_wait_ms": round(self._max_wait_seen_ms, 3),
+            }
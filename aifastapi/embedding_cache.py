@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+def chunk_cache_key(model_name: str, text: str) -> str:
+    """Content address for a chunk: model name plus the hash of its whitespace-normalised text"""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+class ChunkEmbeddingCache:
+    """
+    Persistent chunk embedding cache. Vectors live in an append-only
+    memory-mapped float32 file; a SQLite index maps content keys to slots and
+    tracks last use. Past `max_entries` the least recently used slots are freed
+    and reused by later inserts, so the file never grows beyond the cap.
+    Meant to be owned by a single process.
+    """
+    def __init__(self, path: str = None, dim: int = 768, max_entries: int = None):
+        self.path = path or os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+        self.dim = dim
+        self.max_entries = max_entries or int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "1000000"))
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._vectors_path = os.path.join(self.path, f"vectors-{dim}.f32")
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+        self._db.commit()
+
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        self._slots = os.path.getsize(self._vectors_path) // (dim * 4)
+        self._map()
+        self._encoded = 0
+        self._encode_seconds = 0.0
+
+    def _map(self):
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._slots, self.dim)) \
+            if self._slots else np.empty((0, self.dim), dtype=np.float32)
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Return {key: vector} for the keys that are cached"""
+        if not keys:
+            return {}
+        with self._lock:
+            found = {}
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._db.commit()
+            return {key: np.array(self._vectors[slot]) for key, slot in found.items()}
+
+    def put_many(self, items: dict):
+        """Store {key: vector}, evicting least recently used entries past max_entries"""
+        if not items:
+            return
+        with self._lock:
+            now = time.time()
+            new_keys = [key for key in items if not self._db.execute(
+                "SELECT 1 FROM entries WHERE key = ?", (key,)
+            ).fetchone()]
+            self._evict(len(new_keys))
+
+            free = [row[0] for row in self._db.execute(
+                "SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (len(new_keys),)
+            ).fetchall()]
+            self._db.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in free])
+
+            appended = len(new_keys) - len(free)
+            if appended > 0:
+                with open(self._vectors_path, "ab") as f:
+                    f.truncate((self._slots + appended) * self.dim * 4)
+                free += list(range(self._slots, self._slots + appended))
+                self._slots += appended
+                self._map()
+
+            for key, slot in zip(new_keys, free):
+                self._vectors[slot] = np.asarray(items[key], dtype=np.float32)
+            if new_keys:
+                self._vectors.flush()
+            self._db.executemany(
+                "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                [(key, slot, now) for key, slot in zip(new_keys, free)],
+            )
+            self._db.commit()
+
+    def _evict(self, incoming: int):
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count + incoming - self.max_entries
+        if overflow <= 0:
+            return
+        victims = self._db.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (overflow,)
+        ).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+        self._db.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)", [(slot,) for _, slot in victims])
+        print(f"🧹 Evicted {len(victims)} cached chunk embeddings")
+
+    def record_encode(self, count: int, seconds: float):
+        with self._lock:
+            self._encoded += count
+            self._encode_seconds += seconds
+
+    @property
+    def avg_encode_seconds(self) -> float:
+        """Average encoder time per chunk, used to estimate the time saved by hits"""
+        return self._encode_seconds / self._encoded if self._encoded else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {"entries": entries, "slots": self._slots, "max_entries": self.max_entries}
+
+def embed_with_cache(embedder, cache, texts: list[str], file_id: str, input_ids: list[list[int]] = None):
+    """
+    Embed `texts`, answering repeats from `cache` and only running the encoder
+    on misses. Returns (embeddings array, hits, encoder_seconds).
+    """
+    if cache is None:
+        start = time.time()
+        return embedder.generate_embeddings(texts, file_id, input_ids=input_ids), 0, time.time() - start
+
+    keys = [chunk_cache_key(embedder.model_name, text) for text in texts]
+    cached = cache.get_many(list(set(keys)))
+    # Encode each missing key once, even if it repeats within the batch
+    first_miss = {}
+    for i, key in enumerate(keys):
+        if key not in cached:
+            first_miss.setdefault(key, i)
+    misses = list(first_miss.values())
+
+    encoder_time = 0.0
+    dtype = getattr(embedder, "output_dtype", np.float32)
+    if misses:
+        start = time.time()
+        fresh = embedder.generate_embeddings(
+            [texts[i] for i in misses],
+            file_id,
+            input_ids=[input_ids[i] for i in misses] if input_ids is not None else None,
+        )
+        encoder_time = time.time() - start
+        cache.record_encode(len(misses), encoder_time)
+        computed = {keys[i]: emb for i, emb in zip(misses, fresh)}
+        cache.put_many(computed)
+        cached.update(computed)
+        dtype = fresh.dtype
+
+    embeddings = np.empty((len(texts), cache.dim), dtype=dtype)
+    for i, key in enumerate(keys):
+        embeddings[i] = cached[key]
+    return embeddings, len(texts) - len(misses), encoder_time
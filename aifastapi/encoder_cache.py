@@ -0,0 +1,57 @@
+import hashlib
+import os
+import threading
+import time
+import torch
+from cache_utils import LRUCache
+
+class EncoderOutputCache:
+    """
+    T5 encoder hidden states of the context part of a prompt, keyed by the
+    model and the ordered chunk ids it was built from. The question and the
+    context are encoded as two segments whose states are concatenated, so on
+    a hit only the short question segment runs through the encoder. Entries
+    are evicted LRU once their tensors exceed GEN_ENCODER_CACHE_MB.
+    """
+    def __init__(self, max_mb: float = None, max_entries: int = None):
+        max_mb = max_mb if max_mb is not None else float(os.getenv("GEN_ENCODER_CACHE_MB", "0"))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._cache = LRUCache(
+            max_entries=max_entries or int(os.getenv("GEN_ENCODER_CACHE_ENTRIES", "1024")),
+            max_bytes=self.max_bytes,
+            sizeof=lambda entry: entry[0].nelement() * entry[0].element_size()
+        )
+        self._lock = threading.Lock()
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def key(model_name: str, chunk_ids: list[str], context_ids: list[int]) -> tuple:
+        # The token digest keeps a re-ingested chunk with the same id from reusing stale states
+        digest = hashlib.blake2b(str(context_ids).encode("utf-8"), digest_size=16).hexdigest()
+        return model_name, tuple(chunk_ids), digest
+
+    def encode(self, encoder, question_ids: list[int], key: tuple, context_ids: list[int]) -> tuple[torch.Tensor, dict]:
+        """Return (seq_len, d_model) encoder states for question + context, and a timing report"""
+        start = time.time()
+        with torch.inference_mode():
+            question = encoder(input_ids=torch.tensor([question_ids])).last_hidden_state[0]
+            entry = self._cache.get(key)
+            if entry is None:
+                context_start = time.time()
+                context = encoder(input_ids=torch.tensor([context_ids])).last_hidden_state[0]
+                context_ms = (time.time() - context_start) * 1000
+                self._cache.put(key, (context, context_ms))
+                report = {"hit": False, "saved_ms": 0.0}
+            else:
+                context, context_ms = entry
+                with self._lock:
+                    self.saved_ms += context_ms
+                report = {"hit": True, "saved_ms": round(context_ms, 3)}
+        report["encode_ms"] = round((time.time() - start) * 1000, 3)
+        return torch.cat([question, context]), report
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        with self._lock:
+            stats["saved_ms"] = round(self.saved_ms, 3)
+        return stats
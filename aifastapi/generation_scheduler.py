@@ -0,0 +1,329 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import torch
+from transformers.cache_utils import EncoderDecoderCache
+from transformers.modeling_outputs import BaseModelOutput
+from inference_executor import InferenceQueueFull
+
+@dataclass
+class GenerationRequest:
+    input_ids: list
+    max_new_tokens: int = 150
+    do_sample: bool = False
+    temperature: float = 1.0
+    top_k: int = 0
+    top_p: float = 1.0
+    encode: object = None
+    deadline: float = None
+    on_token: object = None
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.monotonic)
+    started: float = 0.0
+    first_token: float = 0.0
+    tokens: list = field(default_factory=list)
+
+class GenerationScheduler:
+    """
+    Iteration-level continuous batching for an encoder-decoder model (T5).
+    One background thread owns the running batch and advances it a single
+    decode step at a time. Between steps, queued requests are encoded and
+    join the batch, and requests that produced EOS or their own
+    `max_new_tokens` leave it, so a short answer never waits for a long one.
+
+    The decoder self-attention cache is left-padded to a shared length and
+    masked, the cross-attention cache is right-padded to the longest prompt
+    and masked with the encoder attention mask. T5's relative position bias
+    only depends on distances, so a request joining late decodes exactly as
+    it would alone. Sampling settings are applied per row, and a request may
+    bring its own `encode` callable returning (seq_len, d_model) encoder
+    states, e.g. from an EncoderOutputCache, instead of prompt token ids.
+    Each new token is passed to the request's `on_token` callback as it is
+    sampled. A request with a `deadline` (time.monotonic() seconds) stops
+    early once an EMA of the decode step time says the next step would end
+    past it, after at least one token.
+    """
+    def __init__(self, model, eos_token_id: int, pad_token_id: int = 0, max_batch_size: int = None, max_queue: int = None):
+        self.model = model
+        self.eos_token_id = eos_token_id
+        self.pad_token_id = pad_token_id
+        self.decoder_start_token_id = model.config.decoder_start_token_id
+        self.max_batch_size = max_batch_size or int(os.getenv("GEN_BATCH_MAX_SIZE", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("GEN_BATCH_MAX_QUEUE", "64"))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._steps = 0
+        self._batched_rows = 0
+        self._completed = 0
+        self._rejected = 0
+        self._largest_batch = 0
+        self._total_wait_ms = 0.0
+        self._total_ttft_ms = 0.0
+        self._step_ms = None
+        self._deadline_stops = 0
+
+    def _ensure_started(self):
+        if self._thread is not None: return
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+                self._thread.start()
+
+    def submit(self, input_ids: list, max_new_tokens: int = 150, do_sample: bool = False,
+               temperature: float = 1.0, top_k: int = 0, top_p: float = 1.0, encode=None,
+               deadline: float = None, on_token=None) -> Future:
+        """Queue one tokenized prompt and return a future for its generated token ids"""
+        if self._queue.qsize() >= self.max_queue:
+            with self._stats_lock:
+                self._rejected += 1
+            raise InferenceQueueFull(f"Generation queue is full ({self._queue.qsize()} prompts waiting)")
+        self._ensure_started()
+        request = GenerationRequest(
+            list(input_ids), max_new_tokens, do_sample, temperature, top_k, top_p, encode, deadline, on_token
+        )
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, input_ids: list, timeout: float = None, **sampling) -> list:
+        return self.submit(input_ids, **sampling).result(timeout=timeout)
+
+    def _run(self):
+        running, state = [], None
+        while True:
+            joining = []
+            if not running:
+                joining.append(self._queue.get())
+            while len(running) + len(joining) < self.max_batch_size:
+                try:
+                    joining.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in joining:
+                for request in running + joining:
+                    if request is not None:
+                        request.future.cancel()
+                return
+
+            try:
+                with torch.inference_mode():
+                    if running:
+                        logits, state = self._step(running, state)
+                        running, state = self._advance(running, state, logits)
+                    if joining:
+                        logits, joined = self._prefill(joining)
+                        joining, joined = self._advance(joining, joined, logits)
+                        running, state = running + joining, self._merge(state, joined)
+            except Exception as e:
+                for request in running + joining:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                running, state = [], None
+
+    def _prefill(self, requests: list):
+        """Encode newly admitted prompts and run their first decoder step"""
+        now = time.monotonic()
+        for request in requests:
+            request.started = now
+        states = [request.encode() if request.encode is not None else None for request in requests]
+        plain = [row for row, request in enumerate(requests) if request.encode is None]
+        if plain:
+            longest = max(len(requests[row].input_ids) for row in plain)
+            input_ids = torch.full((len(plain), longest), self.pad_token_id, dtype=torch.long)
+            mask = torch.zeros((len(plain), longest), dtype=torch.long)
+            for i, row in enumerate(plain):
+                input_ids[i, :len(requests[row].input_ids)] = torch.tensor(requests[row].input_ids)
+                mask[i, :len(requests[row].input_ids)] = 1
+            hidden = self.model.get_encoder()(input_ids=input_ids, attention_mask=mask).last_hidden_state
+            for i, row in enumerate(plain):
+                states[row] = hidden[i, :len(requests[row].input_ids)]
+
+        longest = max(state.shape[0] for state in states)
+        hidden = states[0].new_zeros((len(requests), longest, states[0].shape[-1]))
+        encoder_mask = torch.zeros((len(requests), longest), dtype=torch.long)
+        for row, state in enumerate(states):
+            hidden[row, :state.shape[0]] = state
+            encoder_mask[row, :state.shape[0]] = 1
+        encoder_outputs = BaseModelOutput(last_hidden_state=hidden)
+        decoder_input_ids = torch.full((len(requests), 1), self.decoder_start_token_id, dtype=torch.long)
+        outputs = self.model(
+            encoder_outputs=encoder_outputs,
+            attention_mask=encoder_mask,
+            decoder_input_ids=decoder_input_ids,
+            decoder_attention_mask=torch.ones_like(decoder_input_ids),
+            past_key_values=EncoderDecoderCache.from_legacy_cache(None),
+            use_cache=True,
+        )
+        state = {
+            "cache": outputs.past_key_values.to_legacy_cache(),
+            "encoder_mask": encoder_mask,
+            "decoder_mask": torch.ones_like(decoder_input_ids),
+            "encoder_outputs": encoder_outputs,
+        }
+        return outputs.logits[:, -1, :], state
+
+    def _step(self, requests: list, state: dict):
+        """One decode step for every running request"""
+        start = time.monotonic()
+        last_tokens = torch.tensor([[request.tokens[-1]] for request in requests], dtype=torch.long)
+        decoder_mask = torch.cat([state["decoder_mask"], torch.ones_like(last_tokens)], dim=1)
+        outputs = self.model(
+            encoder_outputs=state["encoder_outputs"],
+            attention_mask=state["encoder_mask"],
+            decoder_input_ids=last_tokens,
+            decoder_attention_mask=decoder_mask,
+            past_key_values=EncoderDecoderCache.from_legacy_cache(state["cache"]),
+            use_cache=True,
+        )
+        state = {**state, "cache": outputs.past_key_values.to_legacy_cache(), "decoder_mask": decoder_mask}
+        step_ms = (time.monotonic() - start) * 1000
+        self._step_ms = step_ms if self._step_ms is None else 0.9 * self._step_ms + 0.1 * step_ms
+        with self._stats_lock:
+            self._steps += 1
+            self._batched_rows += len(requests)
+            self._largest_batch = max(self._largest_batch, len(requests))
+        return outputs.logits[:, -1, :], state
+
+    def _sample(self, requests: list, logits: torch.Tensor) -> list:
+        logits = logits.float()
+        tokens = logits.argmax(dim=-1)
+        for row, request in enumerate(requests):
+            if not request.do_sample:
+                continue
+            scores = logits[row] / max(request.temperature, 1e-5)
+            if request.top_k:
+                threshold = torch.topk(scores, min(request.top_k, scores.numel())).values[-1]
+                scores = scores.masked_fill(scores < threshold, float("-inf"))
+            if request.top_p < 1.0:
+                sorted_scores, order = torch.sort(scores, descending=True)
+                cumulative = sorted_scores.softmax(dim=-1).cumsum(dim=-1)
+                remove = cumulative > request.top_p
+                remove[1:] = remove[:-1].clone()
+                remove[0] = False
+                scores = scores.masked_fill(remove.scatter(0, order, remove), float("-inf"))
+            tokens[row] = torch.multinomial(scores.softmax(dim=-1), 1)[0]
+        return tokens.tolist()
+
+    def _advance(self, requests: list, state: dict, logits: torch.Tensor):
+        """Append one token per request, resolve finished ones and drop their rows"""
+        now = time.monotonic()
+        next_step_end = now + (self._step_ms or 0.0) / 1000
+        keep = []
+        for row, (request, token) in enumerate(zip(requests, self._sample(requests, logits))):
+            if not request.tokens:
+                request.first_token = now
+            request.tokens.append(token)
+            if request.on_token is not None:
+                try:
+                    request.on_token(token)
+                except Exception as e:
+                    print(f"⚠️ Token callback failed: {e}")
+            out_of_time = request.deadline is not None and next_step_end > request.deadline
+            if token == self.eos_token_id or len(request.tokens) >= request.max_new_tokens or out_of_time:
+                with self._stats_lock:
+                    if out_of_time and token != self.eos_token_id and len(request.tokens) < request.max_new_tokens:
+                        self._deadline_stops += 1
+                    self._completed += 1
+                    self._total_wait_ms += (request.started - request.enqueued) * 1000
+                    self._total_ttft_ms += (request.first_token - request.enqueued) * 1000
+                request.future.set_result(request.tokens)
+            else:
+                keep.append(row)
+        if len(keep) == len(requests):
+            return requests, state
+        if not keep:
+            return [], None
+        return [requests[row] for row in keep], self._select(state, keep)
+
+    def _select(self, state: dict, rows: list) -> dict:
+        """Keep `rows` of the batch and trim padding no remaining row needs"""
+        index = torch.tensor(rows, dtype=torch.long)
+        decoder_mask = state["decoder_mask"][index]
+        encoder_mask = state["encoder_mask"][index]
+        first = int(decoder_mask.any(dim=0).long().argmax())
+        source = int(encoder_mask.sum(dim=1).max())
+        cache = tuple(
+            (
+                self_k[index, :, first:], self_v[index, :, first:],
+                cross_k[index, :, :source], cross_v[index, :, :source],
+            )
+            for self_k, self_v, cross_k, cross_v in state["cache"]
+        )
+        hidden = state["encoder_outputs"].last_hidden_state[index, :source]
+        return {
+            "cache": cache,
+            "decoder_mask": decoder_mask[:, first:],
+            "encoder_mask": encoder_mask[:, :source],
+            "encoder_outputs": type(state["encoder_outputs"])(last_hidden_state=hidden),
+        }
+
+    def _merge(self, running: dict, joined: dict) -> dict:
+        """Stack two batches, left-padding decoder cache and right-padding encoder cache"""
+        if running is None:
+            return joined
+        if joined is None:
+            return running
+
+        def pad(tensor, dim, length, left):
+            missing = length - tensor.shape[dim]
+            if missing <= 0:
+                return tensor
+            shape = list(tensor.shape)
+            shape[dim] = missing
+            filler = tensor.new_zeros(shape)
+            return torch.cat([filler, tensor] if left else [tensor, filler], dim=dim)
+
+        target = max(running["decoder_mask"].shape[1], joined["decoder_mask"].shape[1])
+        source = max(running["encoder_mask"].shape[1], joined["encoder_mask"].shape[1])
+        cache = tuple(
+            tuple(
+                torch.cat([
+                    pad(a, 2, target if i < 2 else source, left=i < 2),
+                    pad(b, 2, target if i < 2 else source, left=i < 2),
+                ])
+                for i, (a, b) in enumerate(zip(old, new))
+            )
+            for old, new in zip(running["cache"], joined["cache"])
+        )
+        hidden = torch.cat([
+            pad(running["encoder_outputs"].last_hidden_state, 1, source, left=False),
+            pad(joined["encoder_outputs"].last_hidden_state, 1, source, left=False),
+        ])
+        return {
+            "cache": cache,
+            "decoder_mask": torch.cat([
+                pad(running["decoder_mask"], 1, target, left=True),
+                pad(joined["decoder_mask"], 1, target, left=True),
+            ]),
+            "encoder_mask": torch.cat([
+                pad(running["encoder_mask"], 1, source, left=False),
+                pad(joined["encoder_mask"], 1, source, left=False),
+            ]),
+            "encoder_outputs": type(running["encoder_outputs"])(last_hidden_state=hidden),
+        }
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "queued": self._queue.qsize(),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "decode_steps": self._steps,
+                "avg_batch_size": round(self._batched_rows / self._steps, 2) if self._steps else 0.0,
+                "largest_batch": self._largest_batch,
+                "deadline_stops": self._deadline_stops,
+                "avg_step_ms": round(self._step_ms, 3) if self._step_ms is not None else None,
+                "avg_queue_wait_ms": round(self._total_wait_ms / self._completed, 3) if self._completed else 0.0,
+                "avg_time_to_first_token_ms": round(self._total_ttft_ms / self._completed, 3) if self._completed else 0.0,
+            }
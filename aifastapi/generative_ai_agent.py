@@ -1,12 +1,33 @@
 from ai_agents import GenerativeAI
 
+SUMMARY_QUESTION = "What is the main topic of this document?"
+
 class ResponseService:
     def __init__(self):
         self.generator = GenerativeAI()
     
+    @property
+    def summary_model(self) -> str:
+        """Stored summaries written by any other model are regenerated"""
+        return self.generator.model_name
+    
     def generate_answer(self, file_id, text):
-        question = "What is the main topic of this document?"
-        return self.generator.generate_response(file_id, question, text[:2000])
+        return self.generator.generate_response(file_id, SUMMARY_QUESTION, text)
+    
+    def submit_answer(self, file_id, text):
+        return self.generator.submit_response(file_id, SUMMARY_QUESTION, text)
+    
+    def pack_context(self, query: str, chunks: list[str]):
+        return self.generator.pack(query, chunks)
+    
+    def generate_answer_from_context(self, query: str, context, file_id: str = "search", chunk_ids: list[str] = None,
+                                     packed=None, deadline: float = None, report: dict = None):
+        # The generator may be a worker pool proxy, which cannot fill in a dict owned by this process
+        response, generated = self.generator.generate_response_with_report(file_id, query, context, chunk_ids, packed, deadline)
+        if report is not None:
+            report.update(generated)
+        return response
     
-    def generate_answer_from_context(self, query: str, context: str, file_id: str = "search"):
-        return self.generator.generate_response(file_id, query, context)
+    def submit_answer_from_context(self, query: str, context, file_id: str = "search", chunk_ids: list[str] = None,
+                                   packed=None, deadline: float = None, on_text=None, report: dict = None):
+        return self.generator.submit_response(file_id, query, context, chunk_ids, packed, deadline, on_text, report)
@@ -0,0 +1,37 @@
+from vector_store import make_match
+
+def reciprocal_rank_fusion(rankings: dict, k: int = 60) -> list:
+    """
+    Fuse ranked match lists from several retrievers, e.g. {"vector": [...],
+    "lexical": [...]}. Each match scores sum(1 / (k + rank)) over the lists it
+    appears in, so chunks both retrievers agree on rise to the top without
+    having to compare cosine and text-rank scores. Returns matches with the
+    fused score, the first-seen metadata and the per-retriever ranks.
+    """
+    fused = {}
+    for retriever, matches in rankings.items():
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.get(match.id)
+            if entry is None:
+                entry = fused[match.id] = {"score": 0.0, "metadata": match.metadata, "ranks": {}}
+            entry["score"] += 1.0 / (k + rank)
+            entry["ranks"][retriever] = rank
+
+    ordered = sorted(fused.items(), key=lambda item: item[1]["score"], reverse=True)
+    results = []
+    for match_id, entry in ordered:
+        match = make_match(match_id, entry["score"], entry["metadata"])
+        match.ranks = entry["ranks"]
+        results.append(match)
+    return results
+
+def lexical_matches(rows: list[dict]) -> list:
+    """Turn rows from the Django lexical endpoint into vector-store style matches"""
+    return [
+        make_match(row["id"], row["score"], {
+            "text": row["text"],
+            "file_id": row["file_id"],
+            "chunk_number": row["chunk_number"],
+        })
+        for row in rows
+    ]
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class InferenceQueueFull(Exception):
+    """Raised when the executor already holds `workers + queue_depth` jobs"""
+
+class InferenceQueueTimeout(Exception):
+    """Raised when a job waited longer than its queue timeout without starting"""
+
+class InferenceExecutor:
+    """
+    Bounded thread pool that runs blocking model calls on behalf of the async
+    FastAPI handlers, so the event loop keeps serving while models run.
+    """
+    def __init__(self, workers: int = None, queue_depth: int = None, queue_timeout: float = None):
+        self.workers = workers or int(os.getenv("INFERENCE_WORKERS", "2"))
+        self.queue_depth = queue_depth if queue_depth is not None else int(os.getenv("INFERENCE_QUEUE_DEPTH", "32"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv("INFERENCE_QUEUE_TIMEOUT", "30"))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+
+    async def run(self, fn, *args, queue_timeout: float = None, **kwargs):
+        """Run `fn(*args, **kwargs)` on the pool and await its result"""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                self._rejected += 1
+                raise InferenceQueueFull(f"Inference queue is full ({self._pending} jobs pending)")
+            self._pending += 1
+
+        enqueued = time.monotonic()
+
+        def job():
+            wait_ms = (time.monotonic() - enqueued) * 1000
+            with self._lock:
+                self._running += 1
+                self._total_wait_ms += wait_ms
+                self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            future = self._pool.submit(job)
+            wrapped = asyncio.wrap_future(future)
+            timeout = self.queue_timeout if queue_timeout is None else queue_timeout
+            if timeout:
+                done, _ = await asyncio.wait({wrapped}, timeout=timeout)
+                # Only jobs that never started are dropped; running jobs are awaited
+                if not done and future.cancel():
+                    with self._lock:
+                        self._timed_out += 1
+                    raise InferenceQueueTimeout(f"Inference job waited more than {timeout:.1f}s in queue")
+            return await wrapped
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "queue_timeout_s": self.queue_timeout,
+                "queued": self._pending - self._running,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_queue_wait_ms": round(self._total_wait_ms / started, 3) if started else 0.0,
+                "max_queue_wait_ms": round(self._max_wait_ms, 3),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
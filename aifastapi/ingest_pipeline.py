@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+import time
+from text_processor import TextProcessor
+from embedding_cache import embed_with_cache
+from vector_store import owner_namespace
+
+_DONE = object()
+
+class IngestPipeline:
+    """
+    Streams a PDF through extract → chunk → embed → upsert stages connected by
+    bounded queues. Stages overlap, so the first vectors land while later pages
+    are still being read, and at most `queue_size` batches wait between stages.
+    Several upsert workers take embedded batches at once, so vector store
+    requests for consecutive batches are in flight together.
+    Embedding calls go through `run_model(fn, *args, **kwargs)`, so a caller can
+    put just the model work on its inference executor; by default they run
+    on the embed stage's own thread.
+    """
+    def __init__(self, embedder, vector_store, batch_size: int = None, queue_size: int = None, embed_workers: int = None, upsert_workers: int = None, cache=None, registry=None, run_model=None):
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.cache = cache
+        self.registry = registry
+        self.run_model = run_model or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "100"))
+        self.queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+        self.embed_workers = embed_workers or int(os.getenv("INGEST_EMBED_WORKERS", "2"))
+        self.upsert_workers = upsert_workers or int(os.getenv("INGEST_UPSERT_WORKERS", "4"))
+
+    def run(self, data: bytes, file_id: str, on_batch=None, owner_id: str = None) -> dict:
+        """
+        Ingest one PDF. `on_batch(start_index, chunks, vector_ids)` is called from
+        the upsert stage for every batch of chunk dicts, e.g. to persist chunk rows.
+        Calls never overlap, but batches can arrive out of order.
+        `owner_id` (the uploader) is written to every vector's metadata and
+        picks the namespace, so searches can be scoped to one user's files.
+        """
+        start = time.time()
+        namespace = owner_namespace(owner_id)
+        embed = self.registry is None or not self.registry.contains(file_id)
+        if not embed:
+            print(f"⚠️ Embeddings already exist for {file_id}. Only chunking.")
+
+        text_processor = TextProcessor(self.embedder.tokenizer)
+        to_embed = queue.Queue(maxsize=self.queue_size)
+        to_upsert = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        lock = threading.Lock()
+        persist_lock = threading.Lock()
+        errors = []
+        timings = {"extract": 0.0, "chunk": 0.0, "embed": 0.0, "upsert": 0.0, "persist": 0.0}
+        counts = {"chunks": 0, "first_vector": None, "cache_hits": 0, "lookups": 0, "embedding": self.embed_workers}
+
+        def add_time(stage, since):
+            with lock:
+                timings[stage] += time.time() - since
+
+        def fail(e):
+            with lock:
+                errors.append(e)
+            stop.set()
+
+        def put(q, item):
+            # Give up instead of blocking forever once another stage has failed
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def timed_pages():
+            pages = text_processor.iter_pages(data)
+            while True:
+                since = time.time()
+                try:
+                    page = next(pages)
+                except StopIteration:
+                    return
+                finally:
+                    add_time("extract", since)
+                yield page
+
+        def produce():
+            try:
+                batch, batch_start, index = [], 0, 0
+                chunks = text_processor.iter_chunks(timed_pages())
+                while True:
+                    since = time.time()
+                    chunk = next(chunks, None)
+                    add_time("chunk", since)
+                    if chunk is None:
+                        break
+                    batch.append(chunk)
+                    index += 1
+                    if len(batch) == self.batch_size:
+                        if not put(to_embed, (batch_start, batch)):
+                            return
+                        batch, batch_start = [], index
+                if batch:
+                    put(to_embed, (batch_start, batch))
+                with lock:
+                    counts["chunks"] = index
+            except Exception as e:
+                fail(e)
+            finally:
+                for _ in range(self.embed_workers):
+                    put(to_embed, _DONE)
+
+        def embed_stage():
+            try:
+                while True:
+                    item = get(to_embed)
+                    if item is _DONE:
+                        break
+                    batch_start, batch = item
+                    embeddings = None
+                    if embed:
+                        since = time.time()
+                        embeddings, hits, _ = self.run_model(
+                            embed_with_cache,
+                            self.embedder,
+                            self.cache,
+                            [chunk["text"] for chunk in batch],
+                            file_id,
+                            input_ids=[chunk["input_ids"] for chunk in batch],
+                        )
+                        add_time("embed", since)
+                        with lock:
+                            counts["cache_hits"] += hits
+                            counts["lookups"] += len(batch)
+                    if not put(to_upsert, (batch_start, batch, embeddings)):
+                        break
+            except Exception as e:
+                fail(e)
+            finally:
+                with lock:
+                    counts["embedding"] -= 1
+                    last = counts["embedding"] == 0
+                # The last embed worker to finish releases every upsert worker
+                if last:
+                    for _ in range(self.upsert_workers):
+                        put(to_upsert, _DONE)
+
+        def upsert_stage():
+            try:
+                while True:
+                    item = get(to_upsert)
+                    if item is _DONE:
+                        break
+                    batch_start, batch, embeddings = item
+                    vector_ids = [None] * len(batch)
+                    if embeddings is not None:
+                        vector_ids = [f"{file_id}-{batch_start + i}" for i in range(len(batch))]
+                        vectors = [{
+                            "id": vector_id,
+                            "values": emb,
+                            "metadata": {
+                                "text": chunk["text"],
+                                "file_id": file_id,
+                                "chunk_number": batch_start + i,
+                                "start_char": chunk["start_char"],
+                                "end_char": chunk["end_char"],
+                                **({"owner_id": owner_id} if owner_id else {}),
+                            }
+                        } for i, (vector_id, chunk, emb) in enumerate(zip(vector_ids, batch, embeddings))]
+                        seconds = self.vector_store.upload_vectors(vectors, namespace)
+                        with lock:
+                            timings["upsert"] += seconds
+                            if counts["first_vector"] is None:
+                                counts["first_vector"] = time.time() - start
+                    if on_batch:
+                        with persist_lock:
+                            since = time.time()
+                            on_batch(batch_start, batch, vector_ids)
+                            add_time("persist", since)
+            except Exception as e:
+                fail(e)
+
+        threads = [threading.Thread(target=produce, name="ingest-chunk")]
+        threads += [threading.Thread(target=embed_stage, name=f"ingest-embed-{i}") for i in range(self.embed_workers)]
+        threads += [threading.Thread(target=upsert_stage, name=f"ingest-upsert-{i}") for i in range(self.upsert_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            print(f"❌ Ingest pipeline failed for {file_id}: {errors[0]}")
+            raise errors[0]
+
+        if embed and self.registry is not None:
+            self.registry.add(file_id)
+
+        timings["total"] = time.time() - start
+        if counts["first_vector"] is not None:
+            timings["first_vector"] = counts["first_vector"]
+
+        print(f"\n⏱️ Pipelined ingest for {file_id} ({counts['chunks']} chunks):")
+        for stage, seconds in timings.items():
+            print(f"- {stage}: {seconds:.2f}s")
+
+        cache_report = None
+        if self.cache is not None and counts["lookups"]:
+            cache_report = {
+                "hits": counts["cache_hits"],
+                "lookups": counts["lookups"],
+                "hit_rate": round(counts["cache_hits"] / counts["lookups"], 4),
+                "saved_encoder_s": round(counts["cache_hits"] * self.cache.avg_encode_seconds, 4),
+            }
+            print(f"- chunk cache: {cache_report['hits']}/{cache_report['lookups']} hits "
+                  f"({cache_report['hit_rate']:.0%}), ~{cache_report['saved_encoder_s']:.2f}s encoder time saved")
+
+        return {"num_chunks": counts["chunks"], "embedded": embed, "timings": timings, "cache": cache_report}
@@ -0,0 +1,43 @@
+import os
+import threading
+from collections import deque
+import numpy as np
+
+class LatencyTracker:
+    """
+    Rolling window of per-request latencies for /metrics. Time to first
+    token is the headline number for /search, since answers stream; total
+    time and how often generation was cut short by its latency budget are
+    tracked next to it.
+    """
+    def __init__(self, window: int = None):
+        self.window = window or int(os.getenv("LATENCY_WINDOW", "1000"))
+        self._lock = threading.Lock()
+        self._ttft_ms = deque(maxlen=self.window)
+        self._total_ms = deque(maxlen=self.window)
+        self.requests = 0
+        self.deadline_stops = 0
+
+    def record(self, ttft_ms: float, total_ms: float, finish_reason: str = None):
+        with self._lock:
+            self._ttft_ms.append(ttft_ms)
+            self._total_ms.append(total_ms)
+            self.requests += 1
+            self.deadline_stops += 1 if finish_reason == "deadline" else 0
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": None, "p90": None, "p99": None}
+        p50, p90, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 90, 99])
+        return {"p50": round(p50, 3), "p90": round(p90, 3), "p99": round(p99, 3)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "window": len(self._ttft_ms),
+                "time_to_first_token_ms": self._percentiles(self._ttft_ms),
+                "total_ms": self._percentiles(self._total_ms),
+                "deadline_stops": self.deadline_stops,
+            }
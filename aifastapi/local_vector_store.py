@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from vector_store import VectorStore, make_match, make_result
+
+try:
+    import hnswlib
+except ImportError:  # exact search only
+    hnswlib = None
+
+_DTYPES = {"float32": np.float32, "float16": np.float16}
+_BLOCK_ROWS = 65536
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq, $ne, $in, $nin, $gt(e), $lt(e), $exists, $and, $or)"""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, part) for part in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, part) for part in condition):
+                return False
+            continue
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        value = metadata.get(key)
+        for op, operand in condition.items():
+            if op == "$exists":
+                ok = (key in metadata) == bool(operand)
+            elif key not in metadata:
+                ok = op in ("$ne", "$nin")
+            elif op == "$eq":
+                ok = value == operand
+            elif op == "$ne":
+                ok = value != operand
+            elif op == "$in":
+                ok = value in operand
+            elif op == "$nin":
+                ok = value not in operand
+            elif op == "$gt":
+                ok = value > operand
+            elif op == "$gte":
+                ok = value >= operand
+            elif op == "$lt":
+                ok = value < operand
+            elif op == "$lte":
+                ok = value <= operand
+            else:
+                raise ValueError(f"Unsupported filter operator {op}")
+            if not ok:
+                return False
+    return True
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store. Vectors live in a memory-mapped float32/float16
+    matrix with a SQLite index for ids, namespaces and metadata. Small corpora
+    are searched exactly with one blocked matmul plus argpartition; once
+    LOCAL_HNSW_THRESHOLD vectors are stored (and hnswlib is installed) an HNSW
+    graph is built on the next query and kept up to date by later upserts.
+    Scores are cosine similarities, matching a cosine Pinecone index.
+    Meant to be owned by a single process.
+    """
+    def __init__(self, path: str = None, dim: int = None, dtype: str = None, hnsw_threshold: int = None):
+        self.path = path or os.getenv("LOCAL_VECTOR_STORE_DIR", "vector_store")
+        self.dim = dim or int(os.getenv("EMBEDDING_DIM", "768"))
+        dtype = dtype or os.getenv("LOCAL_VECTOR_DTYPE", "float32")
+        if dtype not in _DTYPES:
+            raise ValueError(f"LOCAL_VECTOR_DTYPE must be one of {', '.join(_DTYPES)}")
+        self.dtype = _DTYPES[dtype]
+        self.hnsw_threshold = hnsw_threshold if hnsw_threshold is not None \
+            else int(os.getenv("LOCAL_HNSW_THRESHOLD", "20000"))
+        self.hnsw_m = int(os.getenv("LOCAL_HNSW_M", "16"))
+        self.hnsw_ef_construction = int(os.getenv("LOCAL_HNSW_EF_CONSTRUCTION", "200"))
+        self.hnsw_ef = int(os.getenv("LOCAL_HNSW_EF", "64"))
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(self.path, f"vectors-{self.dim}.{dtype}")
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (id TEXT NOT NULL, namespace TEXT NOT NULL, slot INTEGER NOT NULL, "
+            "file_id TEXT, metadata TEXT NOT NULL, PRIMARY KEY (namespace, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vectors_file_id ON vectors (file_id)")
+        self._db.commit()
+
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        self._capacity = os.path.getsize(self._vectors_path) // (self.dim * np.dtype(self.dtype).itemsize)
+        self._map()
+
+        # In-memory view of the index: slot -> record, plus lookups by id, file and namespace
+        self._active = np.zeros(self._capacity, dtype=bool)
+        self._norms = np.zeros(self._capacity, dtype=np.float32)
+        self._records = [None] * self._capacity
+        self._slots = {}
+        self._by_file = {}
+        self._by_namespace = {}
+        self._graph = None
+        rows = self._db.execute("SELECT id, namespace, slot, file_id, metadata FROM vectors").fetchall()
+        for vector_id, namespace, slot, file_id, metadata in rows:
+            self._index_slot(slot, vector_id, namespace, file_id, json.loads(metadata))
+        if rows:
+            self._norms[:self._capacity] = self._row_norms(np.arange(self._capacity))
+        self._queries = 0
+        self._query_seconds = 0.0
+
+    def _map(self):
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(self._capacity, self.dim)) \
+            if self._capacity else np.empty((0, self.dim), dtype=self.dtype)
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self._capacity * 2, 1024)
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * np.dtype(self.dtype).itemsize)
+        grow = capacity - self._capacity
+        self._active = np.concatenate([self._active, np.zeros(grow, dtype=bool)])
+        self._norms = np.concatenate([self._norms, np.zeros(grow, dtype=np.float32)])
+        self._records += [None] * grow
+        self._capacity = capacity
+        self._map()
+        if self._graph is not None:
+            self._graph.resize_index(capacity)
+
+    def _row_norms(self, slots) -> np.ndarray:
+        norms = np.empty(len(slots), dtype=np.float32)
+        for i in range(0, len(slots), _BLOCK_ROWS):
+            block = np.asarray(self._vectors[slots[i:i + _BLOCK_ROWS]], dtype=np.float32)
+            norms[i:i + len(block)] = np.linalg.norm(block, axis=1)
+        return norms
+
+    def _index_slot(self, slot, vector_id, namespace, file_id, metadata):
+        self._active[slot] = True
+        self._records[slot] = (vector_id, namespace, metadata)
+        self._slots[(namespace, vector_id)] = slot
+        self._by_namespace.setdefault(namespace, set()).add(slot)
+        if file_id is not None:
+            self._by_file.setdefault(file_id, set()).add(slot)
+
+    def _unindex_slot(self, slot):
+        vector_id, namespace, metadata = self._records[slot]
+        self._slots.pop((namespace, vector_id), None)
+        self._by_namespace.get(namespace, set()).discard(slot)
+        file_id = metadata.get("file_id")
+        if file_id in self._by_file:
+            self._by_file[file_id].discard(slot)
+            if not self._by_file[file_id]:
+                del self._by_file[file_id]
+        self._records[slot] = None
+        self._active[slot] = False
+        if self._graph is not None:
+            self._graph.mark_deleted(int(slot))
+
+    def upload_vectors(self, vectors: list, namespace: str = "") -> float:
+        start = time.time()
+        if not vectors:
+            return 0.0
+        with self._lock:
+            # Overwrite existing ids in place, put new ones into free slots
+            slots = [self._slots.get((namespace, vector["id"])) for vector in vectors]
+            new = len({vector["id"] for vector, slot in zip(vectors, slots) if slot is None})
+            free = np.flatnonzero(~self._active)
+            if len(free) < new:
+                self._grow(self._capacity + new - len(free))
+                free = np.flatnonzero(~self._active)
+            free = iter(free.tolist())
+            assigned = {}
+            for i, (vector, slot) in enumerate(zip(vectors, slots)):
+                if slot is None:
+                    slot = assigned.get(vector["id"])
+                    if slot is None:
+                        slot = assigned[vector["id"]] = next(free)
+                    slots[i] = slot
+
+            values = np.stack([np.asarray(vector["values"], dtype=np.float32) for vector in vectors])
+            if values.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {values.shape[1]}")
+            rows = []
+            for slot, vector in zip(slots, vectors):
+                if self._active[slot]:
+                    self._unindex_slot(slot)
+                metadata = dict(vector.get("metadata") or {})
+                self._index_slot(slot, vector["id"], namespace, metadata.get("file_id"), metadata)
+                rows.append((vector["id"], namespace, slot, metadata.get("file_id"), json.dumps(metadata)))
+
+            slots = np.asarray(slots)
+            self._vectors[slots] = values.astype(self.dtype)
+            self._vectors.flush()
+            self._norms[slots] = np.linalg.norm(values, axis=1)
+            if self._graph is not None:
+                self._graph.add_items(values, slots)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (id, namespace, slot, file_id, metadata) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+        return time.time() - start
+
+    def fetch(self, ids: list[str], namespace: str = "") -> dict:
+        with self._lock:
+            found = {}
+            for vector_id in ids:
+                slot = self._slots.get((namespace, vector_id))
+                if slot is not None:
+                    found[vector_id] = {
+                        "values": np.array(self._vectors[slot], dtype=np.float32),
+                        "metadata": dict(self._records[slot][2]),
+                    }
+            return found
+
+    def delete_file(self, file_id: str, namespace: str = "") -> int:
+        start = time.time()
+        with self._lock:
+            slots = [slot for slot in self._by_file.get(file_id, ()) if self._records[slot][1] == namespace]
+            for slot in slots:
+                self._unindex_slot(slot)
+            self._db.execute("DELETE FROM vectors WHERE file_id = ? AND namespace = ?", (file_id, namespace))
+            self._db.commit()
+        print(f"🗑️ Deleted {len(slots)} vectors for {file_id} in {time.time()-start:.4f}s")
+        return len(slots)
+
+    def _candidates(self, namespace: str, filter: dict):
+        """Slots allowed by the namespace and filter, or None when every active slot is allowed"""
+        allowed = None
+        if len(self._by_namespace) > 1 or namespace not in self._by_namespace:
+            allowed = self._by_namespace.get(namespace, set())
+        if filter:
+            # Use the file index for the common file_id condition before scanning metadata
+            condition = filter.get("file_id")
+            if condition is not None:
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                file_ids = [condition["$eq"]] if "$eq" in condition else condition.get("$in")
+                if file_ids is not None:
+                    by_file = set().union(*(self._by_file.get(file_id, set()) for file_id in file_ids))
+                    allowed = by_file if allowed is None else allowed & by_file
+            pool = np.flatnonzero(self._active).tolist() if allowed is None else allowed
+            allowed = {slot for slot in pool if matches_filter(self._records[slot][2], filter)}
+        return allowed
+
+    def _exact(self, query: np.ndarray, top_k: int, allowed):
+        if allowed is None:
+            slots = np.flatnonzero(self._active)
+            high = int(slots[-1]) + 1 if len(slots) else 0
+            scores = np.full(high, -np.inf, dtype=np.float32)
+            for i in range(0, high, _BLOCK_ROWS):
+                block = np.asarray(self._vectors[i:i + _BLOCK_ROWS], dtype=np.float32)
+                scores[i:i + len(block)] = block[:high - i] @ query
+            scores /= np.maximum(self._norms[:high], 1e-12)
+            scores[~self._active[:high]] = -np.inf
+        else:
+            slots = np.fromiter(allowed, dtype=np.int64, count=len(allowed))
+            scores = np.empty(len(slots), dtype=np.float32)
+            for i in range(0, len(slots), _BLOCK_ROWS):
+                part = slots[i:i + _BLOCK_ROWS]
+                scores[i:i + len(part)] = np.asarray(self._vectors[part], dtype=np.float32) @ query
+            scores /= np.maximum(self._norms[slots], 1e-12)
+
+        k = min(top_k, len(slots))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        if allowed is None:
+            return [(int(slot), float(scores[slot])) for slot in best]
+        return [(int(slots[i]), float(scores[i])) for i in best]
+
+    def _ensure_graph(self) -> bool:
+        if self._graph is not None:
+            return True
+        count = int(self._active.sum())
+        if hnswlib is None or not self.hnsw_threshold or count < self.hnsw_threshold:
+            return False
+        start = time.time()
+        graph = hnswlib.Index(space="cosine", dim=self.dim)
+        graph.init_index(max_elements=self._capacity, ef_construction=self.hnsw_ef_construction, M=self.hnsw_m)
+        slots = np.flatnonzero(self._active)
+        for i in range(0, len(slots), _BLOCK_ROWS):
+            part = slots[i:i + _BLOCK_ROWS]
+            graph.add_items(np.asarray(self._vectors[part], dtype=np.float32), part)
+        graph.set_ef(self.hnsw_ef)
+        self._graph = graph
+        print(f"🕸️ Built HNSW graph over {count} vectors in {time.time()-start:.2f}s")
+        return True
+
+    def _approximate(self, query: np.ndarray, top_k: int, allowed):
+        count = int(self._active.sum()) if allowed is None else len(allowed)
+        k = min(top_k, count)
+        if k == 0:
+            return []
+        self._graph.set_ef(max(self.hnsw_ef, k))
+        labels, distances = self._graph.knn_query(
+            query, k=k, filter=None if allowed is None else allowed.__contains__
+        )
+        return [(int(slot), 1.0 - float(distance)) for slot, distance in zip(labels[0], distances[0])]
+
+    def query_top_k(self, vector, top_k: int = 5, namespace: str = "", filter: dict = None):
+        start = time.time()
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            allowed = self._candidates(namespace, filter)
+            hits = None
+            # Small filtered sets are cheaper to scan exactly than to walk the graph
+            if (allowed is None or len(allowed) >= self.hnsw_threshold) and self._ensure_graph():
+                try:
+                    hits = self._approximate(query, top_k, allowed)
+                except RuntimeError:
+                    hits = None  # graph could not return k results for this filter
+            if hits is None:
+                query = query / max(float(np.linalg.norm(query)), 1e-12)
+                hits = self._exact(query, top_k, allowed)
+            matches = [
+                make_match(self._records[slot][0], score, dict(self._records[slot][2]))
+                for slot, score in hits
+            ]
+            self._queries += 1
+            self._query_seconds += time.time() - start
+        print(f"🔍 Local vector query took {(time.time() - start) * 1000:.2f}ms")
+        return make_result(matches)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "vectors": int(self._active.sum()),
+                "capacity": self._capacity,
+                "dtype": np.dtype(self.dtype).name,
+                "index": "hnsw" if self._graph is not None else "flat",
+                "queries": self._queries,
+                "avg_query_ms": round(self._query_seconds / self._queries * 1000, 3) if self._queries else 0.0,
+            }
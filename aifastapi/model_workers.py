@@ -0,0 +1,237 @@
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from multiprocessing.connection import wait
+
+# Models registered before fork. Worker processes inherit this dict, and the
+# weights it points to, instead of loading their own copy.
+_models = {}
+
+def _worker_main(worker_index, tasks, results, threads, pin_cpus):
+    import torch
+
+    torch.set_num_threads(threads)
+    if pin_cpus and hasattr(os, "sched_setaffinity"):
+        first = worker_index * threads
+        os.sched_setaffinity(0, range(first, first + threads))
+
+    while True:
+        try:
+            task = tasks.recv()
+        except EOFError:
+            break  # the parent went away
+        if task is None:
+            break
+        job_id, target, method, args, kwargs = task
+        try:
+            with torch.inference_mode():
+                result = getattr(_models[target], method)(*args, **kwargs)
+            results.send((job_id, True, result))
+        except Exception as e:
+            results.send((job_id, False, f"{type(e).__name__}: {e}"))
+
+class RemoteModel:
+    """
+    Stand-in for a model object whose listed methods run in the worker pool.
+    Everything else (tokenizer, model_name, ...) comes from the local instance.
+    """
+    def __init__(self, pool, target, local, methods):
+        self._pool = pool
+        self._target = target
+        self._local = local
+        self._methods = set(methods)
+
+    def __getattr__(self, attr):
+        if attr in self._methods:
+            return lambda *args, **kwargs: self._pool.call(self._target, attr, *args, **kwargs)
+        return getattr(self._local, attr)
+
+class ModelWorkerPool:
+    """
+    Pre-fork model serving. Models are loaded once in the parent, their weights
+    are moved to shared memory, and `workers` forked processes serve calls
+    dispatched to whichever worker is idle. MODEL_WORKERS=0 keeps inference
+    in-process. Every worker has its own task and result pipes, so one that
+    dies (OOM kill, segfault) cannot leave a lock held that the others need:
+    its job fails, and it is forked again. Calls give up after
+    MODEL_WORKER_TIMEOUT seconds.
+    """
+    def __init__(self, models: dict, workers: int = None, threads_per_worker: int = None):
+        self.models = models
+        self.workers = workers if workers is not None else int(os.getenv("MODEL_WORKERS", "0"))
+        cpus = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or int(
+            os.getenv("MODEL_WORKER_THREADS", str(max(1, cpus // max(1, self.workers))))
+        )
+        self.pin_cpus = os.getenv("MODEL_WORKER_PIN_CPUS", "0").lower() in ("1", "true", "yes") \
+            and self.workers * self.threads_per_worker <= cpus
+        self.timeout = float(os.getenv("MODEL_WORKER_TIMEOUT", "300"))
+        self._slots = []  # per worker: process, task pipe, result pipe and the job it is running
+        self._backlog = deque()
+        self._stopping = False
+        self._futures = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+
+    def start(self):
+        """Load and share the weights, then fork the workers. Call before any inference runs."""
+        start = time.time()
+        for model in self.models.values():
+            if hasattr(model, "_load_model"):
+                model._load_model()
+            module = getattr(model, "model", None)
+            if hasattr(module, "share_memory"):
+                module.share_memory()
+
+        _models.clear()
+        _models.update(self.models)
+
+        self._ctx = mp.get_context("fork")
+        self._slots = [self._spawn(i) for i in range(self.workers)]
+
+        threading.Thread(target=self._collect, name="model-worker-results", daemon=True).start()
+        print(f"🧵 Started {self.workers} model workers x {self.threads_per_worker} threads "
+              f"in {time.time()-start:.2f}s")
+
+    def _spawn(self, index: int) -> dict:
+        task_reader, task_writer = self._ctx.Pipe(duplex=False)
+        result_reader, result_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, task_reader, result_writer, self.threads_per_worker, self.pin_cpus),
+            name=f"model-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        task_reader.close()
+        result_writer.close()
+        return {"process": process, "tasks": task_writer, "results": result_reader, "job": None}
+
+    def _dispatch(self):
+        """Hand backlog jobs to idle workers. Call with the lock held."""
+        for slot in self._slots:
+            while slot["job"] is None and self._backlog:
+                task = self._backlog.popleft()
+                if task[0] not in self._futures:
+                    continue  # the caller timed out while it waited
+                slot["job"] = task[0]
+                try:
+                    slot["tasks"].send(task)
+                except OSError:
+                    pass  # the worker is dead; _collect fails the job when it sees the exit
+
+    def _replace(self, slot: dict):
+        """Fail the job of a worker that died and fork a replacement"""
+        process = slot["process"]
+        process.join(timeout=1)
+        with self._lock:
+            if slot not in self._slots:
+                return  # shut down meanwhile
+            index = self._slots.index(slot)
+            future = self._futures.pop(slot["job"], None)
+            self._failed += 1 if future else 0
+            self._restarts += 1
+        print(f"💀 Model worker {index} died (exit code {process.exitcode}), restarting it")
+        slot["tasks"].close()
+        slot["results"].close()
+        replacement = self._spawn(index)
+        with self._lock:
+            self._slots[index] = replacement
+            self._dispatch()
+        if future is not None:
+            future.set_exception(RuntimeError(f"Model worker {index} died with exit code {process.exitcode}"))
+
+    def _collect(self):
+        while not self._stopping:
+            with self._lock:
+                slots = list(self._slots)
+            pipes = {slot["results"]: slot for slot in slots}
+            exits = {slot["process"].sentinel: slot for slot in slots}
+            ready = wait([*pipes, *exits], timeout=1.0)
+            # Results first, so a job that finished right before its worker died still succeeds
+            for conn in ready:
+                if conn not in pipes:
+                    continue
+                try:
+                    job_id, ok, payload = conn.recv()
+                except (EOFError, OSError):
+                    continue  # the worker exited; handled through its sentinel
+                with self._lock:
+                    future = self._futures.pop(job_id, None)
+                    pipes[conn]["job"] = None
+                    self._completed += 1
+                    self._failed += 0 if ok else 1
+                    self._dispatch()
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+            for sentinel in ready:
+                if sentinel in exits and not self._stopping:
+                    self._replace(exits[sentinel])
+
+    def submit(self, target: str, method: str, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+            self._submitted += 1
+            self._backlog.append((job_id, target, method, args, kwargs))
+            self._dispatch()
+        return future
+
+    def call(self, target: str, method: str, *args, **kwargs):
+        future = self.submit(target, method, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self._futures = {job: f for job, f in self._futures.items() if f is not future}
+            raise RuntimeError(f"Model worker call {target}.{method} timed out after {self.timeout:.0f}s")
+
+    def proxy(self, target: str, methods: list[str]) -> RemoteModel:
+        return RemoteModel(self, target, self.models[target], methods)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "alive": sum(1 for slot in self._slots if slot["process"].is_alive()),
+                "queued": len(self._backlog),
+                "in_flight": len(self._futures),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "restarts": self._restarts,
+            }
+
+    def shutdown(self):
+        if not self._slots:
+            return
+        self._stopping = True
+        with self._lock:
+            slots, self._slots = self._slots, []
+            futures, self._futures = self._futures, {}
+            self._backlog.clear()
+        for slot in slots:
+            try:
+                slot["tasks"].send(None)
+            except OSError:
+                pass
+        for slot in slots:
+            slot["process"].join(timeout=5)
+            if slot["process"].is_alive():
+                slot["process"].terminate()
+        for future in futures.values():
+            future.set_exception(RuntimeError("Model worker pool shut down"))
@@ -0,0 +1,82 @@
+import os
+import time
+from types import SimpleNamespace
+import numpy as np
+import torch
+
+class OnnxEmbeddingModel:
+    """
+    ONNX Runtime stand-in for the PyTorch AutoModel used by EmbeddingGenerator.
+    Exports the model on first use, optionally applies dynamic int8
+    quantization, and returns `last_hidden_state` so pooling stays unchanged.
+    """
+    def __init__(self, model_name: str, onnx_path: str = None, quantize: bool = None):
+        import onnxruntime as ort
+
+        self.model_name = model_name
+        if quantize is None:
+            quantize = os.getenv("EMBEDDING_ONNX_QUANTIZE", "0").lower() in ("1", "true", "yes")
+        self.quantize = quantize
+
+        base_path = onnx_path or os.getenv("EMBEDDING_ONNX_PATH") or os.path.join(
+            "onnx_models", model_name.replace("/", "__") + ".onnx"
+        )
+        if not os.path.exists(base_path):
+            self._export(base_path)
+
+        self.onnx_path = base_path
+        if quantize:
+            self.onnx_path = base_path.replace(".onnx", "-int8.onnx")
+            if not os.path.exists(self.onnx_path):
+                self._quantize(base_path, self.onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_op_threads = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def _export(self, path: str):
+        from transformers import AutoTokenizer, AutoModel
+
+        start = time.time()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModel.from_pretrained(self.model_name).eval()
+        sample = tokenizer(["passage: export sample", "query: sample"], padding=True, return_tensors="pt")
+        input_names = list(sample.keys())
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                args=(),
+                kwargs=dict(sample),
+                f=path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=17,
+            )
+        print(f"📦 Exported {self.model_name} to ONNX in {time.time()-start:.2f}s: {path}")
+
+    @staticmethod
+    def _quantize(src: str, dst: str):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        start = time.time()
+        quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+        print(f"📦 Quantized ONNX model to int8 in {time.time()-start:.2f}s: {dst}")
+
+    def __call__(self, **features):
+        feeds = {
+            name: features[name].numpy().astype(np.int64)
+            for name in self.input_names
+            if name in features
+        }
+        last_hidden_state = self.session.run(["last_hidden_state"], feeds)[0]
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(last_hidden_state))
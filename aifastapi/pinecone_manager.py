@@ -1,8 +1,11 @@
 import os
 import time
+import numpy as np
 from pinecone import Pinecone
+from vector_store import VectorStore
+from upsert_pipeline import UpsertPipeline
 
-class PineconeManager:
+class PineconeManager(VectorStore):
     def __init__(self):
         self._init_pinecone()
 
@@ -11,46 +14,64 @@ class PineconeManager:
         print("Pinecone Manager: API Key = ", api_key)
         if not api_key:
             raise ValueError("PINECONE_API_KEY is missing. Please set it in your environment or .env file.")
-        self.index = Pinecone(api_key=api_key).Index(os.getenv("PINECONE_INDEX", "e5-768d-index"))
+        index_name = os.getenv("PINECONE_INDEX", "e5-768d-index")
+        client = Pinecone(api_key=api_key)
+        self.index = client.Index(index_name)
+        # Listing ids by prefix only exists on serverless indexes; pod-based ones delete by metadata filter
+        self.serverless = "serverless" in (client.describe_index(index_name).to_dict().get("spec") or {})
+        self.upserter = UpsertPipeline(self._upsert)
 
-    def check_existing_embeddings(self, file_id: str) -> bool:
-        try:
-            start = time.time()
-            fetch_result = self.index.fetch(ids=[f"marker-{file_id}"])
-            exists = len(fetch_result.vectors) > 0
-            print(f"🔍 Marker check [{file_id}]: {exists} (Checked in {time.time()-start:.2f}s)")
-            return exists
-        except Exception as e:
-            print(f"⚠️ Pinecone fetch error: {e}")
-            return False
+    def _upsert(self, batch: list, namespace: str):
+        # The wire boundary: embeddings stay ndarrays until the request is built
+        rows = np.asarray([vector["values"] for vector in batch], dtype=np.float32).tolist()
+        wire = [{**vector, "values": row} for vector, row in zip(batch, rows)]
+        self.index.upsert(vectors=wire, namespace=namespace or None)
 
-    def upload_vectors(self, vectors: list) -> float:
-        start = time.time()
-        self.index.upsert(vectors=vectors)
-        return time.time() - start
+    def upload_vectors(self, vectors: list, namespace: str = "") -> float:
+        """Upsert in size-capped, concurrent, retried requests"""
+        return self.upserter.run(vectors, namespace)["seconds"]
 
-    def upload_marker(self, file_id: str) -> float:
-        start = time.time()
-        # ✅ Use small non-zero values
-        marker_vector = {
-            "id": f"marker-{file_id}",
-            "values": [1e-8] * 768,
-            "metadata": {"file_id": file_id, "marker": True}
+    def fetch(self, ids: list[str], namespace: str = "") -> dict:
+        result = self.index.fetch(ids=ids, namespace=namespace or None)
+        return {
+            vector_id: {"values": np.asarray(vector.values, dtype=np.float32), "metadata": dict(vector.metadata or {})}
+            for vector_id, vector in result.vectors.items()
         }
-        self.index.upsert(vectors=[marker_vector])
-        return time.time() - start
-    
-    def query_top_k(self, vector: list[float], top_k: int = 5, namespace: str = ""):
+
+    def delete_file(self, file_id: str, namespace: str = "") -> int:
+        """Delete every vector of a document, by id prefix on serverless indexes and by file_id filter on pods"""
+        start = time.time()
+        if self.serverless:
+            deleted = 0
+            for ids in self.index.list(prefix=f"{file_id}-", namespace=namespace or None):
+                self.index.delete(ids=ids, namespace=namespace or None)
+                deleted += len(ids)
+        else:
+            file_filter = {"file_id": {"$eq": file_id}}
+            # A filtered delete does not report what it removed, so count first
+            summary = self.index.describe_index_stats(filter=file_filter).namespaces.get(namespace or "")
+            deleted = summary.vector_count if summary else 0
+            self.index.delete(filter=file_filter, namespace=namespace or None)
+        # Documents embedded before the registry also have a marker vector
+        self.index.delete(ids=[f"marker-{file_id}"])
+        print(f"🗑️ Deleted {deleted} vectors for {file_id} in {time.time()-start:.2f}s")
+        return deleted
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "upserts": self.upserter.stats()}
+
+    def query_top_k(self, vector, top_k: int = 5, namespace: str = "", filter: dict = None):
         """
         Query Pinecone for the top_k most similar vectors.
         """
         try:
             start = time.time()
             result = self.index.query(
-                vector=vector,
+                vector=np.asarray(vector, dtype=np.float32).tolist(),
                 top_k=top_k,
                 include_metadata=True,
-                namespace=namespace or None
+                namespace=namespace or None,
+                filter=filter
             )
             print(f"🔍 Pinecone query took {time.time() - start:.2f}s")
             return result
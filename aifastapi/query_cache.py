@@ -0,0 +1,72 @@
+import hashlib
+import os
+import re
+import numpy as np
+from cache_utils import LRUCache
+
+class QueryEmbeddingCache:
+    """
+    Query vector cache keyed on the normalised query and the model name. A
+    bounded in-process LRU with TTL sits in front of an optional Redis, so
+    workers and restarts can share vectors for popular searches.
+    """
+    def __init__(self, model_name: str, max_entries: int = None, ttl: float = None, redis_url: str = None):
+        self.model_name = model_name
+        self.ttl = ttl if ttl is not None else float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        self.local = LRUCache(
+            max_entries or int(os.getenv("QUERY_CACHE_SIZE", "10000")),
+            ttl=self.ttl or None,
+        )
+        self.redis = None
+        self.redis_hits = 0
+        self.redis_errors = 0
+        redis_url = redis_url or os.getenv("QUERY_CACHE_REDIS_URL")
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip().lower()
+
+    def _key(self, query: str) -> str:
+        digest = hashlib.sha1(self.normalize(query).encode("utf-8")).hexdigest()
+        return f"qemb:{self.model_name}:{digest}"
+
+    def get(self, query: str):
+        key = self._key(query)
+        vector = self.local.get(key)
+        if vector is not None or self.redis is None:
+            return vector
+
+        try:
+            raw = self.redis.get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Query cache Redis error: {e}")
+            return None
+        if raw is None:
+            return None
+        vector = np.frombuffer(raw, dtype=np.float32)
+        self.redis_hits += 1
+        self.local.put(key, vector)
+        return vector
+
+    def put(self, query: str, vector):
+        key = self._key(query)
+        self.local.put(key, vector)
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(key, np.asarray(vector, dtype=np.float32).tobytes(), ex=int(self.ttl) or None)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Query cache Redis error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            **self.local.stats(),
+            "redis": self.redis is not None,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+        }
@@ -0,0 +1,107 @@
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import torch
+import time
+import os
+
+class CrossEncoderReranker:
+    """
+    Re-orders retrieved chunks by scoring every (query, chunk) pair with a
+    small cross-encoder in one batched forward pass. Only the first
+    `candidates` matches are scored. An EMA of the per-pair cost predicts the
+    next pass, and re-ranking is skipped when that estimate exceeds
+    `budget_ms`, so a slow CPU degrades to retrieval order instead of latency.
+    """
+    def __init__(self, model_name=None, budget_ms: float = None, candidates: int = None, max_length: int = None):
+        self.model_name = model_name or os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.budget_ms = budget_ms if budget_ms is not None else float(os.getenv("RERANK_BUDGET_MS", "150"))
+        self.candidates = candidates or int(os.getenv("RERANK_CANDIDATES", "20"))
+        self.max_length = max_length or int(os.getenv("RERANK_MAX_LENGTH", "256"))
+        self.tokenizer = None
+        self.model = None
+        self._loaded = False
+        self._ms_per_pair = None
+        self._runs = 0
+        self._skipped = 0
+
+    def _load_model(self):
+        if self._loaded: return
+
+        try:
+            start = time.time()
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self.model.eval()
+            print(f"⏱️ Re-ranker loaded ({self.model_name}) in {(time.time() - start) * 1000:.2f}ms")
+            self._loaded = True
+        except Exception as e:
+            raise RuntimeError(f"Failed to load re-ranking model: {str(e)}")
+
+    def estimate_ms(self, pairs: int):
+        """Predicted cost of scoring `pairs` pairs, or None before the first run"""
+        return None if self._ms_per_pair is None else self._ms_per_pair * pairs
+
+    def rerank(self, query: str, matches: list) -> tuple[list, dict]:
+        """
+        Return (matches re-ordered by cross-encoder score, report). Scored
+        matches get a `rerank_score`; anything past the candidate pool keeps
+        its retrieval order after them.
+        """
+        if not self._loaded:
+            self._load_model()
+        pool, rest = matches[:self.candidates], matches[self.candidates:]
+        report = {"candidates": len(pool), "skipped": False, "ms": 0.0}
+        if len(pool) < 2:
+            return matches, report
+
+        estimate = self.estimate_ms(len(pool))
+        if self.budget_ms and estimate is not None and estimate > self.budget_ms:
+            self._skipped += 1
+            # Decay the estimate so a transient slowdown does not disable re-ranking for good
+            self._ms_per_pair *= 0.95
+            report.update(skipped=True, estimate_ms=round(estimate, 3))
+            print(f"⏭️ Re-ranking skipped: ~{estimate:.1f}ms for {len(pool)} pairs exceeds {self.budget_ms:.0f}ms budget")
+            return matches, report
+
+        start = time.time()
+        features = self.tokenizer(
+            [query] * len(pool),
+            [match.metadata.get("text", "") for match in pool],
+            padding=True,
+            truncation="only_second",
+            max_length=self.max_length,
+            return_tensors="pt"
+        )
+        token_time = (time.time() - start) * 1000
+
+        infer_start = time.time()
+        with torch.no_grad():
+            logits = self.model(**features).logits
+        # One relevance logit, or (irrelevant, relevant) classes
+        scores = logits[:, 0] if logits.shape[-1] == 1 else torch.log_softmax(logits, dim=-1)[:, -1]
+        infer_time = (time.time() - infer_start) * 1000
+
+        total = (time.time() - start) * 1000
+        per_pair = total / len(pool)
+        self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+        self._runs += 1
+
+        for match, score in zip(pool, scores.tolist()):
+            match.rerank_score = score
+        ranked = sorted(pool, key=lambda match: match.rerank_score, reverse=True)
+        report.update(ms=round(total, 3), over_budget=bool(self.budget_ms and total > self.budget_ms))
+
+        print(f"\n⏱️ Re-ranking metrics ({len(pool)} candidates):")
+        print(f"- Tokenization: {token_time:.2f}ms")
+        print(f"- Model inference: {infer_time:.2f}ms")
+        print(f"- Total: {total:.2f}ms (budget {self.budget_ms:.0f}ms)")
+        return ranked + rest, report
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "budget_ms": self.budget_ms,
+            "candidates": self.candidates,
+            "runs": self._runs,
+            "skipped": self._skipped,
+            "ms_per_pair": round(self._ms_per_pair, 3) if self._ms_per_pair is not None else None,
+        }
@@ -2,21 +2,59 @@ from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from embedding_agent import EmbeddingService
 from generative_ai_agent import ResponseService
-from text_processor import TextProcessor
-from pinecone_manager import PineconeManager
+from vector_store import create_vector_store, owner_namespace
+from inference_executor import InferenceExecutor, InferenceQueueFull, InferenceQueueTimeout
+from model_workers import ModelWorkerPool
+from django_client import DjangoClient, DjangoAPIError
+from answer_cache import SemanticAnswerCache
+from hybrid_search import reciprocal_rank_fusion, lexical_matches
+from reranker import CrossEncoderReranker
+from latency_tracker import LatencyTracker
+import asyncio
+from collections import deque
 import hashlib
-import fitz
-import tempfile
+import json
+import time
 import os
 import uvicorn
-import httpx
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
 
 app = FastAPI()
-pinecone_mgr = PineconeManager()
+vector_store = create_vector_store()
 embed_service = EmbeddingService()
 response_service = ResponseService()
+django_client = DjangoClient()
+search_latency = LatencyTracker()
+# Opt-in: a near-duplicate match can still return an answer to a slightly different question
+answer_cache = SemanticAnswerCache() if int(os.getenv("ANSWER_CACHE_SIZE", "0")) > 0 else None
+# Optional cross-encoder re-ranking between retrieval and generation, enabled by setting RERANK_MODEL
+reranker = CrossEncoderReranker() if os.getenv("RERANK_MODEL") else None
+if reranker:
+    reranker._load_model()
+
+# ✅ Optional pre-fork model workers sharing one copy of the weights
+model_pool = ModelWorkerPool({
+    "embedder": embed_service.embedder,
+    "generator": response_service.generator,
+})
+if model_pool.workers:
+    model_pool.start()
+    embed_service.use_embedder(model_pool.proxy("embedder", ["generate_embeddings"]))
+    response_service.generator = model_pool.proxy("generator", ["generate_response", "generate_response_with_report"])
+
+# ✅ In-process generation goes through the continuous-batching scheduler instead of an executor thread
+continuous_batching = not model_pool.workers and response_service.generator.batch_size > 0
+if continuous_batching:
+    response_service.generator._load_model()
+
+# Keep at least one executor thread per model worker so none of them sits idle
+inference_executor = InferenceExecutor(workers=max(model_pool.workers, int(os.getenv("INFERENCE_WORKERS", "2"))))
+
+# ✅ Document summaries are generated once after embedding from the first chunks; 0 leaves them to /generate
+summary_chunks = int(os.getenv("SUMMARY_CHUNKS", "4"))
+summary_tasks = set()
 
 # Enable CORS
 app.add_middleware(
@@ -26,17 +64,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def load_document_registry():
+    try:
+        embed_service.registry.load(await django_client.processed_files())
+    except DjangoAPIError as e:
+        # Starting empty only costs a re-embed of documents uploaded again
+        print(f"⚠️ Could not load embedded documents from Django: {e.detail}")
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    inference_executor.shutdown()
+    model_pool.shutdown()
+    if continuous_batching:
+        response_service.generator.scheduler.shutdown()
+
 def compute_bytes_hash(data: bytes) -> str:
     """Generate SHA256 hash of file bytes."""
     return hashlib.sha256(data).hexdigest()
 
+async def summarize_document(file_id: str, text: str) -> str:
+    """Answer the summary question for a document and store it on its File row"""
+    start = time.time()
+    if continuous_batching:
+        summary = await asyncio.wrap_future(response_service.submit_answer(file_id, text))
+    else:
+        summary = await inference_executor.run(response_service.generate_answer, file_id, text)
+    try:
+        await django_client.save_summary(file_id, summary, response_service.summary_model)
+        print(f"📝 Stored summary for {file_id} in {time.time()-start:.2f}s")
+    except DjangoAPIError as e:
+        print(f"⚠️ Could not store summary for {file_id}: {e.detail}")
+    return summary
+
+def schedule_summary(file_id: str, text: str):
+    async def run():
+        try:
+            await summarize_document(file_id, text)
+        except Exception as e:
+            # /generate falls back to generating it on first request
+            print(f"⚠️ Background summary failed for {file_id}: {e}")
+
+    # Keep a reference so the task is not garbage collected before it finishes
+    task = asyncio.create_task(run())
+    summary_tasks.add(task)
+    task.add_done_callback(summary_tasks.discard)
+
 @app.post("/embed")
 async def embed_pdf(
     file: UploadFile = File(...),
-    file_hash: str = Form(...)
+    file_hash: str = Form(...),
+    owner_id: Optional[str] = Form(None)
 ):
     try:
-        print(f"📥 Received embed: file={file.filename}, file_hash={file_hash}")
+        print(f"📥 Received embed: file={file.filename}, file_hash={file_hash}, owner_id={owner_id}")
 
         # ✅ Read PDF into memory
         raw_data = await file.read()
@@ -44,130 +125,382 @@ async def embed_pdf(
         # ✅ Use provided file_hash (fallback to content hash if needed)
         file_id = file_hash or compute_bytes_hash(raw_data)
 
-        # ✅ Extract text from in-memory PDF
-        with fitz.open(stream=raw_data, filetype="pdf") as doc:
-            text = " ".join(page.get_text() for page in doc)
-
-        # ✅ Chunk text using tokenizer
-        text_processor = TextProcessor(embed_service.embedder.tokenizer)
-        chunks = text_processor.chunk_text(text)
-
-        # ✅ Save temp file for embedding
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(raw_data)
-            tmp_path = tmp.name
-
-        file_id_result = embed_service.process_document(tmp_path, pinecone_mgr, file_id=file_id)
-        os.unlink(tmp_path)
-
-        # ✅ Forward chunks to Django backend
+        # ✅ Stream pages → chunks → embeddings → upserts, persisting each batch as it lands
+        loop = asyncio.get_running_loop()
         model_used = os.getenv("EMBEDDING_MODEL", "intfloat/e5-base-v2")
-        async with httpx.AsyncClient() as client:
-            for i, chunk in enumerate(chunks):
-                payload = {
+        pending = deque()
+        summary_texts = {}
+
+        def persist_batch(start_index, chunks, vector_ids):
+            for i, chunk in enumerate(chunks[:max(summary_chunks - start_index, 0)]):
+                summary_texts[start_index + i] = chunk["text"]
+            payloads = [
+                {
                     "file_hash": file_id,
-                    "chunk_text": chunk,
-                    "chunk_number": i,
-                    "vector_id": None,
+                    "chunk_text": chunk["text"],
+                    "chunk_number": start_index + i,
+                    "start_char": chunk["start_char"],
+                    "end_char": chunk["end_char"],
+                    "vector_id": vector_id,
                     "model_used": model_used,
                 }
+                for i, (chunk, vector_id) in enumerate(zip(chunks, vector_ids))
+            ]
+            pending.append(asyncio.run_coroutine_threadsafe(django_client.save_chunks(payloads), loop))
+            # Backpressure: the pipeline waits once too many saves are in flight
+            while len(pending) > django_client.chunk_concurrency:
+                pending.popleft().result()
 
-                try:
-                    response = await client.post(
-                        f"{os.getenv('DJANGO_API_BASE_URL', 'http://backend:8000')}/api/data/chunks/",
-                        json=payload,
-                        timeout=10.0,
-                    )
-                except httpx.HTTPError as e:
-                    print(f"🔥 HTTPX ERROR on chunk {i}: {str(e)}")
-                    raise HTTPException(status_code=502, detail=f"Failed to send chunk {i} to Django")
+        def run_model(fn, *args, **kwargs):
+            # Only the embedding calls take an inference slot, not the whole ingest
+            return asyncio.run_coroutine_threadsafe(inference_executor.run(fn, *args, **kwargs), loop).result()
 
-                if response.status_code != 201:
-                    print(f"❌ Failed to save chunk {i}: {response.text}")
-                    raise HTTPException(status_code=500, detail=f"Chunk {i} rejected by Django")
+        try:
+            result = await asyncio.to_thread(
+                embed_service.process_stream, raw_data, vector_store, file_id, persist_batch, owner_id, run_model
+            )
+            while pending:
+                await asyncio.wrap_future(pending.popleft())
+        finally:
+            # A failed ingest must not leave chunk saves running behind the error response
+            for future in pending:
+                future.cancel()
+            pending.clear()
+        timings = result["timings"]
+
+        # ✅ Summary stage runs after the response so ingest latency does not include generation
+        if result["embedded"] and summary_texts:
+            schedule_summary(file_id, "\n\n".join(summary_texts[index] for index in sorted(summary_texts)))
 
         return JSONResponse(
             status_code=200,
             content={
-                "file_id": file_id_result,
-                "num_chunks": len(chunks),
-                "status": "embedded"
+                "file_id": file_id,
+                "num_chunks": result["num_chunks"],
+                "status": "embedded" if result["embedded"] else "already_embedded",
+                "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+                "chunk_cache": result["cache"],
             }
         )
 
+    except HTTPException:
+        raise
+    except DjangoAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except (InferenceQueueFull, InferenceQueueTimeout) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/generate")
-async def generate_response(file_id: str, text: str):
+async def generate_response(file_id: str, text: Optional[str] = None, regenerate: bool = False):
     try:
-        response = response_service.generate_answer(file_id, text)
+        # ✅ Serve the summary stored at ingest unless it was written by another model
+        if not regenerate:
+            try:
+                stored = await django_client.get_summary(file_id)
+            except DjangoAPIError as e:
+                print(f"⚠️ Could not read stored summary for {file_id}: {e.detail}")
+                stored = None
+            if stored and stored["summary"] and stored["summary_model"] == response_service.summary_model:
+                return {
+                    "file_id": file_id,
+                    "response": stored["summary"],
+                    "model": stored["summary_model"],
+                    "generated_at": stored["summary_generated_at"],
+                    "status": "stored"
+                }
+
+        if not text:
+            text = "\n\n".join(await django_client.document_chunks(file_id, limit=max(summary_chunks, 1)))
+        if not text:
+            raise HTTPException(status_code=404, detail=f"No text stored for {file_id}")
+        response = await summarize_document(file_id, text)
         return {
             "file_id": file_id,
             "response": response,
+            "model": response_service.summary_model,
             "status": "generated"
         }
+    except HTTPException:
+        raise
+    except DjangoAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except (InferenceQueueFull, InferenceQueueTimeout) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "embedding_batcher": embed_service.batcher.stats(),
+        "inference_executor": inference_executor.stats(),
+        "model_workers": model_pool.stats(),
+        "generation_scheduler": response_service.generator.scheduler.stats() if continuous_batching else None,
+        "encoder_cache": response_service.generator.encoder_cache.stats() if response_service.generator.encoder_cache and not model_pool.workers else None,
+        "chunk_cache": embed_service.chunk_cache.stats() if embed_service.chunk_cache else None,
+        "query_cache": embed_service.query_cache.stats() if embed_service.query_cache else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "vector_store": vector_store.stats(),
+        "document_registry": embed_service.registry.stats(),
+        "reranker": reranker.stats() if reranker else None,
+        "search_latency": search_latency.stats(),
+    }
+
+@app.delete("/documents/{file_id}")
+async def delete_document(file_id: str, owner_id: Optional[str] = None):
+    try:
+        deleted = await asyncio.to_thread(vector_store.delete_file, file_id, owner_namespace(owner_id))
+        embed_service.registry.discard(file_id)
+        invalidated = answer_cache.invalidate_file(file_id) if answer_cache else 0
+        return {
+            "file_id": file_id,
+            "deleted_vectors": deleted,
+            "invalidated_answers": invalidated,
+            "status": "deleted"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_answer(meta: dict, start_generation, finish):
+    """
+    Server-sent events for one /search answer: `meta` (file and context),
+    `token` for each decoded piece as the scheduler produces it, then `done`
+    with the full answer, or `error`. Without continuous batching the answer
+    arrives as a single token event.
+    """
+    yield sse("meta", meta)
+    loop = asyncio.get_running_loop()
+    pieces = asyncio.Queue()
+
+    def on_text(piece):
+        loop.call_soon_threadsafe(pieces.put_nowait, piece)
+
+    streamed = False
+    try:
+        generation = start_generation(on_text)
+        while not generation.done():
+            next_piece = asyncio.ensure_future(pieces.get())
+            await asyncio.wait({next_piece, generation}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_piece.done():
+                next_piece.cancel()
+                break
+            streamed = True
+            yield sse("token", {"text": next_piece.result()})
+        # Pieces queued before the future resolved are still waiting
+        while not pieces.empty():
+            streamed = True
+            yield sse("token", {"text": pieces.get_nowait()})
+        response_text = await generation
+    except Exception as e:
+        status_code = 503 if isinstance(e, (InferenceQueueFull, InferenceQueueTimeout)) else 500
+        yield sse("error", {"status_code": status_code, "detail": str(e)})
+        return
+    if not streamed:
+        yield sse("token", {"text": response_text})
+    yield sse("done", {"response": response_text, **finish(response_text)})
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int
     threshold: float = 0.75 
+    file_id: Optional[str] = None  # restrict retrieval to one document
+    owner_id: Optional[str] = None  # restrict retrieval to one uploader's documents
+    retrieval: Optional[str] = None  # "vector", "lexical" or "hybrid"; defaults to SEARCH_RETRIEVAL
+    lexical_k: int = 20  # keyword candidates fetched for lexical and hybrid retrieval
+    rerank: bool = True  # re-order candidates with the cross-encoder when one is configured
+    latency_budget_ms: Optional[float] = None  # stop decoding before this; defaults to SEARCH_LATENCY_BUDGET_MS
+    stream: bool = False  # send the answer as server-sent events while it is generated
 
 @app.post("/search")
 async def generate_response(request: SearchRequest):
+    request_start = time.monotonic()
     query = request.query
     top_k = request.top_k
     threshold = request.threshold
-    print(f"🔎 Using threshold: {threshold}")
+    # Lexical matches have no score threshold, so keyword retrieval stays opt-in and "No match found" still fires
+    retrieval = (request.retrieval or os.getenv("SEARCH_RETRIEVAL", "vector")).lower()
+    if retrieval not in ("vector", "lexical", "hybrid"):
+        raise HTTPException(status_code=400, detail="retrieval must be 'vector', 'lexical' or 'hybrid'")
+    budget_ms = request.latency_budget_ms
+    if budget_ms is None:
+        budget_ms = float(os.getenv("SEARCH_LATENCY_BUDGET_MS", "0"))
+    deadline = request_start + budget_ms / 1000 if budget_ms > 0 else None
+    print(f"🔎 Using threshold: {threshold}, retrieval: {retrieval}, latency budget: {budget_ms or 'none'}ms")
+
+    # Scope retrieval with metadata filters, inside the uploader's namespace if they have one
+    # (a file id already pins one uploader, so owner_id then only selects the namespace)
+    search_filter = {}
+    if request.file_id:
+        search_filter["file_id"] = request.file_id
+    elif request.owner_id:
+        search_filter["owner_id"] = request.owner_id
+
+    use_reranker = reranker is not None and request.rerank
+    # Give the re-ranker a wider pool than the context it feeds
+    pool_size = max(top_k, reranker.candidates) if use_reranker else top_k
+    latency_ms = {}
+
+    async def timed(stage, awaitable):
+        start = time.time()
+        try:
+            return await awaitable
+        finally:
+            latency_ms[stage] = round((time.time() - start) * 1000, 3)
+
+    async def vector_search():
+        # The batcher has its own inference thread, so await it directly
+        query_vector = await timed("embed", asyncio.wrap_future(embed_service.submit_query(query)))
+        result = await timed("vector", asyncio.to_thread(
+            vector_store.query_top_k,
+            query_vector,
+            top_k=pool_size,
+            namespace=owner_namespace(request.owner_id),
+            filter=search_filter or None
+        ))
+        return query_vector, [match for match in result.matches if match.score >= threshold]
+
+    async def lexical_search():
+        rows = await timed("lexical", django_client.lexical_search(
+            query, k=max(request.lexical_k, pool_size), **search_filter
+        ))
+        return lexical_matches(rows)
 
     try:
-        # Step 1: Vectorize query
-        query_vector = embed_service.vectorize_query(query)
-
-        # Step 2: Query Pinecone
-        search_result = pinecone_mgr.query_top_k(query_vector, top_k=top_k)
-        
-        # Step 3: Collect top 3 matches above threshold
-        matches = []
-        context_chunks = []
-
-        for match in search_result.matches:
-            if match.score < threshold:
-                continue
-            if len(matches) >= 3:
-                break
-            matches.append(match)
-            context_chunks.append(match.metadata.get("text", ""))
+        # Step 1-2: Run the vector and keyword retrievers concurrently
+        retrievers = {}
+        if retrieval != "lexical":
+            retrievers["vector"] = vector_search()
+        if retrieval != "vector":
+            retrievers["lexical"] = lexical_search()
+        outcomes = dict(zip(retrievers, await asyncio.gather(*retrievers.values(), return_exceptions=True)))
+
+        query_vector = None
+        rankings = {}
+        if "vector" in outcomes:
+            if isinstance(outcomes["vector"], BaseException):
+                raise outcomes["vector"]
+            query_vector, rankings["vector"] = outcomes["vector"]
+        if "lexical" in outcomes:
+            if not isinstance(outcomes["lexical"], BaseException):
+                rankings["lexical"] = outcomes["lexical"]
+            elif retrieval == "lexical":
+                raise outcomes["lexical"]
+            else:
+                print(f"⚠️ Lexical retrieval failed, using vector results only: {outcomes['lexical']}")
+
+        # Step 3: Fuse the rankings into one candidate list
+        if retrieval == "hybrid":
+            fusion_start = time.time()
+            candidates = reciprocal_rank_fusion(rankings, k=int(os.getenv("RRF_K", "60")))
+            latency_ms["fusion"] = round((time.time() - fusion_start) * 1000, 3)
+        else:
+            candidates = next(iter(rankings.values()), [])
+        # Step 3b: Re-order the candidate pool by cross-encoder relevance
+        rerank_report = None
+        if use_reranker and len(candidates) > 1:
+            candidates, rerank_report = await timed(
+                "rerank", inference_executor.run(reranker.rerank, query, candidates)
+            )
+        # Step 3c: Pack the best top_k chunks into the generator's token window, best first
+        pool = candidates[:top_k]
+        packed = await timed("pack", asyncio.to_thread(
+            response_service.pack_context, query, [match.metadata.get("text", "") for match in pool]
+        ))
+        matches = [pool[i] for i in packed.chunks]
+        context_chunks = [match.metadata.get("text", "") for match in matches]
+        print("⏱️ Retriever latency: " + ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in latency_ms.items()))
 
         if not matches:
             return JSONResponse(status_code=404, content={"error": "No match found."})
 
-        # Step 4: Prepare context window
-        context_window = "\n\n".join(context_chunks)
+        # Step 4: Reuse the answer of a near-identical query over the same context
+        chunk_ids = [match.id for match in matches]
+        use_answer_cache = answer_cache is not None and query_vector is not None
+        cached_text = answer_cache.lookup(query_vector, chunk_ids) if use_answer_cache else None
+        if cached_text is not None:
+            print(f"♻️ Answer cache hit for query: {query}")
 
-        # Step 5: Generate response from GenAI
-        response_text = response_service.generate_answer_from_context(
-            query=query,
-            context=context_window,
-            file_id="search"
-        )
+        meta = {
+            "query": query,
+            "file_id": matches[0].metadata.get("file_id"),
+            "context_chunks": context_chunks,
+            "cached": cached_text is not None,
+            "retrieval": retrieval,
+            "retriever_latency_ms": latency_ms,
+            "rerank": rerank_report,
+            "context_packing": packed.stats,
+        }
+        generation = {}
+
+        def start_generation(on_text=None):
+            # Step 5: Generate response from GenAI over the packed token ids, stopping at the deadline
+            if cached_text is not None:
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(cached_text)
+                return future
+            if continuous_batching:
+                return asyncio.wrap_future(response_service.submit_answer_from_context(
+                    query, context_chunks, "search", chunk_ids, packed, deadline, on_text, generation
+                ))
+            return asyncio.ensure_future(inference_executor.run(
+                response_service.generate_answer_from_context,
+                query=query,
+                context=context_chunks,
+                file_id="search",
+                chunk_ids=chunk_ids,
+                packed=packed,
+                deadline=deadline,
+                report=generation
+            ))
 
-        # Step 6: Return file_id and answer
-        file_id = matches[0].metadata.get("file_id")
+        def finish(response_text):
+            finish_reason = generation.get("finish_reason", "cached" if cached_text is not None else None)
+            # A budget-truncated answer, or one whose finish is unknown, is not what the next caller should get
+            if use_answer_cache and cached_text is None and finish_reason not in (None, "deadline"):
+                answer_cache.store(
+                    query_vector,
+                    chunk_ids,
+                    [match.metadata.get("file_id") for match in matches],
+                    response_text,
+                )
+            # Cached and unbatched answers arrive whole, so their first token is the last
+            now = time.monotonic()
+            timings = {
+                "ttft": round((generation.get("first_token_at", now) - request_start) * 1000, 3),
+                "total": round((now - request_start) * 1000, 3),
+            }
+            search_latency.record(timings["ttft"], timings["total"], finish_reason)
+            print(f"⏱️ Time to first token: {timings['ttft']:.1f}ms (total {timings['total']:.1f}ms, {finish_reason})")
+            return {"finish_reason": finish_reason, "latency_ms": timings}
+
+        # Step 6: Return file_id and answer, at once or as server-sent events
+        if request.stream:
+            return StreamingResponse(
+                stream_answer(meta, start_generation, finish),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
 
+        response_text = await start_generation()
         return JSONResponse(
             status_code=200,
             content={
-                "query": query,
-                "file_id": file_id,
+                **meta,
                 "response": response_text,
-                "context_chunks": context_chunks,
+                **finish(response_text),
                 "status": "response_generated"
             }
         )
 
+    except DjangoAPIError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except (InferenceQueueFull, InferenceQueueTimeout) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
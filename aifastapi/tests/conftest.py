@@ -0,0 +1,22 @@
+import sys
+import pytest
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """
+    The FastAPI server module on the local vector store, imported without
+    loading any model weights. Tests that need a model stub the service call.
+    """
+    pytest.importorskip("fastapi")
+    if "server" not in sys.modules:
+        from ai_agents import EmbeddingGenerator
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setenv("VECTOR_STORE", "local")
+            patch.setenv("LOCAL_VECTOR_STORE_DIR", str(tmp_path_factory.mktemp("vector_store")))
+            patch.setenv("MODEL_WORKERS", "0")
+            patch.setenv("GEN_BATCH_MAX_SIZE", "0")
+            for name in ("RERANK_MODEL", "EMBED_CACHE_DIR", "ANSWER_CACHE_SIZE"):
+                patch.delenv(name, raising=False)
+            patch.setattr(EmbeddingGenerator, "_load_model", lambda self: None)
+            import server
+    return sys.modules["server"]
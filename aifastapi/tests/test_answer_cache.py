@@ -0,0 +1,48 @@
+import time
+import numpy as np
+from answer_cache import SemanticAnswerCache
+
+def vector_at(base, other, similarity):
+    """Unit vector with cosine `similarity` to `base`, tilted towards orthogonal `other`"""
+    return similarity * base + np.sqrt(1 - similarity ** 2) * other
+
+BASE = np.eye(8)[0]
+OTHER = np.eye(8)[1]
+
+def test_near_duplicate_query_hits_and_distinct_query_misses():
+    cache = SemanticAnswerCache(max_entries=4, ttl=0)
+    cache.store(BASE, ["a-0", "a-1"], ["a"], "answer")
+
+    assert cache.lookup(vector_at(BASE, OTHER, 0.995), ["a-1", "a-0"]) == "answer"
+    # A different question on the same topic, over the same chunks
+    assert cache.lookup(vector_at(BASE, OTHER, 0.93), ["a-0", "a-1"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_same_query_over_other_context_misses():
+    cache = SemanticAnswerCache(max_entries=4, ttl=0)
+    cache.store(BASE, ["a-0"], ["a"], "answer")
+
+    assert cache.lookup(BASE, ["a-0", "b-0"]) is None
+
+def test_invalidate_file_drops_answers_built_from_it():
+    cache = SemanticAnswerCache(max_entries=4, ttl=0)
+    cache.store(BASE, ["a-0", "b-0"], ["a", "b"], "from a and b")
+    cache.store(OTHER, ["c-0"], ["c"], "from c")
+
+    assert cache.invalidate_file("b") == 1
+    assert cache.lookup(BASE, ["a-0", "b-0"]) is None
+    assert cache.lookup(OTHER, ["c-0"]) == "from c"
+    assert cache.invalidate_file("b") == 0
+    assert cache.stats()["entries"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(max_entries=2, ttl=0)
+    cache.store(np.eye(8)[0], ["x"], ["a"], "first")
+    cache.store(np.eye(8)[1], ["x"], ["a"], "second")
+    time.sleep(0.01)
+    cache.lookup(np.eye(8)[0], ["x"])
+    cache.store(np.eye(8)[2], ["x"], ["a"], "third")
+
+    assert cache.lookup(np.eye(8)[0], ["x"]) == "first"
+    assert cache.lookup(np.eye(8)[1], ["x"]) is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,113 @@
+import pytest
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+from transformers import PreTrainedTokenizerFast
+from context_packer import ContextPacker
+
+WORDS = ("question context answer the invoice is payable within thirty days supplier shall deliver goods on "
+         "schedule termination requires ninety written notice customer disputed what when . : ?").split()
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    vocab = {"<pad>": 0, "</s>": 1, "<unk>": 2, **{word: i + 3 for i, word in enumerate(dict.fromkeys(WORDS))}}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.normalizer = normalizers.Lowercase()
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="</s>", pad_token="<pad>", unk_token="<unk>")
+
+def test_packs_within_budget_and_keeps_question(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=40, question_tokens=8)
+    chunks = [
+        "The invoice is payable within thirty days. The supplier shall deliver goods on schedule.",
+        "Termination requires ninety days written notice.",
+        "The customer disputed the invoice.",
+    ]
+    packed = packer.pack("When is the invoice payable?", chunks)
+
+    assert len(packed.input_ids) <= 40
+    assert packed.input_ids[-1] == tokenizer.eos_token_id
+    assert tokenizer.decode(packed.question_ids).startswith("question : when is the invoice payable ?")
+    assert packed.chunks == [0, 1]
+    assert packed.stats["context_tokens"] <= packed.stats["context_budget"]
+
+def test_question_is_truncated_to_its_reservation(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=40, question_tokens=4)
+    packed = packer.pack("what is the invoice when the supplier shall deliver", ["The invoice is payable."])
+
+    assert len(packed.question_ids) == 4
+    assert packed.chunks == [0]
+
+def test_drops_near_duplicate_sentences(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=64, question_tokens=8, dedup_threshold=0.8)
+    chunks = [
+        "The invoice is payable within thirty days.",
+        "The invoice is payable within thirty days. Termination requires written notice.",
+    ]
+    packed = packer.pack("When is the invoice payable?", chunks)
+
+    assert packed.stats["duplicate_sentences"] == 1
+    assert tokenizer.decode(packed.context_ids).count("payable") == 1
+    assert packed.chunks == [0, 1]
+
+def test_context_does_not_depend_on_question(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=32, question_tokens=8)
+    chunks = ["The supplier shall deliver goods on schedule. Termination requires ninety days written notice. "
+              "The customer disputed the invoice. The invoice is payable within thirty days."]
+
+    short = packer.pack("what?", chunks)
+    long = packer.pack("what is the invoice when the supplier shall deliver goods?", chunks)
+
+    assert short.context_ids == long.context_ids
+    assert short.stats["truncated_sentences"] + short.stats["skipped_sentences"] > 0
+
+def test_short_questions_leave_their_reservation_to_context(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=64, question_tokens=32)
+    chunks = ["The supplier shall deliver goods on schedule. Termination requires ninety days written notice. "
+              "The customer disputed the invoice. The invoice is payable within thirty days. "
+              "The supplier shall deliver the invoice within ninety days."]
+    long_question = "what is the invoice when the supplier shall deliver goods on schedule and when is " * 3
+
+    short = packer.pack("what?", chunks)
+    similar = packer.pack("when is the invoice payable?", chunks)
+    long = packer.pack(long_question, chunks)
+
+    assert len(long.question_ids) == 32
+    assert long.stats["context_budget"] == packer.context_tokens
+    assert short.stats["context_budget"] == packer.context_tokens + 16
+    assert short.stats["context_tokens"] > long.stats["context_tokens"]
+    # Questions rounding up to the same reservation share the context
+    assert similar.context_ids == short.context_ids
+    for packed in (short, similar, long):
+        assert len(packed.input_ids) <= 64
+
+def test_long_question_is_kept_whole_below_the_cap(tokenizer):
+    packer = ContextPacker(tokenizer, max_tokens=512)
+    question = "what is the invoice when the supplier shall deliver goods on schedule and when is " * 6
+    chunks = ["The invoice is payable within thirty days. " * 60]
+
+    packed = packer.pack(question, chunks)
+
+    assert packed.stats["question_tokens"] > 64
+    assert packed.stats["question_truncated_tokens"] == 0
+    assert tokenizer.decode(packed.question_ids).endswith("when is")
+    # The context gives up what the question needs, rounded up to QUESTION_TOKEN_STEP
+    reserved = -(-len(packed.question_ids) // 16) * 16
+    assert packed.stats["context_budget"] == packer.context_tokens + packer.question_tokens - reserved
+    assert len(packed.input_ids) <= 512
+
+def test_question_past_the_safety_cap_is_reported(tokenizer, capsys):
+    packer = ContextPacker(tokenizer, max_tokens=128)
+    question = "what is the invoice when the supplier shall deliver goods on schedule and when is " * 6
+
+    packed = packer.pack(question, ["The invoice is payable within thirty days."])
+
+    assert len(packed.question_ids) == packer.question_tokens == 64
+    full = tokenizer(f"Question: {question}\n", add_special_tokens=False)["input_ids"]
+    assert packed.stats["question_truncated_tokens"] == len(full) - 64 > 0
+    assert "Question cut to 64 tokens" in capsys.readouterr().out
+    assert len(packed.input_ids) <= 128
+
+def test_without_context(tokenizer):
+    packed = ContextPacker(tokenizer, max_tokens=32, question_tokens=8).pack("what is the invoice?", [])
+
+    assert packed.chunks == []
+    assert tokenizer.decode(packed.context_ids, skip_special_tokens=True) == "answer :"
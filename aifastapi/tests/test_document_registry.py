@@ -0,0 +1,33 @@
+from document_registry import BloomFilter, EmbeddedDocumentRegistry
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"doc-{i}")
+
+    assert all(f"doc-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+def test_registry_add_discard_and_load():
+    registry = EmbeddedDocumentRegistry(capacity=100, error_rate=0.01)
+    registry.load(["a", "b"])
+    registry.add("c")
+
+    assert registry.contains("a") and registry.contains("c")
+    assert not registry.contains("z")
+
+    registry.discard("a")
+    assert not registry.contains("a")
+    assert registry.stats()["documents"] == 2
+
+def test_registry_grows_past_capacity():
+    registry = EmbeddedDocumentRegistry(capacity=10, error_rate=0.01)
+    for i in range(200):
+        registry.add(f"doc-{i}")
+        registry.discard(f"doc-{i - 50}")
+
+    assert registry.capacity > 50
+    assert registry.stats()["documents"] == 50
+    assert all(registry.contains(f"doc-{i}") for i in range(150, 200))
+    assert not any(registry.contains(f"doc-{i}") for i in range(100))
@@ -0,0 +1,47 @@
+import numpy as np
+from embedding_batcher import EmbeddingBatcher
+
+class RecordingEmbedder:
+    """Encodes each text as [len(text), prefix flag] and records batch sizes"""
+    def __init__(self):
+        self.batches = []
+
+    def generate_embeddings(self, texts, file_id, prefix):
+        self.batches.append(len(texts))
+        return np.array([[len(text), prefix == "query"] for text in texts], dtype=np.float32)
+
+def test_results_return_to_their_own_caller():
+    batcher = EmbeddingBatcher(RecordingEmbedder(), max_batch_size=16, max_wait_ms=50)
+    texts = ["a" * n for n in range(1, 9)]
+    futures = [batcher.submit(text, "query" if n % 2 else "passage") for n, text in enumerate(texts)]
+
+    for n, (text, future) in enumerate(zip(texts, futures)):
+        assert future.result(timeout=5).tolist() == [len(text), n % 2]
+
+def test_full_batch_flushes_before_max_wait():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=4, max_wait_ms=60_000)
+
+    # Eight texts fill exactly two batches; neither may wait out the minute
+    futures = [batcher.submit("y" * n) for n in range(1, 9)]
+    for future in futures:
+        future.result(timeout=5)
+    assert embedder.batches == [4, 4]
+    assert batcher.stats()["largest_batch"] == 4
+
+def test_partial_batch_flushes_after_max_wait():
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=32, max_wait_ms=20)
+
+    assert batcher.embed("lonely", timeout=5).tolist() == [6, 1]
+    assert embedder.batches == [1]
+
+def test_encoder_error_fails_every_caller_in_the_batch():
+    class Broken:
+        def generate_embeddings(self, texts, file_id, prefix):
+            raise ValueError("boom")
+
+    batcher = EmbeddingBatcher(Broken(), max_batch_size=8, max_wait_ms=20)
+    futures = [batcher.submit(text) for text in ("a", "b")]
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), ValueError)
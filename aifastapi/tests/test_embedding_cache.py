@@ -0,0 +1,60 @@
+import time
+import numpy as np
+from embedding_cache import ChunkEmbeddingCache, chunk_cache_key, embed_with_cache
+
+DIM = 4
+
+class CountingEmbedder:
+    model_name = "test-model"
+    output_dtype = np.float16
+
+    def __init__(self):
+        self.encoded = []
+
+    def generate_embeddings(self, texts, file_id, input_ids=None):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 1, 2, 3] for text in texts], dtype=self.output_dtype)
+
+def test_key_ignores_whitespace_but_not_model():
+    assert chunk_cache_key("m", "a  b\n") == chunk_cache_key("m", "a b")
+    assert chunk_cache_key("m", "a b") != chunk_cache_key("other", "a b")
+
+def test_misses_encode_once_and_repeats_hit(tmp_path):
+    cache = ChunkEmbeddingCache(str(tmp_path), dim=DIM)
+    embedder = CountingEmbedder()
+
+    embeddings, hits, _ = embed_with_cache(embedder, cache, ["one", "two", "one"], "f")
+    assert hits == 1 and embedder.encoded == ["one", "two"]
+    assert embeddings[:, 0].tolist() == [3, 3, 3]
+
+    embeddings, hits, _ = embed_with_cache(embedder, cache, ["two", "three"], "g")
+    assert hits == 1 and embedder.encoded == ["one", "two", "three"]
+    assert embeddings[:, 0].tolist() == [3, 5]
+
+def test_hits_keep_the_encoder_dtype(tmp_path):
+    cache = ChunkEmbeddingCache(str(tmp_path), dim=DIM)
+    embedder = CountingEmbedder()
+    embed_with_cache(embedder, cache, ["one"], "f")
+
+    embeddings, hits, _ = embed_with_cache(embedder, cache, ["one"], "f")
+    assert hits == 1 and embeddings.dtype == np.float16
+    assert cache.get_many([chunk_cache_key("test-model", "one")]).popitem()[1].dtype == np.float32
+
+def test_entries_survive_a_restart(tmp_path):
+    key = chunk_cache_key("test-model", "kept")
+    vector = np.array([0.5, -1.0, 2.0, 4.0], dtype=np.float32)
+    ChunkEmbeddingCache(str(tmp_path), dim=DIM).put_many({key: vector})
+
+    reopened = ChunkEmbeddingCache(str(tmp_path), dim=DIM)
+    assert np.array_equal(reopened.get_many([key, "missing"])[key], vector)
+    assert reopened.stats()["entries"] == 1
+
+def test_least_recently_used_slot_is_reused(tmp_path):
+    cache = ChunkEmbeddingCache(str(tmp_path), dim=DIM, max_entries=2)
+    cache.put_many({"a": np.full(DIM, 1.0), "b": np.full(DIM, 2.0)})
+    time.sleep(0.01)
+    cache.get_many(["a"])
+    cache.put_many({"c": np.full(DIM, 3.0)})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert cache.stats()["slots"] == 2
@@ -0,0 +1,51 @@
+import pytest
+import torch
+from transformers import T5Config, T5ForConditionalGeneration
+from cache_utils import LRUCache
+from encoder_cache import EncoderOutputCache
+
+@pytest.fixture(scope="module")
+def encoder():
+    torch.manual_seed(0)
+    config = T5Config(vocab_size=64, d_model=32, d_kv=8, d_ff=64, num_layers=2, num_heads=4)
+    return T5ForConditionalGeneration(config).eval().get_encoder()
+
+def test_lru_cache_evicts_by_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=100, sizeof=len)
+    cache.put("a", b"x" * 40)
+    cache.put("b", b"x" * 40)
+    cache.get("a")
+    cache.put("c", b"x" * 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 80
+
+    cache.put("huge", b"x" * 101)
+    assert cache.get("huge") is None
+    assert cache.pop("a") is not None
+    assert cache.stats()["bytes"] == 40
+
+def test_hit_reuses_context_states(encoder):
+    cache = EncoderOutputCache(max_mb=1)
+    context_ids = list(range(10, 40)) + [1]
+    key = cache.key("t5", ["doc-0", "doc-3"], context_ids)
+
+    first, report = cache.encode(encoder, [5, 6, 7], key, context_ids)
+    assert not report["hit"] and first.shape == (3 + len(context_ids), 32)
+
+    second, report = cache.encode(encoder, [8, 9], key, context_ids)
+    assert report["hit"] and report["saved_ms"] > 0
+    assert torch.equal(second[2:], first[3:])
+    alone = encoder(input_ids=torch.tensor([[8, 9]])).last_hidden_state[0]
+    assert torch.allclose(second[:2], alone)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["saved_ms"] > 0
+
+def test_key_depends_on_order_and_tokens():
+    ids = [10, 11, 1]
+    assert EncoderOutputCache.key("t5", ["a", "b"], ids) != EncoderOutputCache.key("t5", ["b", "a"], ids)
+    assert EncoderOutputCache.key("t5", ["a", "b"], ids) != EncoderOutputCache.key("t5", ["a", "b"], ids + [12])
+    assert EncoderOutputCache.key("t5", ["a", "b"], ids) != EncoderOutputCache.key("t5-large", ["a", "b"], ids)
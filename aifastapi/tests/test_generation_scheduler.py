@@ -0,0 +1,93 @@
+import random
+from concurrent.futures import CancelledError
+import time
+import pytest
+import torch
+from transformers import T5Config, T5ForConditionalGeneration
+from ai_agents import GenerativeAI
+from context_packer import PackedPrompt
+from generation_scheduler import GenerationScheduler
+from inference_executor import InferenceQueueFull
+
+EOS = 1
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = T5Config(
+        vocab_size=64, d_model=32, d_kv=8, d_ff=64, num_layers=2, num_decoder_layers=2, num_heads=4,
+        decoder_start_token_id=0, eos_token_id=EOS, pad_token_id=0,
+    )
+    return T5ForConditionalGeneration(config).eval()
+
+def test_greedy_matches_generate_with_requests_joining_and_leaving(model):
+    scheduler = GenerationScheduler(model, eos_token_id=EOS, max_batch_size=4)
+    rng = random.Random(0)
+    prompts = [[rng.randrange(2, 64) for _ in range(rng.randrange(3, 30))] + [EOS] for _ in range(10)]
+    budgets = [rng.randrange(1, 20) for _ in prompts]
+
+    futures = []
+    for prompt, budget in zip(prompts, budgets):
+        futures.append(scheduler.submit(prompt, max_new_tokens=budget))
+        time.sleep(0.002)
+
+    for prompt, budget, future in zip(prompts, budgets, futures):
+        expected = model.generate(torch.tensor([prompt]), max_new_tokens=budget, do_sample=False)[0, 1:].tolist()
+        tokens = future.result(timeout=60)
+        assert tokens == expected
+        assert len(tokens) <= budget
+
+    stats = scheduler.stats()
+    assert stats["completed"] == 10
+    assert stats["largest_batch"] > 1
+    scheduler.shutdown()
+
+def test_sampling_settings_are_per_request(model):
+    scheduler = GenerationScheduler(model, eos_token_id=EOS, max_batch_size=4)
+    prompt = [5, 6, 7, EOS]
+    greedy = scheduler.submit(prompt, max_new_tokens=8)
+    sampled = [scheduler.submit(prompt, max_new_tokens=8, do_sample=True, temperature=5.0) for _ in range(3)]
+
+    expected = model.generate(torch.tensor([prompt]), max_new_tokens=8, do_sample=False)[0, 1:].tolist()
+    assert greedy.result(timeout=60) == expected
+    assert any(future.result(timeout=60) != expected for future in sampled)
+    scheduler.shutdown()
+
+def test_full_queue_rejects(model):
+    scheduler = GenerationScheduler(model, eos_token_id=EOS, max_queue=0)
+    with pytest.raises(InferenceQueueFull):
+        scheduler.submit([5, EOS])
+
+def test_deadline_stops_decoding_and_tokens_are_streamed(model):
+    scheduler = GenerationScheduler(model, eos_token_id=EOS, max_batch_size=4)
+    prompt = [5, 6, 7, EOS]
+    # Warm the step-time estimate
+    scheduler.generate(prompt, max_new_tokens=5, timeout=60)
+
+    streamed = []
+    start = time.monotonic()
+    tokens = scheduler.submit(
+        prompt, max_new_tokens=100000, deadline=start + 0.05, on_token=streamed.append
+    ).result(timeout=60)
+
+    assert 1 <= len(tokens) < 100000
+    assert time.monotonic() - start < 1.0
+    assert streamed == tokens
+    assert scheduler.stats()["deadline_stops"] == 1
+
+    # An already expired deadline still yields the first token
+    assert len(scheduler.generate(prompt, max_new_tokens=50, deadline=time.monotonic() - 1, timeout=60)) == 1
+    scheduler.shutdown()
+
+def test_shutdown_cancels_pending_answers(model):
+    generator = GenerativeAI("unused")
+    generator._loaded = True
+    generator.max_new_tokens = 100000
+    generator.scheduler = GenerationScheduler(model, eos_token_id=EOS, max_batch_size=4)
+
+    response = generator.submit_response("doc", "", packed=PackedPrompt([5, 6], [7, EOS]))
+    time.sleep(0.05)
+    generator.scheduler.shutdown()
+
+    with pytest.raises(CancelledError):
+        response.result(timeout=10)
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from inference_executor import InferenceExecutor, InferenceQueueFull, InferenceQueueTimeout
+
+def test_full_queue_rejects_new_jobs():
+    executor = InferenceExecutor(workers=1, queue_depth=1, queue_timeout=0)
+    gate = threading.Event()
+
+    async def scenario():
+        admitted = [asyncio.ensure_future(executor.run(gate.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            await executor.run(gate.wait, 5)
+        except InferenceQueueFull:
+            rejected = True
+        else:
+            rejected = False
+        gate.set()
+        return rejected, await asyncio.gather(*admitted)
+
+    rejected, results = asyncio.run(scenario())
+    assert rejected and results == [True, True]
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 2 and stats["queued"] == 0
+    executor.shutdown()
+
+def test_queue_timeout_drops_jobs_that_never_started():
+    executor = InferenceExecutor(workers=1, queue_depth=4, queue_timeout=0.05)
+    gate = threading.Event()
+    started = []
+
+    async def scenario():
+        # The running job outlives the timeout but is still awaited
+        running = asyncio.ensure_future(executor.run(gate.wait, 5))
+        await asyncio.sleep(0)
+        try:
+            await executor.run(started.append, "queued")
+        except InferenceQueueTimeout:
+            timed_out = True
+        else:
+            timed_out = False
+        gate.set()
+        return timed_out, await running
+
+    timed_out, finished = asyncio.run(scenario())
+    assert timed_out and finished is True
+    assert started == []
+    stats = executor.stats()
+    assert stats["timed_out"] == 1 and stats["completed"] == 1
+    executor.shutdown()
+
+def test_queue_errors_map_to_503(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    async def full(fn, *args, **kwargs):
+        raise InferenceQueueFull("Inference queue is full (34 jobs pending)")
+
+    monkeypatch.setattr(server.inference_executor, "run", full)
+    response = TestClient(server.app).post("/generate", params={"file_id": "doc", "text": "Some text.", "regenerate": True})
+
+    assert response.status_code == 503
+    assert "queue is full" in response.json()["detail"]
@@ -0,0 +1,78 @@
+import threading
+import time
+import fitz
+import numpy as np
+import pytest
+from ingest_pipeline import IngestPipeline
+
+transformers = pytest.importorskip("transformers")
+
+WORDS = "the supplier shall deliver goods within thirty days of purchase order".split()
+
+class FakeEmbedder:
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def generate_embeddings(self, texts, file_id, input_ids=None):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+class SlowStore:
+    """Counts how many upload_vectors calls overlap"""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.ids = []
+        self._lock = threading.Lock()
+
+    def upload_vectors(self, vectors, namespace=""):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+            self.ids.extend(vector["id"] for vector in vectors)
+        return self.delay
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((72, 60 + 18 * line), " ".join(WORDS))
+    return doc.tobytes()
+
+@pytest.fixture
+def embedder(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "passage", ":"] + WORDS))
+    return FakeEmbedder(transformers.BertTokenizerFast(vocab_file=str(vocab)))
+
+def test_batches_upsert_concurrently_and_persist_one_at_a_time(embedder):
+    store = SlowStore()
+    persisting, persisted = [], []
+
+    def on_batch(start_index, chunks, vector_ids):
+        persisting.append(start_index)
+        assert len(persisting) - len(persisted) == 1
+        persisted.append((start_index, vector_ids))
+
+    # Each page is about one 512-token chunk; one chunk per batch gives a request per chunk
+    pipeline = IngestPipeline(embedder, store, batch_size=1, embed_workers=2, upsert_workers=4)
+    result = pipeline.run(make_pdf(8), "doc", on_batch=on_batch)
+
+    assert result["num_chunks"] >= 6
+    assert store.max_in_flight > 1
+    assert sorted(store.ids) == sorted(f"doc-{i}" for i in range(result["num_chunks"]))
+    assert sorted(start for start, _ in persisted) == list(range(result["num_chunks"]))
+    assert all(ids == [f"doc-{start + i}" for i in range(len(ids))] for start, ids in persisted)
+
+def test_upsert_failure_stops_the_ingest(embedder):
+    class BrokenStore:
+        def upload_vectors(self, vectors, namespace=""):
+            raise RuntimeError("index unavailable")
+
+    pipeline = IngestPipeline(embedder, BrokenStore(), batch_size=1, upsert_workers=3)
+    with pytest.raises(RuntimeError, match="index unavailable"):
+        pipeline.run(make_pdf(2), "doc")
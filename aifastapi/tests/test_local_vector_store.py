@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from local_vector_store import LocalVectorStore
+from vector_store import VectorStore
+
+DIM = 16
+
+def make_vectors(file_id, count, rng, start=0):
+    return [{
+        "id": f"{file_id}-{start + i}",
+        "values": rng.standard_normal(DIM).tolist(),
+        "metadata": {"file_id": file_id, "chunk_number": start + i, "text": f"chunk {start + i}"},
+    } for i in range(count)]
+
+def brute_force(vectors, query, top_k):
+    matrix = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+    scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    order = np.argsort(-scores)[:top_k]
+    return [vectors[i]["id"] for i in order], scores[order]
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_exact_top_k_matches_brute_force(tmp_path, dtype):
+    rng = np.random.default_rng(0)
+    store = LocalVectorStore(path=str(tmp_path), dim=DIM, dtype=dtype, hnsw_threshold=0)
+    vectors = make_vectors("a", 200, rng)
+    store.upload_vectors(vectors)
+
+    query = rng.standard_normal(DIM).astype(np.float32)
+    expected_ids, expected_scores = brute_force(vectors, query, 5)
+    result = store.query_top_k(query.tolist(), top_k=5)
+
+    tolerance = 1e-5 if dtype == "float32" else 2e-3
+    assert [m.id for m in result.matches] == expected_ids
+    assert np.allclose([m.score for m in result.matches], expected_scores, atol=tolerance)
+    assert result.matches[0].metadata["file_id"] == "a"
+
+def test_upsert_overwrites_and_fetch(tmp_path):
+    rng = np.random.default_rng(1)
+    store = LocalVectorStore(path=str(tmp_path), dim=DIM)
+    store.upload_vectors(make_vectors("a", 3, rng))
+    replacement = make_vectors("a", 1, rng)
+    replacement[0]["metadata"]["text"] = "updated"
+    store.upload_vectors(replacement)
+
+    fetched = store.fetch(["a-0", "a-1", "missing"])
+    assert set(fetched) == {"a-0", "a-1"}
+    assert fetched["a-0"]["metadata"]["text"] == "updated"
+    assert np.allclose(fetched["a-0"]["values"], replacement[0]["values"], atol=1e-6)
+    assert store.stats()["vectors"] == 3
+
+def test_metadata_filter_and_namespace(tmp_path):
+    rng = np.random.default_rng(2)
+    store = LocalVectorStore(path=str(tmp_path), dim=DIM)
+    store.upload_vectors(make_vectors("a", 20, rng) + make_vectors("b", 20, rng))
+    store.upload_vectors(make_vectors("c", 5, rng), namespace="other")
+    query = rng.standard_normal(DIM).tolist()
+
+    only_b = store.query_top_k(query, top_k=50, filter={"file_id": "b"})
+    assert len(only_b.matches) == 20
+    assert {m.metadata["file_id"] for m in only_b.matches} == {"b"}
+
+    early = store.query_top_k(query, top_k=50, filter={"file_id": {"$in": ["a", "b"]}, "chunk_number": {"$lt": 5}})
+    assert len(early.matches) == 10
+
+    assert {m.metadata["file_id"] for m in store.query_top_k(query, top_k=50).matches} == {"a", "b"}
+    assert {m.metadata["file_id"] for m in store.query_top_k(query, top_k=50, namespace="other").matches} == {"c"}
+    assert store.query_top_k(query, top_k=5, namespace="empty").matches == []
+
+def test_delete_file_reuses_slots_and_persists(tmp_path):
+    rng = np.random.default_rng(3)
+    store = LocalVectorStore(path=str(tmp_path), dim=DIM)
+    store.upload_vectors(make_vectors("a", 10, rng) + make_vectors("b", 10, rng))
+    assert store.delete_file("a") == 10
+    capacity = store.stats()["capacity"]
+    kept = make_vectors("c", 10, rng)
+    store.upload_vectors(kept)
+    assert store.stats()["capacity"] == capacity
+
+    reopened = LocalVectorStore(path=str(tmp_path), dim=DIM)
+    assert reopened.stats()["vectors"] == 20
+    assert reopened.fetch(["a-0"]) == {}
+    query = np.asarray(kept[3]["values"], dtype=np.float32)
+    assert reopened.query_top_k(query, top_k=1).matches[0].id == "c-3"
+
+def test_hnsw_recall(tmp_path):
+    pytest.importorskip("hnswlib")
+    rng = np.random.default_rng(4)
+    store = LocalVectorStore(path=str(tmp_path), dim=DIM, hnsw_threshold=500)
+    vectors = make_vectors("a", 2000, rng)
+    store.upload_vectors(vectors)
+
+    recall = []
+    for _ in range(20):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        expected, _ = brute_force(vectors, query, 10)
+        found = [m.id for m in store.query_top_k(query, top_k=10).matches]
+        recall.append(len(set(found) & set(expected)) / 10)
+    assert store.stats()["index"] == "hnsw"
+    assert np.mean(recall) >= 0.95
+
+    # Deletes and later upserts are reflected in the graph
+    store.delete_file("a")
+    store.upload_vectors(make_vectors("b", 600, rng))
+    result = store.query_top_k(rng.standard_normal(DIM), top_k=10)
+    assert {m.metadata["file_id"] for m in result.matches} == {"b"}
+
+def test_backend_missing_a_method_fails_at_construction():
+    class NoDelete(VectorStore):
+        def upload_vectors(self, vectors, namespace=""):
+            return 0.0
+
+        def fetch(self, ids, namespace=""):
+            return {}
+
+        def query_top_k(self, vector, top_k=5, namespace="", filter=None):
+            return None
+
+    with pytest.raises(TypeError, match="delete_file"):
+        NoDelete()
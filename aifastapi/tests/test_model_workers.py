@@ -0,0 +1,37 @@
+import os
+import time
+import pytest
+from model_workers import ModelWorkerPool
+
+class Echo:
+    def echo(self, value):
+        return value
+
+    def crash(self):
+        os._exit(3)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+@pytest.fixture
+def pool():
+    pool = ModelWorkerPool({"echo": Echo()}, workers=1, threads_per_worker=1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+def test_worker_death_fails_its_job_and_is_replaced(pool):
+    assert pool.call("echo", "echo", 1) == 1
+
+    with pytest.raises(RuntimeError, match="died with exit code 3"):
+        pool.submit("echo", "crash").result(timeout=10)
+
+    assert pool.call("echo", "echo", 2) == 2
+    stats = pool.stats()
+    assert stats["restarts"] == 1 and stats["alive"] == 1 and stats["in_flight"] == 0
+
+def test_call_times_out(pool):
+    pool.timeout = 0.2
+    with pytest.raises(RuntimeError, match="timed out"):
+        pool.call("echo", "sleep", 2)
+    assert pool.stats()["in_flight"] == 0
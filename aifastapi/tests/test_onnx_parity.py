@@ -0,0 +1,41 @@
+# aifastapi/tests/test_onnx_parity.py
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+
+from ai_agents import EmbeddingGenerator
+
+TEXTS = [
+    "The supplier shall deliver the goods within thirty days of the purchase order.",
+    "Either party may terminate this agreement with ninety days written notice.",
+    "Payment terms",
+    "Invoices are payable in full without set-off, counterclaim or deduction of any kind "
+    "within sixty days of receipt unless otherwise agreed in writing by both parties.",
+]
+
+def cosine(a, b):
+    a, b = torch.tensor(a), torch.tensor(b)
+    return torch.nn.functional.cosine_similarity(a, b, dim=-1)
+
+@pytest.fixture(scope="module")
+def torch_embeddings():
+    embedder = EmbeddingGenerator(backend="torch")
+    return embedder.generate_embeddings(TEXTS, "parity")
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("onnx")
+
+@pytest.mark.parametrize("quantize, min_similarity", [("0", 0.9999), ("1", 0.98)])
+def test_onnx_matches_torch(monkeypatch, onnx_dir, torch_embeddings, quantize, min_similarity):
+    monkeypatch.setenv("EMBEDDING_ONNX_PATH", str(onnx_dir / "e5.onnx"))
+    monkeypatch.setenv("EMBEDDING_ONNX_QUANTIZE", quantize)
+
+    embedder = EmbeddingGenerator(backend="onnx")
+    onnx_embeddings = embedder.generate_embeddings(TEXTS, "parity")
+
+    assert len(onnx_embeddings) == len(torch_embeddings)
+    similarity = cosine(onnx_embeddings, torch_embeddings)
+    assert similarity.min().item() >= min_similarity
@@ -0,0 +1,50 @@
+import time
+import numpy as np
+from cache_utils import LRUCache
+from query_cache import QueryEmbeddingCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_entries_expire_after_ttl():
+    cache = LRUCache(4, ttl=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.stats()["misses"] == 1
+
+def test_lru_byte_budget():
+    cache = LRUCache(10, max_bytes=10, sizeof=len)
+    cache.put("a", "x" * 6)
+    cache.put("b", "y" * 6)
+    cache.put("huge", "z" * 11)
+
+    assert cache.get("a") is None and cache.get("huge") is None
+    assert cache.stats()["bytes"] == 6
+
+def test_query_cache_normalises_queries_per_model():
+    cache = QueryEmbeddingCache("model-a", max_entries=2, ttl=0)
+    cache.put("Payment  terms\n", np.ones(4, dtype=np.float32))
+
+    assert np.array_equal(cache.get("payment terms"), np.ones(4))
+    assert cache._key("payment terms") != QueryEmbeddingCache("model-b", ttl=0)._key("payment terms")
+
+def test_query_cache_ttl_and_eviction():
+    cache = QueryEmbeddingCache("model-a", max_entries=2, ttl=0.05)
+    for query in ("one", "two", "three"):
+        cache.put(query, np.zeros(4))
+
+    assert cache.get("one") is None and cache.get("three") is not None
+    time.sleep(0.1)
+    assert cache.get("three") is None
+    assert cache.stats()["evictions"] == 1 and not cache.stats()["redis"]
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+import torch
+from reranker import CrossEncoderReranker
+
+class OverlapTokenizer:
+    """Packs each (query, text) pair's shared word count where the model can read it"""
+    def __call__(self, queries, texts, **kwargs):
+        overlap = [len(set(query.split()) & set(text.split())) for query, text in zip(queries, texts)]
+        return {"overlap": torch.tensor(overlap, dtype=torch.float32)}
+
+class OverlapModel:
+    def __init__(self):
+        self.pairs_scored = []
+
+    def __call__(self, overlap):
+        self.pairs_scored.append(len(overlap))
+        return SimpleNamespace(logits=overlap.unsqueeze(-1))
+
+def loaded_reranker(**kwargs):
+    reranker = CrossEncoderReranker(model_name="test", **kwargs)
+    reranker.tokenizer, reranker.model, reranker._loaded = OverlapTokenizer(), OverlapModel(), True
+    return reranker
+
+def match(id, text):
+    return SimpleNamespace(id=id, metadata={"text": text})
+
+def retrieved():
+    return [
+        match("a", "payment"),
+        match("b", "late payment invoice"),
+        match("c", "unrelated clause"),
+        match("d", "invoice payment"),
+        match("e", "late payment invoice terms"),
+    ]
+
+def test_candidates_are_ordered_by_score():
+    reranker = loaded_reranker(budget_ms=0, candidates=10)
+    ranked, report = reranker.rerank("late payment invoice", retrieved())
+
+    assert [m.id for m in ranked] == ["b", "e", "d", "a", "c"]
+    assert [m.rerank_score for m in ranked] == [3, 3, 2, 1, 0]
+    assert report["candidates"] == 5 and not report["skipped"]
+
+def test_only_the_candidate_pool_is_scored():
+    reranker = loaded_reranker(budget_ms=0, candidates=3)
+    ranked, report = reranker.rerank("late payment invoice", retrieved())
+
+    assert reranker.model.pairs_scored == [3]
+    # Past the pool, retrieval order is kept after the re-ranked candidates
+    assert [m.id for m in ranked] == ["b", "a", "c", "d", "e"]
+    assert not hasattr(ranked[3], "rerank_score")
+    assert report["candidates"] == 3
+
+def test_over_budget_estimate_keeps_retrieval_order():
+    reranker = loaded_reranker(budget_ms=10, candidates=10)
+    reranker._ms_per_pair = 100.0
+    matches = retrieved()
+    ranked, report = reranker.rerank("late payment invoice", matches)
+
+    assert ranked is matches and report["skipped"]
+    assert reranker.model.pairs_scored == []
+    assert reranker._ms_per_pair < 100.0
@@ -0,0 +1,53 @@
+import pytest
+
+@pytest.fixture
+def summary_api(server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    stored, generated = {}, []
+
+    async def get_summary(file_hash):
+        return stored.get(file_hash)
+
+    async def save_summary(file_hash, summary, model):
+        stored[file_hash] = {"summary": summary, "summary_model": model, "summary_generated_at": "2026-01-01T00:00:00Z"}
+
+    async def document_chunks(file_hash, limit=20):
+        return ["First chunk.", "Second chunk."] if file_hash == "doc" else []
+
+    def generate_answer(file_id, text):
+        generated.append((file_id, text))
+        return f"summary of {file_id}"
+
+    monkeypatch.setattr(server.django_client, "get_summary", get_summary)
+    monkeypatch.setattr(server.django_client, "save_summary", save_summary)
+    monkeypatch.setattr(server.django_client, "document_chunks", document_chunks)
+    monkeypatch.setattr(server.response_service, "generate_answer", generate_answer)
+    return TestClient(server.app), stored, generated
+
+def test_stored_summary_is_served_without_generating(server, summary_api):
+    client, stored, generated = summary_api
+    stored["doc"] = {"summary": "stored summary", "summary_model": server.response_service.summary_model,
+                     "summary_generated_at": "2026-01-01T00:00:00Z"}
+
+    body = client.post("/generate", params={"file_id": "doc"}).json()
+    assert body["status"] == "stored" and body["response"] == "stored summary"
+    assert generated == []
+
+def test_missing_or_stale_summary_is_generated_and_stored(server, summary_api):
+    client, stored, generated = summary_api
+
+    body = client.post("/generate", params={"file_id": "doc"}).json()
+    assert body["status"] == "generated" and body["response"] == "summary of doc"
+    assert generated == [("doc", "First chunk.\n\nSecond chunk.")]
+    assert stored["doc"]["summary"] == "summary of doc"
+
+    stored["doc"]["summary_model"] = "some-older-model"
+    assert client.post("/generate", params={"file_id": "doc"}).json()["status"] == "generated"
+    assert client.post("/generate", params={"file_id": "doc"}).json()["status"] == "stored"
+
+def test_document_without_text_is_404(summary_api):
+    client, _, generated = summary_api
+
+    assert client.post("/generate", params={"file_id": "unknown"}).status_code == 404
+    assert generated == []
@@ -0,0 +1,72 @@
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+from text_processor import TextProcessor
+
+WORDS = "the supplier shall deliver goods within thirty days of purchase order either party may terminate this agreement".split()
+PAGES = [
+    " ".join(WORDS[i % len(WORDS)] for i in range(start, start + 70)).capitalize() + "."
+    for start in (0, 7, 3)
+]
+
+@pytest.fixture
+def processor(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "passage", ":"] + WORDS))
+    return TextProcessor(transformers.BertTokenizerFast(vocab_file=str(vocab)))
+
+def test_chunk_offsets_point_into_joined_document(processor):
+    document = " ".join(PAGES)
+    chunks = list(processor.iter_chunks(PAGES, max_tokens=40, stride=10))
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert document[chunk["start_char"]:chunk["end_char"]] == chunk["text"]
+        assert processor.tokenizer(chunk["text"], add_special_tokens=False)["input_ids"] == chunk["input_ids"]
+
+def test_chunks_fit_window_and_overlap_by_stride(processor):
+    max_tokens, stride = 40, 10
+    chunks = list(processor.iter_chunks(PAGES, max_tokens=max_tokens, stride=stride))
+    # [CLS] + [SEP] and "passage: " come out of the window
+    window = max_tokens - 2 - 2
+
+    assert all(len(chunk["input_ids"]) == window for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]["input_ids"]) <= window
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous["input_ids"][-stride:] == current["input_ids"][:stride]
+        assert current["start_char"] < previous["end_char"]
+
+def make_pdf(pages):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {number} {' '.join(WORDS)}")
+    return doc.tobytes()
+
+def test_parallel_extraction_matches_in_process(processor):
+    data = make_pdf(40)
+    serial = list(processor.iter_pages(data))
+
+    processor.extract_workers, processor.parallel_min_pages = 2, 1
+    assert list(processor.iter_pages(data)) == serial
+    assert serial[39].startswith("page 39")
+
+def test_worker_opens_the_shared_pdf_once():
+    import text_processor
+    from multiprocessing import shared_memory
+
+    data = make_pdf(12)
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+        first = text_processor._extract_page_range(shm.name, len(data), 0, 6)
+        doc = text_processor._worker_doc[1]
+        second = text_processor._extract_page_range(shm.name, len(data), 6, 12)
+
+        assert text_processor._worker_doc[1] is doc
+        assert first[5].startswith("page 5") and second[0].startswith("page 6")
+    finally:
+        text_processor._close_shared_pdf()
+        shm.close()
+        shm.unlink()
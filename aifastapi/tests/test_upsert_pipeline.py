@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from upsert_pipeline import UpsertPipeline, payload_bytes
+
+class FakeApiError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+class FakeIndex:
+    """Records upsert requests; fails the first `failures` calls with `status`"""
+    def __init__(self, failures=0, status=503, delay=0.0):
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.stored = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, batch, namespace):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            with self._lock:
+                if self.failures:
+                    self.failures -= 1
+                    raise FakeApiError(self.status)
+                self.requests.append(batch)
+                self.stored.update({vector["id"]: vector for vector in batch})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def make_vectors(count, text_len=10):
+    return [{"id": f"f-{i}", "values": [0.1] * 8, "metadata": {"text": "x" * text_len}} for i in range(count)]
+
+def test_splits_by_count_and_bytes():
+    index = FakeIndex()
+    vectors = make_vectors(25, text_len=1000)
+    limit = 4 * payload_bytes(vectors[-1])
+    pipeline = UpsertPipeline(index.upsert, max_batch_vectors=10, max_batch_bytes=limit, concurrency=2)
+
+    report = pipeline.run(vectors)
+    assert max(len(batch) for batch in index.requests) == 4
+    assert report["requests"] == 7
+    assert len(index.stored) == 25
+
+    small = UpsertPipeline(FakeIndex().upsert, max_batch_vectors=10, max_batch_bytes=10 ** 9)
+    assert [len(batch) for batch, _ in small.split(make_vectors(25))] == [10, 10, 5]
+
+def test_oversized_vector_is_sent_alone():
+    pipeline = UpsertPipeline(FakeIndex().upsert, max_batch_vectors=10, max_batch_bytes=500)
+    vectors = make_vectors(2) + make_vectors(1, text_len=5000) + make_vectors(2)
+    assert [len(batch) for batch, _ in pipeline.split(vectors)] == [2, 1, 2]
+
+def test_retries_transient_failures():
+    index = FakeIndex(failures=3, status=503)
+    pipeline = UpsertPipeline(index.upsert, max_batch_vectors=5, concurrency=1, max_retries=4, backoff_base=0.001)
+    report = pipeline.run(make_vectors(10))
+    assert report["retries"] == 3
+    assert len(index.stored) == 10
+    assert report["vectors_per_s"] > 0 and report["bytes_per_s"] > 0
+    assert pipeline.stats()["retries"] == 3
+
+def test_client_errors_are_not_retried():
+    index = FakeIndex(failures=1, status=400)
+    pipeline = UpsertPipeline(index.upsert, concurrency=1, max_retries=4, backoff_base=0.001)
+    with pytest.raises(FakeApiError):
+        pipeline.run(make_vectors(3))
+    assert index.failures == 0
+    assert pipeline.stats()["failures"] == 1
+
+def test_gives_up_after_max_retries():
+    index = FakeIndex(failures=10, status=429)
+    pipeline = UpsertPipeline(index.upsert, concurrency=1, max_retries=2, backoff_base=0.001)
+    with pytest.raises(FakeApiError):
+        pipeline.run(make_vectors(3))
+    assert index.failures == 7
+
+def test_bounded_parallelism():
+    index = FakeIndex(delay=0.02)
+    pipeline = UpsertPipeline(index.upsert, max_batch_vectors=1, concurrency=3)
+    pipeline.run(make_vectors(12))
+    assert index.max_in_flight == 3
+    assert len(index.stored) == 12
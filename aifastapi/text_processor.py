@@ -1,11 +1,58 @@
 # text_processor.py
 import os
 import time
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import fitz
 
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+_worker_doc = None  # (shm name, document, buffer view, shm block) in an extraction worker
+
+def _get_extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all extractions; forkserver keeps model threads out of the children"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("forkserver"))
+        return _extraction_pool
+
+def _open_shared_pdf(shm_name: str, size: int):
+    """
+    Worker: the document in the parent's shared memory block, opened once per
+    process. fitz reads the block in place, so it stays attached until the
+    next extraction replaces it.
+    """
+    global _worker_doc
+    if _worker_doc is not None:
+        if _worker_doc[0] == shm_name:
+            return _worker_doc[1]
+        _close_shared_pdf()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:size]
+    _worker_doc = (shm_name, fitz.open(stream=view, filetype="pdf"), view, shm)
+    return _worker_doc[1]
+
+def _close_shared_pdf():
+    global _worker_doc
+    _, doc, view, shm = _worker_doc
+    _worker_doc = None
+    doc.close()
+    view.release()
+    shm.close()
+
+def _extract_page_range(shm_name: str, size: int, start: int, stop: int) -> list[str]:
+    """Worker: extract pages [start, stop) of the PDF in the parent's shared memory block"""
+    doc = _open_shared_pdf(shm_name, size)
+    return [doc[i].get_text() for i in range(start, stop)]
+
 class TextProcessor:
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        self.extract_workers = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(8, os.cpu_count() or 1))))
+        self.parallel_min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))  # below this, extract in-process
 
     @staticmethod
     def _get_file_size(pdf_path: str) -> str:
@@ -18,29 +65,95 @@ class TextProcessor:
         print(f"\n📄 Extracting {self._get_file_size(pdf_path)}")
         start = time.time()
         
-        with fitz.open(pdf_path) as doc:
-            text = " ".join(page.get_text() for page in doc)
+        with open(pdf_path, "rb") as f:
+            text = " ".join(self.iter_pages(f.read()))
         
         print(f"⏱️ Extraction: {time.time()-start:.2f}s")
         return text
 
+    def iter_pages(self, data: bytes):
+        """Yield page text in order, one page at a time, from an in-memory PDF"""
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+            parallel = self.extract_workers > 1 and page_count >= self.parallel_min_pages
+            print(f"\n📄 Streaming {page_count} pages ({len(data)/1024:.2f}KB)"
+                  f"{f' across {self.extract_workers} processes' if parallel else ''}")
+            if not parallel:
+                for page in doc:
+                    yield page.get_text()
+                return
+
+        yield from self._iter_pages_parallel(data, page_count)
+
+    def _iter_pages_parallel(self, data: bytes, page_count: int):
+        """Shard page ranges across the process pool and yield pages back in order"""
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        futures = []
+        try:
+            shm.buf[:len(data)] = data
+            pool = _get_extraction_pool(self.extract_workers)
+            # Several shards per worker so one slow range doesn't hold up the rest
+            shard = max(8, -(-page_count // (self.extract_workers * 4)))
+            futures = [
+                pool.submit(_extract_page_range, shm.name, len(data), start, min(start + shard, page_count))
+                for start in range(0, page_count, shard)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            shm.close()
+            shm.unlink()
+
+    def iter_chunks(self, pages, max_tokens: int = 512, stride: int = 50, prefix: str = "passage"):
+        """
+        Token-aware chunking over a stream of page texts using the fast
+        tokenizer's offset mapping. Each chunk is a dict with the original text
+        slice, its token ids (without special tokens) and its character offsets
+        in the " "-joined document. Windows leave room for the e5 prefix and
+        special tokens so the embedder can reuse the ids without truncating.
+        """
+        prefix_tokens = len(self.tokenizer(f"{prefix}: ", add_special_tokens=False)["input_ids"])
+        window = max_tokens - self.tokenizer.num_special_tokens_to_add() - prefix_tokens
+        step = window - stride
+        ids, offsets = [], []
+        text, text_base, doc_length = "", 0, 0
+
+        def make_chunk(end):
+            start_char, end_char = offsets[0][0], offsets[end - 1][1]
+            return {
+                "text": text[start_char - text_base:end_char - text_base],
+                "input_ids": ids[:end],
+                "start_char": start_char,
+                "end_char": end_char,
+            }
+
+        for page_text in pages:
+            page_base = doc_length + 1 if doc_length else 0
+            doc_length = page_base + len(page_text)
+            text += (" " if page_base else "") + page_text
+
+            encoded = self.tokenizer(page_text, add_special_tokens=False, return_offsets_mapping=True)
+            ids.extend(encoded["input_ids"])
+            offsets.extend((page_base + s, page_base + e) for s, e in encoded["offset_mapping"])
+
+            # Only emit once tokens beyond the window exist, so the tail is handled like chunk_text
+            while len(ids) > window:
+                yield make_chunk(window)
+                del ids[:step], offsets[:step]
+                # Drop text that no remaining token points into
+                text, text_base = text[offsets[0][0] - text_base:], offsets[0][0]
+
+        if ids:
+            yield make_chunk(len(ids))
+
     def chunk_text(self, text: str, max_tokens: int = 512) -> list[str]:
         """Token-aware text chunking"""
         print("✂️ Token-aware chunking...")
         start = time.time()
         
-        inputs = self.tokenizer(
-            text,
-            return_overflowing_tokens=True,
-            stride=50,
-            max_length=max_tokens,
-            truncation=False
-        )
-        
-        chunks = [
-            self.tokenizer.decode(chunk, skip_special_tokens=True).strip()
-            for chunk in inputs["input_ids"]
-        ]
+        chunks = [chunk["text"] for chunk in self.iter_chunks([text], max_tokens=max_tokens)]
         
         print(f"⏱️ Chunked {len(chunks)} parts in {(time.time()-start)*1000:.2f}ms")
-        return chunks
\ No newline at end of file
+        return chunks
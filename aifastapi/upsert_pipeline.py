@@ -0,0 +1,119 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+# JSON size of one float32 value written as a Python float, rounded up
+_FLOAT_BYTES = 20
+
+def payload_bytes(vector: dict) -> int:
+    """Estimated request bytes for one vector: id, values and JSON metadata"""
+    metadata = vector.get("metadata")
+    return len(vector["id"]) + _FLOAT_BYTES * len(vector["values"]) \
+        + (len(json.dumps(metadata)) if metadata else 0) + 32
+
+def is_retryable(error: Exception) -> bool:
+    """Client errors other than 429 will fail again; everything else may be transient"""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+class UpsertPipeline:
+    """
+    Splits upserts into requests capped by vector count and payload bytes,
+    sends them over a bounded thread pool and retries transient failures with
+    jittered exponential backoff. `upsert_fn(batch, namespace)` does the call.
+    """
+    def __init__(self, upsert_fn, max_batch_vectors: int = None, max_batch_bytes: int = None, concurrency: int = None,
+                 max_retries: int = None, backoff_base: float = None, backoff_max: float = None):
+        self.upsert_fn = upsert_fn
+        self.max_batch_vectors = max_batch_vectors or int(os.getenv("UPSERT_BATCH_VECTORS", "100"))
+        self.max_batch_bytes = max_batch_bytes or int(os.getenv("UPSERT_BATCH_BYTES", "1800000"))
+        self.concurrency = concurrency or int(os.getenv("UPSERT_CONCURRENCY", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("UPSERT_MAX_RETRIES", "4"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("UPSERT_BACKOFF_BASE", "0.25"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("UPSERT_BACKOFF_MAX", "8"))
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upsert")
+        self._lock = threading.Lock()
+        self._totals = {"vectors": 0, "bytes": 0, "requests": 0, "retries": 0, "failures": 0, "seconds": 0.0}
+
+    def split(self, vectors: list) -> list[tuple[list, int]]:
+        """Group vectors into (batch, bytes) requests; an oversized vector is sent on its own"""
+        batches, batch, size = [], [], 0
+        for vector in vectors:
+            vector_bytes = payload_bytes(vector)
+            if batch and (len(batch) >= self.max_batch_vectors or size + vector_bytes > self.max_batch_bytes):
+                batches.append((batch, size))
+                batch, size = [], 0
+            batch.append(vector)
+            size += vector_bytes
+        if batch:
+            batches.append((batch, size))
+        return batches
+
+    def _send(self, batch: list, namespace: str) -> int:
+        attempt = 0
+        while True:
+            try:
+                self.upsert_fn(batch, namespace)
+                return attempt
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                print(f"⚠️ Upsert of {len(batch)} vectors failed ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def run(self, vectors: list, namespace: str = "") -> dict:
+        """Upsert `vectors` and return {vectors, bytes, requests, retries, seconds, vectors_per_s, bytes_per_s}"""
+        start = time.time()
+        batches = self.split(vectors)
+        futures = [self._pool.submit(self._send, batch, namespace) for batch, _ in batches]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        wait(not_done)
+
+        seconds = time.time() - start
+        retries = sum(f.result() for f in futures if f.done() and not f.cancelled() and f.exception() is None)
+        total_bytes = sum(size for _, size in batches)
+        error = next((f.exception() for f in futures if f.done() and not f.cancelled() and f.exception()), None)
+        with self._lock:
+            self._totals["requests"] += len(batches)
+            self._totals["retries"] += retries
+            self._totals["seconds"] += seconds
+            if error is None:
+                self._totals["vectors"] += len(vectors)
+                self._totals["bytes"] += total_bytes
+            else:
+                self._totals["failures"] += 1
+        if error is not None:
+            print(f"❌ Upsert failed after retries: {error}")
+            raise error
+
+        report = {
+            "vectors": len(vectors),
+            "bytes": total_bytes,
+            "requests": len(batches),
+            "retries": retries,
+            "seconds": seconds,
+            "vectors_per_s": len(vectors) / seconds if seconds else 0.0,
+            "bytes_per_s": total_bytes / seconds if seconds else 0.0,
+        }
+        print(f"↗️ Upserted {len(vectors)} vectors in {len(batches)} requests, {seconds:.2f}s "
+              f"({report['vectors_per_s']:.0f} vectors/s, {report['bytes_per_s'] / 1e6:.2f} MB/s, {retries} retries)")
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        seconds = totals["seconds"]
+        totals["vectors_per_s"] = round(totals["vectors"] / seconds, 1) if seconds else 0.0
+        totals["bytes_per_s"] = round(totals["bytes"] / seconds, 1) if seconds else 0.0
+        totals["seconds"] = round(seconds, 4)
+        return totals
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,56 @@
+import os
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+class VectorStore(ABC):
+    """
+    Vector index behind ingest and search. Vector ids are
+    `{file_id}-{chunk_number}` and every vector carries a `file_id` metadata
+    field. `query_top_k` returns an object with a `.matches` list whose items
+    expose `.id`, `.score` and `.metadata`, like a Pinecone query response.
+    """
+    @abstractmethod
+    def upload_vectors(self, vectors: list, namespace: str = "") -> float:
+        """Upsert `{"id", "values", "metadata"}` dicts (values as 1-d arrays) and return the seconds spent"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch(self, ids: list[str], namespace: str = "") -> dict:
+        """Return {id: {"values": float32 array, "metadata": {...}}} for the ids that exist"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_file(self, file_id: str, namespace: str = "") -> int:
+        """Delete every vector of a document and return how many were removed"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def query_top_k(self, vector, top_k: int = 5, namespace: str = "", filter: dict = None):
+        """Return the `top_k` nearest vectors whose metadata matches `filter`"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+def owner_namespace(owner_id: str = None) -> str:
+    """Namespace for an uploader's vectors: their own with VECTOR_NAMESPACE_PER_OWNER=1, otherwise the shared one"""
+    if owner_id and os.getenv("VECTOR_NAMESPACE_PER_OWNER", "0").lower() in ("1", "true", "yes"):
+        return f"owner-{owner_id}"
+    return ""
+
+def make_match(id: str, score: float, metadata: dict):
+    return SimpleNamespace(id=id, score=score, metadata=metadata)
+
+def make_result(matches: list):
+    return SimpleNamespace(matches=matches)
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    """Build the store selected by VECTOR_STORE (pinecone or local)"""
+    backend = (backend or os.getenv("VECTOR_STORE", "pinecone")).lower()
+    if backend == "pinecone":
+        from pinecone_manager import PineconeManager
+        return PineconeManager()
+    if backend == "local":
+        from local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE '{backend}', expected 'pinecone' or 'local'")
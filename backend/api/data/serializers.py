@@ -21,7 +21,24 @@ class FileSerializer(serializers.ModelSerializer):
             }
         return None
     
+class FileSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = File
+        fields = ['file_hash', 'summary', 'summary_model', 'summary_generated_at']
+        read_only_fields = ['file_hash', 'summary_generated_at']
+        extra_kwargs = {
+            'summary': {'required': True, 'allow_null': False},
+            'summary_model': {'required': True, 'allow_null': False},
+        }
+
 class TextChunkSerializer(serializers.ModelSerializer):
     class Meta:
         model = TextChunk
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class TextChunkBulkSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TextChunk
+        fields = ['file_hash', 'chunk_text', 'chunk_number', 'start_char', 'end_char', 'vector_id', 'model_used']
+        # (file_hash, chunk_number) conflicts are resolved by the bulk upsert instead
+        validators = []
\ No newline at end of file
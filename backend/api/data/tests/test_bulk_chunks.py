@@ -0,0 +1,68 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models import TextChunk
+
+def make_chunks(file_hash, count, text="chunk"):
+    return [
+        {
+            'file_hash': file_hash,
+            'chunk_text': f'{text} {i}',
+            'chunk_number': i,
+            'vector_id': f'{file_hash}-{i}',
+            'model_used': 'intfloat/e5-base-v2',
+        }
+        for i in range(count)
+    ]
+
+# Test 1: A batch is written in one request
+@pytest.mark.django_db
+def test_bulk_create_chunks():
+    client = APIClient()
+    response = client.post(reverse('chunk-bulk-create'), make_chunks('hash-a', 50), format='json')
+
+    assert response.status_code == 201
+    assert response.data['saved'] == 50
+    assert TextChunk.objects.filter(file_hash='hash-a').count() == 50
+
+# Test 2: Re-sending the same chunks updates them instead of failing
+@pytest.mark.django_db
+def test_bulk_create_is_idempotent():
+    client = APIClient()
+    url = reverse('chunk-bulk-create')
+    client.post(url, make_chunks('hash-b', 10), format='json')
+
+    response = client.post(url, make_chunks('hash-b', 10, text='revised'), format='json')
+
+    assert response.status_code == 201
+    assert TextChunk.objects.filter(file_hash='hash-b').count() == 10
+    assert TextChunk.objects.get(file_hash='hash-b', chunk_number=3).chunk_text == 'revised 3'
+
+# Test 3: One invalid item rejects the whole batch
+@pytest.mark.django_db
+def test_bulk_create_rejects_invalid_batch():
+    client = APIClient()
+    chunks = make_chunks('hash-c', 5)
+    del chunks[2]['chunk_text']
+
+    response = client.post(reverse('chunk-bulk-create'), chunks, format='json')
+
+    assert response.status_code == 400
+    assert TextChunk.objects.filter(file_hash='hash-c').count() == 0
+
+# Test 4: Re-ingesting an embedded document (no vector ids sent) keeps the existing ones
+@pytest.mark.django_db
+def test_bulk_create_without_vector_id_keeps_existing_link():
+    client = APIClient()
+    url = reverse('chunk-bulk-create')
+    client.post(url, make_chunks('hash-d', 5), format='json')
+
+    chunks = make_chunks('hash-d', 6, text='again')
+    for chunk in chunks:
+        chunk['vector_id'] = None
+    response = client.post(url, chunks, format='json')
+
+    assert response.status_code == 201
+    rows = TextChunk.objects.filter(file_hash='hash-d').order_by('chunk_number')
+    assert [row.vector_id for row in rows] == [f'hash-d-{i}' for i in range(5)] + [None]
+    assert rows[2].chunk_text == 'again 2'
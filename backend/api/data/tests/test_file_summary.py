@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models import File, TextChunk
+
+# Test 1: A file without a stored summary returns empty fields
+@pytest.mark.django_db
+def test_file_summary_empty_until_generated():
+    File.objects.create(file_name='a.pdf', file_hash='hash-a')
+
+    response = APIClient().get(reverse('file-summary', args=['hash-a']))
+
+    assert response.status_code == 200
+    assert response.data['summary'] is None
+    assert response.data['summary_model'] is None
+
+# Test 2: Storing a summary records the model and when it was written
+@pytest.mark.django_db
+def test_file_summary_put_stores_summary():
+    File.objects.create(file_name='a.pdf', file_hash='hash-a')
+    client = APIClient()
+
+    response = client.put(reverse('file-summary', args=['hash-a']),
+                          {'summary': 'Supplier contracts', 'summary_model': 'google/flan-t5-base'}, format='json')
+
+    assert response.status_code == 200
+    file = File.objects.get(file_hash='hash-a')
+    assert file.summary == 'Supplier contracts'
+    assert file.summary_model == 'google/flan-t5-base'
+    assert file.summary_generated_at is not None
+    assert client.get(reverse('file-summary', args=['hash-a'])).data['summary'] == 'Supplier contracts'
+
+# Test 3: The model is required so stale summaries can be detected
+@pytest.mark.django_db
+def test_file_summary_put_requires_model():
+    File.objects.create(file_name='a.pdf', file_hash='hash-a')
+
+    response = APIClient().put(reverse('file-summary', args=['hash-a']), {'summary': 'Supplier contracts'}, format='json')
+
+    assert response.status_code == 400
+    assert File.objects.get(file_hash='hash-a').summary is None
+
+# Test 4: Unknown files are a 404
+@pytest.mark.django_db
+def test_file_summary_unknown_file():
+    client = APIClient()
+
+    assert client.get(reverse('file-summary', args=['missing'])).status_code == 404
+    assert client.put(reverse('file-summary', args=['missing']),
+                      {'summary': 'x', 'summary_model': 'm'}, format='json').status_code == 404
+
+# Test 5: Chunks of a document are listed in reading order up to the limit
+@pytest.mark.django_db
+def test_chunk_list_returns_first_chunks_in_order():
+    for number in (2, 0, 1):
+        TextChunk.objects.create(file_hash='hash-a', chunk_text=f'chunk {number}', chunk_number=number, model_used='e5')
+    TextChunk.objects.create(file_hash='hash-b', chunk_text='other', chunk_number=0, model_used='e5')
+
+    response = APIClient().get(reverse('chunk-list'), {'file_hash': 'hash-a', 'limit': 2})
+
+    assert response.status_code == 200
+    assert [chunk['text'] for chunk in response.data['chunks']] == ['chunk 0', 'chunk 1']
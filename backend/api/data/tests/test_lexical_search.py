@@ -0,0 +1,52 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from users.models import File, TextChunk
+
+@pytest.fixture
+def chunks():
+    owner = get_user_model().objects.create_user(email='owner@example.com', password='testpass123')
+    File.objects.create(file_name='a.pdf', file_hash='hash-a', uploaded_by_user_id=owner)
+    File.objects.create(file_name='b.pdf', file_hash='hash-b')
+    texts = {
+        'hash-a': [
+            'Invoice INV-20417 is payable within thirty days.',
+            'The supplier shall deliver the goods on schedule.',
+        ],
+        'hash-b': [
+            'Termination requires ninety days written notice.',
+            'Invoice INV-20417 was disputed by the customer.',
+        ],
+    }
+    for file_hash, rows in texts.items():
+        for i, text in enumerate(rows):
+            TextChunk.objects.create(file_hash=file_hash, chunk_text=text, chunk_number=i, model_used='test')
+    return owner
+
+# Test 1: Exact terms are found and ranked, ids match the vector ids
+@pytest.mark.django_db
+def test_lexical_search_ranks_term_matches(chunks):
+    response = APIClient().get(reverse('chunk-lexical-search'), {'q': 'invoice INV-20417 payable'})
+
+    assert response.status_code == 200
+    ids = [match['id'] for match in response.data['matches']]
+    assert ids[0] == 'hash-a-0'
+    assert set(ids) == {'hash-a-0', 'hash-b-1'}
+    assert 'took_ms' in response.data
+
+# Test 2: file_id and owner_id scope the search
+@pytest.mark.django_db
+def test_lexical_search_scoping(chunks):
+    client = APIClient()
+    by_file = client.get(reverse('chunk-lexical-search'), {'q': 'invoice', 'file_id': 'hash-b'})
+    by_owner = client.get(reverse('chunk-lexical-search'), {'q': 'invoice', 'owner_id': chunks.pk})
+
+    assert [m['id'] for m in by_file.data['matches']] == ['hash-b-1']
+    assert [m['id'] for m in by_owner.data['matches']] == ['hash-a-0']
+
+# Test 3: A query is required
+@pytest.mark.django_db
+def test_lexical_search_requires_query():
+    response = APIClient().get(reverse('chunk-lexical-search'))
+    assert response.status_code == 400
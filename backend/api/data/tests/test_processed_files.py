@@ -0,0 +1,37 @@
+import importlib
+import pytest
+from django.apps import apps
+from django.urls import reverse
+from rest_framework.test import APIClient
+from users.models import File, TextChunk
+
+# Test 1: Only files flagged as processed are listed
+@pytest.mark.django_db
+def test_processed_file_list_returns_flagged_hashes():
+    File.objects.create(file_name='a.pdf', file_hash='hash-a', processed_flag=True)
+    File.objects.create(file_name='b.pdf', file_hash='hash-b')
+
+    response = APIClient().get(reverse('processed-file-list'))
+
+    assert response.status_code == 200
+    assert response.data['file_hashes'] == ['hash-a']
+
+# Test 2: An empty table gives an empty list
+@pytest.mark.django_db
+def test_processed_file_list_empty():
+    response = APIClient().get(reverse('processed-file-list'))
+
+    assert response.status_code == 200
+    assert response.data['file_hashes'] == []
+
+# Test 3: Files embedded before the flag was set are backfilled from their chunk rows
+@pytest.mark.django_db
+def test_backfill_flags_files_with_chunks():
+    backfill = importlib.import_module('users.migrations.0011_backfill_processed_flag')
+    File.objects.create(file_name='a.pdf', file_hash='hash-a')
+    File.objects.create(file_name='b.pdf', file_hash='hash-b')
+    TextChunk.objects.create(file_hash='hash-a', chunk_text='text', chunk_number=0, model_used='e5')
+
+    backfill.mark_embedded_files(apps, None)
+
+    assert list(File.objects.filter(processed_flag=True).values_list('file_hash', flat=True)) == ['hash-a']
@@ -1,12 +1,16 @@
 # backend/api/data/urls.py
 from django.urls import path
-from .views import DataRootView, FileListView, DeleteFileView, TextChunkCreateView
+from .views import DataRootView, FileListView, ProcessedFileListView, FileSummaryView, DeleteFileView, TextChunkCreateView, TextChunkBulkCreateView, LexicalChunkSearchView
 
 urlpatterns = [
     # Route for data service
     path('', DataRootView.as_view(), name='data-service'),
     path('files/', FileListView.as_view(), name='file-list'),
+    path('files/processed/', ProcessedFileListView.as_view(), name='processed-file-list'),
+    path('files/<str:file_hash>/summary/', FileSummaryView.as_view(), name='file-summary'),
     path('files/<str:file_id>/', DeleteFileView.as_view(), name='delete-file'),
-    path('chunks/', TextChunkCreateView.as_view()), 
+    path('chunks/', TextChunkCreateView.as_view(), name='chunk-list'),
+    path('chunks/bulk/', TextChunkBulkCreateView.as_view(), name='chunk-bulk-create'),
+    path('chunks/search/', LexicalChunkSearchView.as_view(), name='chunk-lexical-search'),
     
 ]
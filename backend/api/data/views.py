@@ -2,10 +2,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.response import Response
 from users.models import File, TextChunk
-from .serializers import FileSerializer, TextChunkSerializer
+from .serializers import FileSerializer, FileSummarySerializer, TextChunkSerializer, TextChunkBulkSerializer
 from rest_framework import status
+from django.db import connection, transaction
 from django.conf import settings
+from django.utils import timezone
 import boto3
+import httpx
+import time
 from urllib.parse import urlparse
 
 s3_client = boto3.client(
@@ -26,6 +30,36 @@ class FileListView(APIView):
         serializer = FileSerializer(files, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)  
 
+class ProcessedFileListView(APIView):
+    """Hashes of files whose embeddings are stored, used by the AI service to skip re-embedding"""
+    def get(self, request):
+        file_hashes = File.objects.filter(processed_flag=True).values_list('file_hash', flat=True)
+        return Response({'file_hashes': list(file_hashes)}, status=status.HTTP_200_OK)
+
+class FileSummaryView(APIView):
+    """
+    Stored answer to "What is the main topic of this document?". The AI
+    service writes it in the background after embedding and /generate reads
+    it back, regenerating when `summary_model` is not the current generator.
+    """
+    def get(self, request, file_hash):
+        try:
+            file = File.objects.get(file_hash=file_hash)
+        except File.DoesNotExist:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(FileSummarySerializer(file).data, status=status.HTTP_200_OK)
+
+    def put(self, request, file_hash):
+        try:
+            file = File.objects.get(file_hash=file_hash)
+        except File.DoesNotExist:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        serializer = FileSummarySerializer(file, data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(summary_generated_at=timezone.now())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 class DeleteFileView(APIView):
     # permission_classes = [IsAuthenticated]
 
@@ -51,6 +85,17 @@ class DeleteFileView(APIView):
             # Delete File from DB
             file.delete()
 
+            # Drop the document's vectors and any cached answers built from it
+            try:
+                owner_id = file.uploaded_by_user_id_id
+                httpx.delete(
+                    f"http://aifastapi:8010/documents/{file.file_hash}",
+                    params={"owner_id": str(owner_id)} if owner_id else None,
+                    timeout=10.0
+                )
+            except httpx.HTTPError as e:
+                print(f"⚠️ Failed to delete vectors for {file.file_hash}: {e}")
+
             return Response({
                 'message': f'File and {deleted_chunks} associated chunks deleted from DB and S3.'
             }, status=status.HTTP_204_NO_CONTENT)
@@ -60,9 +105,114 @@ class DeleteFileView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)    
 
 class TextChunkCreateView(APIView):
+    def get(self, request):
+        """First `limit` chunks of a document in reading order, e.g. to summarise it"""
+        file_hash = request.GET.get('file_hash')
+        if not file_hash:
+            return Response({'error': 'Missing file_hash'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.GET.get('limit', '20')), 1), 200)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = TextChunk.objects.filter(file_hash=file_hash).order_by('chunk_number')[:limit]
+        return Response({
+            'chunks': [
+                {'chunk_number': chunk.chunk_number, 'text': chunk.chunk_text}
+                for chunk in chunks
+            ],
+        }, status=status.HTTP_200_OK)
+
     def post(self, request):
         serializer = TextChunkSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class TextChunkBulkCreateView(APIView):
+    """
+    Saves a list of chunks in one transaction. Re-sending a chunk with the same
+    (file_hash, chunk_number) updates it instead of failing, so ingest retries are safe.
+    A chunk sent without a vector_id (a document that was already embedded) keeps
+    the vector_id it has.
+    """
+    def post(self, request):
+        serializer = TextChunkBulkSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = [TextChunk(**item) for item in serializer.validated_data]
+        update_fields = ['chunk_text', 'start_char', 'end_char', 'model_used', 'updated_at']
+        with transaction.atomic():
+            for with_vector_id in (True, False):
+                group = [chunk for chunk in chunks if (chunk.vector_id is not None) == with_vector_id]
+                if not group:
+                    continue
+                TextChunk.objects.bulk_create(
+                    group,
+                    batch_size=1000,
+                    update_conflicts=True,
+                    unique_fields=['file_hash', 'chunk_number'],
+                    update_fields=update_fields + (['vector_id'] if with_vector_id else []),
+                )
+
+        return Response({'saved': len(chunks)}, status=status.HTTP_201_CREATED)
+
+class LexicalChunkSearchView(APIView):
+    """
+    Keyword top-k over the generated `search_vector` column (see migration
+    0009). Query terms are OR-ed and ranked with ts_rank_cd normalised by
+    document length (flags 1|32), a BM25-style score in 0..1 that rewards
+    chunks matching more terms, closer together. Optional `file_id` and
+    `owner_id` restrict the search like the vector query does.
+    """
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Missing q'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = min(max(int(request.GET.get('k', '20')), 1), 200)
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        conditions, params = [], [query]
+        file_hash = request.GET.get('file_id')
+        if file_hash:
+            conditions.append("c.file_hash = %s")
+            params.append(file_hash)
+        owner_id = request.GET.get('owner_id')
+        if owner_id:
+            conditions.append("c.file_hash IN (SELECT file_hash FROM users_file WHERE uploaded_by_user_id_id = %s)")
+            params.append(owner_id)
+        params.append(k)
+
+        sql = f"""
+            SELECT c.file_hash, c.chunk_number, c.chunk_text, ts_rank_cd(c.search_vector, t.q, 33) AS score
+            FROM users_textchunk c
+            CROSS JOIN (
+                SELECT CAST(replace(CAST(plainto_tsquery('english', %s) AS text), '&', '|') AS tsquery) AS q
+            ) t
+            WHERE c.search_vector @@ t.q{''.join(' AND ' + condition for condition in conditions)}
+            ORDER BY score DESC
+            LIMIT %s
+        """
+        start = time.time()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        elapsed_ms = (time.time() - start) * 1000
+
+        return Response({
+            'matches': [
+                {
+                    'id': f'{file_hash}-{chunk_number}',
+                    'file_id': file_hash,
+                    'chunk_number': chunk_number,
+                    'text': chunk_text,
+                    'score': score,
+                }
+                for file_hash, chunk_number, chunk_text, score in rows
+            ],
+            'took_ms': round(elapsed_ms, 3),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,73 @@
+import jwt
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from users.models import File
+from api.search import views
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+@pytest.fixture
+def search_setup(monkeypatch):
+    User = get_user_model()
+    me = User.objects.create_user(email='me@example.com', password='testpass123')
+    other = User.objects.create_user(email='other@example.com', password='testpass123')
+    File.objects.create(file_name='mine.pdf', file_hash='hash-mine', uploaded_by_user_id=me)
+    File.objects.create(file_name='theirs.pdf', file_hash='hash-theirs', uploaded_by_user_id=other)
+
+    sent = []
+    def fake_post(url, json, timeout):
+        sent.append(json)
+        return FakeResponse({'file_id': json.get('file_id', 'hash-mine'), 'response': 'answer'})
+    monkeypatch.setattr(views.httpx, 'post', fake_post)
+
+    client = APIClient()
+    token = jwt.encode({'email': 'me@example.com'}, 'secret', algorithm='HS256')
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, me, other, sent
+
+# Test 1: An unscoped search sends no filters
+@pytest.mark.django_db
+def test_unscoped_search(search_setup):
+    client, _, _, sent = search_setup
+    response = client.get(reverse('file-search'), {'query': 'payment terms'})
+
+    assert response.status_code == 200
+    assert 'file_id' not in sent[0] and 'owner_id' not in sent[0]
+
+# Test 2: scope=mine restricts retrieval to the caller's uploads
+@pytest.mark.django_db
+def test_scope_mine(search_setup):
+    client, me, _, sent = search_setup
+    response = client.get(reverse('file-search'), {'query': 'payment terms', 'scope': 'mine'})
+
+    assert response.status_code == 200
+    assert sent[0]['owner_id'] == str(me.pk)
+
+# Test 3: file_id targets one document inside its uploader's scope
+@pytest.mark.django_db
+def test_scope_single_file(search_setup):
+    client, _, other, sent = search_setup
+    response = client.get(reverse('file-search'), {'query': 'payment terms', 'file_id': 'hash-theirs'})
+
+    assert response.status_code == 200
+    assert sent[0]['file_id'] == 'hash-theirs'
+    assert sent[0]['owner_id'] == str(other.pk)
+    assert response.data['file']['file_name'] == 'theirs.pdf'
+
+# Test 4: Unknown documents are rejected before calling FastAPI
+@pytest.mark.django_db
+def test_scope_unknown_file(search_setup):
+    client, _, _, sent = search_setup
+    response = client.get(reverse('file-search'), {'query': 'payment terms', 'file_id': 'missing'})
+
+    assert response.status_code == 404
+    assert sent == []
@@ -0,0 +1,69 @@
+import json
+import httpx
+import jwt
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from users.models import File
+from api.search import views
+
+RealClient = httpx.Client
+
+SSE_BODY = (
+    'event: meta\ndata: {"query": "payment terms", "file_id": "hash-mine"}\n\n'
+    'event: token\ndata: {"text": "Net "}\n\n'
+    'event: token\ndata: {"text": "30"}\n\n'
+    'event: done\ndata: {"response": "Net 30", "finish_reason": "stop"}\n\n'
+)
+
+@pytest.fixture
+def stream_setup(monkeypatch):
+    me = get_user_model().objects.create_user(email='me@example.com', password='testpass123')
+    File.objects.create(file_name='mine.pdf', file_hash='hash-mine', uploaded_by_user_id=me)
+
+    sent = []
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, content=SSE_BODY.encode(), headers={'content-type': 'text/event-stream'})
+    monkeypatch.setattr(views.httpx, 'Client', lambda **kwargs: RealClient(transport=httpx.MockTransport(handler), **kwargs))
+
+    client = APIClient()
+    token = jwt.encode({'email': 'me@example.com'}, 'secret', algorithm='HS256')
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, sent
+
+def parse_events(response):
+    body = b''.join(response.streaming_content).decode()
+    events = []
+    for block in body.strip().split('\n\n'):
+        name, data = block.split('\n', 1)
+        events.append((name[len('event: '):], json.loads(data[len('data:'):])))
+    return events
+
+# Test 1: stream=1 relays tokens and swaps meta for the serialized file
+@pytest.mark.django_db
+def test_stream_relays_tokens(stream_setup):
+    client, sent = stream_setup
+    response = client.get(reverse('file-search'), {'query': 'payment terms', 'stream': '1', 'budget_ms': '2000'})
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/event-stream'
+    events = parse_events(response)
+    assert [name for name, _ in events] == ['file', 'token', 'token', 'done']
+    assert events[0][1]['file']['file_name'] == 'mine.pdf'
+    assert ''.join(data['text'] for name, data in events if name == 'token') == 'Net 30'
+    assert sent[0]['stream'] is True
+    assert sent[0]['latency_budget_ms'] == 2000.0
+
+# Test 2: An upstream error is returned as a normal error response
+@pytest.mark.django_db
+def test_stream_upstream_error(stream_setup, monkeypatch):
+    client, _ = stream_setup
+    monkeypatch.setattr(views.httpx, 'Client', lambda **kwargs: RealClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(404, json={'error': 'No match found.'})), **kwargs
+    ))
+    response = client.get(reverse('file-search'), {'query': 'payment terms', 'stream': '1'})
+
+    assert response.status_code == 404
+    assert response.data['error'] == 'FastAPI error'
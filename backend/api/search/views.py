@@ -1,8 +1,12 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 import re
+import json
 import jwt
 from rest_framework.authentication import get_authorization_header
 import httpx
@@ -49,6 +53,33 @@ class SearchView(APIView):
                 "threshold": threshold
             }
 
+            # Optional scoping: one document (?file_id=<hash>) and/or the caller's uploads (?scope=mine)
+            file_hash = request.GET.get("file_id")
+            if file_hash:
+                scoped_file = File.objects.filter(file_hash=file_hash).only("uploaded_by_user_id").first()
+                if not scoped_file:
+                    return Response({"error": "File not found in database"}, status=404)
+                payload["file_id"] = file_hash
+                # Vectors live in the uploader's namespace when namespaces are per owner
+                if scoped_file.uploaded_by_user_id_id:
+                    payload["owner_id"] = str(scoped_file.uploaded_by_user_id_id)
+            if request.GET.get("scope") == "mine":
+                payload["owner_id"] = str(user.pk)
+
+            # vector, lexical or hybrid; FastAPI applies its default when omitted
+            retrieval = request.GET.get("retrieval")
+            if retrieval:
+                payload["retrieval"] = retrieval
+
+            # Generation stops early so the answer fits in the budget (and the httpx timeout)
+            try:
+                payload["latency_budget_ms"] = float(request.GET.get("budget_ms", settings.SEARCH_LATENCY_BUDGET_MS))
+            except ValueError:
+                payload["latency_budget_ms"] = settings.SEARCH_LATENCY_BUDGET_MS
+
+            if request.GET.get("stream") in ("1", "true"):
+                return self.stream_answer(fastapi_url, payload)
+
             response = httpx.post(fastapi_url, json=payload, timeout=15.0)
 
             if response.status_code != 200:
@@ -78,12 +109,64 @@ class SearchView(APIView):
 
             return Response({
                 "file": serialized_file.data,
-                "response": response_text
+                "response": response_text,
+                "finish_reason": fastapi_data.get("finish_reason"),
+                "latency_ms": fastapi_data.get("latency_ms")
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+    def stream_answer(self, fastapi_url: str, payload: dict):
+        """
+        Relay FastAPI's server-sent events as they arrive. Its `meta` event is
+        replaced by a `file` event carrying the serialized best-match file;
+        `token`, `done` and `error` events pass through unchanged.
+        """
+        client = httpx.Client(timeout=15.0)
+        upstream = client.send(client.build_request("POST", fastapi_url, json={**payload, "stream": True}), stream=True)
+        if upstream.status_code != 200:
+            upstream.read()
+            upstream.close()
+            client.close()
+            return Response(
+                {
+                    "error": "FastAPI error",
+                    "status_code": upstream.status_code,
+                    "detail": upstream.text or upstream.reason_phrase or "Unknown error"
+                },
+                status=upstream.status_code
+            )
+
+        def event(name, data):
+            return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+        def events():
+            try:
+                lines = []
+                for line in upstream.iter_lines():
+                    if line:
+                        lines.append(line)
+                        continue
+                    if lines[:1] == ["event: meta"]:
+                        meta = json.loads(lines[1][len("data:"):])
+                        file_obj = File.objects.filter(file_hash=meta.get("file_id")).first()
+                        if file_obj is None:
+                            yield event("error", {"status_code": 404, "detail": "File not found in database"})
+                            return
+                        yield event("file", {"query": meta.get("query"), "file": FileSerializer(file_obj).data})
+                    elif lines:
+                        yield "\n".join(lines) + "\n\n"
+                    lines = []
+            finally:
+                upstream.close()
+                client.close()
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     def clean_search_query(self, query: str) -> str:
         # Normalize whitespace
         query = query.strip()
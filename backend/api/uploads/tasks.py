@@ -4,9 +4,10 @@ import requests
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from tempfile import NamedTemporaryFile
+from users.models import File
 
 @shared_task
-def process_text(file_hash, s3_uri):
+def process_text(file_hash, s3_uri, owner_id=None):
     start_time = time.time()
     s3 = boto3.client("s3")
 
@@ -27,12 +28,18 @@ def process_text(file_hash, s3_uri):
         with open(tmp_file_path, "rb") as f:
             files = {"file": ("upload.pdf", f, "application/pdf")}
             data = {"file_hash": file_hash}
+            if owner_id:
+                # Tag the vectors with the uploader so searches can be scoped to their files
+                data["owner_id"] = owner_id
             response = requests.post("http://aifastapi:8010/embed/", files=files, data=data)
             response.raise_for_status()
 
         result = response.json()
         print(f"✅ FastAPI /embed response: {result}")
 
+        # The AI service loads processed files into its embedded-documents registry on startup
+        File.objects.filter(file_hash=file_hash).update(processed_flag=True)
+
     except (ClientError, BotoCoreError, Exception) as e:
         return f"❌ Error during processing {file_hash}: {str(e)}"
 
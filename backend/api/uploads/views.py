@@ -151,7 +151,8 @@ class UploadCallbackView(APIView):
 
         print(f"File {file.file_name} marked as COMPLETED and unlocked.")
 
-        task = tasks.process_text.delay(file.file_hash, file.s3_uri)
+        owner_id = str(file.uploaded_by_user_id_id) if file.uploaded_by_user_id_id else None
+        task = tasks.process_text.delay(file.file_hash, file.s3_uri, owner_id)
         if task:
             return Response({'message': 'Task queued for text processing'}, status=status.HTTP_201_CREATED)
         
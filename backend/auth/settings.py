@@ -110,6 +110,10 @@ USE_TZ = True
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# SEARCH
+# Answers stop decoding before this budget so they arrive within the FastAPI call timeout
+SEARCH_LATENCY_BUDGET_MS = env.float("SEARCH_LATENCY_BUDGET_MS", default=12000)
+
 # CELERY
 #CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://redis:6379/0")
 #CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://redis:6379/0")
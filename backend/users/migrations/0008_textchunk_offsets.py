@@ -0,0 +1,23 @@
+# Generated by Django 4.2.12 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_textchunk_remove_embedding_chunk_delete_chunk_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textchunk',
+            name='start_char',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='textchunk',
+            name='end_char',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.12 on 2026-10-18 14:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over chunk text for lexical retrieval. The tsvector column
+    is generated by Postgres and is not declared on the TextChunk model, so the
+    ORM never reads or writes it; LexicalChunkSearchView queries it directly.
+    """
+
+    dependencies = [
+        ('users', '0008_textchunk_offsets'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE users_textchunk ADD COLUMN search_vector tsvector "
+                "GENERATED ALWAYS AS (to_tsvector('english', chunk_text)) STORED",
+                "CREATE INDEX users_textchunk_search_vector_gin ON users_textchunk USING GIN (search_vector)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS users_textchunk_search_vector_gin",
+                "ALTER TABLE users_textchunk DROP COLUMN IF EXISTS search_vector",
+            ],
+        ),
+    ]
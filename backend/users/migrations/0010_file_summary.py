@@ -0,0 +1,28 @@
+# Generated by Django 4.2.12 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_textchunk_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='summary',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='summary_model',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='summary_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
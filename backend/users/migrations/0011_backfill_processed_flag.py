@@ -0,0 +1,28 @@
+# Generated by Django 4.2.12 on 2026-10-18 18:20
+
+from django.db import migrations
+
+
+def mark_embedded_files(apps, schema_editor):
+    """
+    processed_flag was never set before the AI service started loading its
+    embedded-documents registry from it. Files whose chunks are stored were
+    embedded, so flag them instead of letting their next upload re-embed.
+    """
+    File = apps.get_model('users', 'File')
+    TextChunk = apps.get_model('users', 'TextChunk')
+    File.objects.filter(
+        processed_flag=False,
+        file_hash__in=TextChunk.objects.values('file_hash'),
+    ).update(processed_flag=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_file_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_embedded_files, migrations.RunPython.noop),
+    ]
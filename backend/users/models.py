@@ -66,6 +66,11 @@ class File(models.Model):
         default=PENDING,  # Default status is 'Pending'
     )
 
+    # "What is the main topic of this document?", answered once by the AI service after embedding
+    summary = models.TextField(null=True, blank=True)
+    summary_model = models.CharField(max_length=255, null=True, blank=True)  # Generator that wrote it; a different model regenerates
+    summary_generated_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
         return self.file_name
 
@@ -73,6 +78,8 @@ class TextChunk(models.Model):
     file_hash = models.CharField(max_length=255, db_index=True)  # Identify which document this chunk belongs to
     chunk_text = models.TextField()                              # The actual chunk content
     chunk_number = models.IntegerField()                         # The order/position of this chunk
+    start_char = models.IntegerField(null=True, blank=True)      # Character offsets of the chunk in the extracted text
+    end_char = models.IntegerField(null=True, blank=True)
     vector_id = models.CharField(max_length=255, null=True, blank=True)  # Pinecone vector ID, initially null
     model_used = models.CharField(max_length=255)                # Which model generated this (e.g., textembedding-gecko)
 
@@ -22,11 +22,29 @@ interface Message {
   query: string;
   file: FileResult;
   response: string;
+  streaming?: boolean;
+  finishReason?: string;
+}
+
+// Splits a server-sent events buffer into complete { event, data } pairs and the unfinished rest
+function parseEvents(buffer: string): [{ event: string; data: any }[], string] {
+  const blocks = buffer.split('\n\n');
+  const rest = blocks.pop() ?? '';
+  const events = blocks
+    .filter(block => block.trim())
+    .map(block => {
+      const lines = block.split('\n');
+      const event = lines.find(line => line.startsWith('event:'))?.slice(6).trim() ?? 'message';
+      const data = lines.find(line => line.startsWith('data:'))?.slice(5) ?? 'null';
+      return { event, data: JSON.parse(data) };
+    });
+  return [events, rest];
 }
 
 export default function Search() {
   const [query, setQuery] = useState('');
   const [threshold, setThreshold] = useState(0.75);
+  const [onlyMine, setOnlyMine] = useState(false);
   const [errorMessage, setErrorMessage] = useState('');
   const [loading, setLoading] = useState(false);
   const [showModal, setShowModal] = useState(false);
@@ -38,36 +56,56 @@ export default function Search() {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
+  // Applies a change to the answer currently being streamed (always the last message)
+  const updateLastMessage = (update: (msg: Message) => Message) => {
+    setMessages(prev => prev.map((msg, idx) => (idx === prev.length - 1 ? update(msg) : msg)));
+  };
+
   const handleSearch = async () => {
-    if (!query.trim()) return;
+    if (!query.trim() || loading) return;
     setLoading(true);
+    const submitted = query;
 
     try {
       const baseUrl = process.env.NEXT_PUBLIC_API_BASE_URL;
       const response = await fetch(
-        `${baseUrl}/api/search/?query=${encodeURIComponent(query)}&threshold=${threshold}`,
+        `${baseUrl}/api/search/?query=${encodeURIComponent(submitted)}&threshold=${threshold}${onlyMine ? '&scope=mine' : ''}&stream=1`,
         {
           method: 'GET',
           credentials: 'include'
         }
       );
 
-      const data = await response.json();
-
-      if (response.ok) {
-        setErrorMessage('');
-        setMessages(prev => [
-          ...prev,
-          {
-            query,
-            file: data.file,
-            response: data.response
-          }
-        ]);
-        setQuery('');
-      } else {
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => null);
         setErrorMessage(data?.error || 'No match found.');
         setQuery('');
+        return;
+      }
+
+      // Render the answer as it is generated: file first, then tokens, then the final text
+      setErrorMessage('');
+      setQuery('');
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        const [events, rest] = parseEvents(buffer + decoder.decode(value, { stream: true }));
+        buffer = rest;
+        for (const { event, data } of events) {
+          if (event === 'file') {
+            setMessages(prev => [...prev, { query: submitted, file: data.file, response: '', streaming: true }]);
+          } else if (event === 'token') {
+            updateLastMessage(msg => ({ ...msg, response: msg.response + data.text }));
+          } else if (event === 'done') {
+            updateLastMessage(msg => ({ ...msg, response: data.response, streaming: false, finishReason: data.finish_reason }));
+          } else if (event === 'error') {
+            setErrorMessage(data?.detail || 'No match found.');
+            updateLastMessage(msg => ({ ...msg, streaming: false }));
+          }
+        }
       }
     } catch (err) {
       console.error('Search failed:', err);
@@ -115,7 +153,13 @@ export default function Search() {
                 </div>
                 <div className="mt-2">
                   <span className="block text-gray-600 font-medium mb-1">Answer:</span>
-                  <p className="text-gray-800">{msg.response}</p>
+                  <p className="text-gray-800">
+                    {msg.response}
+                    {msg.streaming && <span className="animate-pulse">▍</span>}
+                  </p>
+                  {msg.finishReason === 'deadline' && (
+                    <p className="text-xs text-gray-500 mt-1">Answer shortened to respond in time.</p>
+                  )}
                 </div>
               </div>
             </div>
@@ -153,6 +197,14 @@ export default function Search() {
             </option>
           ))}
         </select>
+        <label className="flex items-center space-x-1 text-sm text-gray-600">
+          <input
+            type="checkbox"
+            checked={onlyMine}
+            onChange={(e) => setOnlyMine(e.target.checked)}
+          />
+          <span>My files</span>
+        </label>
         <button
           onClick={handleSearch}
           className="bg-blue-600 hover:bg-blue-700 text-white px-4 py-2 rounded-full shadow-md transition"